@@ -1,14 +1,23 @@
 """Add a link to the archive."""
 
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 
-from archeion.archivers import get_default_archivers
-from archeion.index.models import Link
+from django.db import transaction
+
+from archeion.archivers import get_archiver_names
+from archeion.index.model_functions import clear_link_field_choices, defer_link_data
+from archeion.index.models import Artifact, Link
 from archeion.logging import info
-from archeion.utils import normalize_url
+from archeion.probe import probe_links
+from archeion.utils import chunked, normalize_url
+
+BULK_CHUNK_SIZE = 500
+"""The number of URLs checked against the index and inserted at a time by a bulk add."""
 
 
-def add_links(input_: str, index_only: bool = False, archiver_names: Optional[List[str]] = None) -> List[Link]:
+def add_links(
+    input_: str, index_only: bool = False, archiver_names: Optional[List[str]] = None, bulk: bool = False
+) -> List[Link]:
     """
     Add a new URL or list of URLs to your archive.
 
@@ -16,6 +25,8 @@ def add_links(input_: str, index_only: bool = False, archiver_names: Optional[Li
         input_: The value to parse for URLs.
         index_only: Only add the URL to the index, do not add any archivers
         archiver_names: A list of archivers to use. If not provided, all configured archivers
+        bulk: Insert the links in batches, for large imports. The links' content types and index files
+            are filled in later by ``finish_links``.
 
     Returns:
         A list of Link objects.
@@ -29,31 +40,129 @@ def add_links(input_: str, index_only: bool = False, archiver_names: Optional[Li
     if not urls:
         return []
 
-    duplicate_urls: List[str] = []
-    links_to_archive: List[Link] = []
-
-    default_archivers = get_default_archivers()
+    default_archiver_names = get_archiver_names()
 
     if index_only:
-        archivers = []
+        plugin_names = []
     elif archiver_names is None:
-        archivers = default_archivers
+        plugin_names = default_archiver_names
     else:
-        archivers = [archiver for archiver in default_archivers if archiver.plugin_name in archiver_names]
+        plugin_names = [name for name in default_archiver_names if name in archiver_names]
+
+    if bulk:
+        new_links = bulk_add_urls(urls, plugin_names)
+        info(f"Found {len(new_links)} new URLs not already in index", left_indent=2)
+        return new_links
+
+    duplicate_urls: List[str] = []
+    links_to_archive: List[Link] = []
 
     for url in urls:
         normalized_url = normalize_url(url)
         if Link.objects.filter(url=normalized_url).exists():
             duplicate_urls.append(normalized_url)
         else:
-            link = Link.objects.create(url=normalized_url)
-            links_to_archive.append(link)
-
-            if index_only:
-                continue
+            links_to_archive.append(Link(url=normalized_url))
 
-            for archiver in archivers:
-                link.artifacts.create(plugin_name=archiver.plugin_name)
+    probe_links(links_to_archive)
+    with defer_link_data():
+        for link in links_to_archive:
+            link.save()
+            for plugin_name in plugin_names:
+                link.artifacts.create(plugin_name=plugin_name)
 
     info(f"Found {len(links_to_archive)} new URLs not already in index", left_indent=2)
     return links_to_archive
+
+
+def bulk_add_urls(urls: Iterable[str], plugin_names: List[str], chunk_size: Optional[int] = None) -> List[Link]:
+    """
+    Add the URLs that aren't in the index yet, a chunk at a time.
+
+    Each chunk takes one query to find the URLs already in the index, and one insert each for the
+    links and their artifacts. ``Link.save`` is skipped, so the links have no content type or
+    index file until ``finish_links`` runs.
+
+    Args:
+        urls: The URLs to add
+        plugin_names: The archivers to create artifacts for
+        chunk_size: The number of URLs to handle at a time. Defaults to ``BULK_CHUNK_SIZE``.
+
+    Returns:
+        The new links
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    new_links: List[Link] = []
+    seen_urls = set()
+    chunk: List[str] = []
+
+    for url in urls:
+        normalized_url = normalize_url(url)
+        if normalized_url in seen_urls:
+            continue
+        seen_urls.add(normalized_url)
+        chunk.append(normalized_url)
+        if len(chunk) >= chunk_size:
+            new_links.extend(_bulk_add_chunk(chunk, plugin_names))
+            chunk = []
+
+    if chunk:
+        new_links.extend(_bulk_add_chunk(chunk, plugin_names))
+    return new_links
+
+
+def _bulk_add_chunk(urls: List[str], plugin_names: List[str]) -> List[Link]:
+    """Insert the links for the normalized URLs that aren't in the index, and their artifacts."""
+    existing_urls = set(Link.objects.filter(url__in=urls).values_list("url", flat=True))
+    links = [Link(url=url) for url in urls if url not in existing_urls]
+    for link in links:
+        link.set_derived_fields()
+
+    # ``bulk_create`` skips ``save``, which normally fills in the ``order_with_respect_to`` column
+    artifacts = [
+        Artifact(link=link, plugin_name=plugin_name, _order=order)
+        for link in links
+        for order, plugin_name in enumerate(plugin_names)
+    ]
+    with transaction.atomic():
+        Link.objects.bulk_create(links)
+        Artifact.objects.bulk_create(artifacts)
+    if links:
+        clear_link_field_choices()
+    return links
+
+
+def finish_links(links: Optional[Iterable[Link]] = None) -> int:
+    """
+    Probe the content type and write the index file of links that were added in bulk.
+
+    Args:
+        links: The links to finish. Defaults to every link that hasn't been probed.
+
+    Returns:
+        The number of links finished
+    """
+    if links is None:
+        links = iter_unprobed_links()
+
+    count = 0
+    with defer_link_data():
+        for chunk in chunked(links, BULK_CHUNK_SIZE):
+            for link in probe_links(chunk):
+                link.save()
+                count += 1
+    return count
+
+
+def iter_unprobed_links(chunk_size: Optional[int] = None) -> Iterator[Link]:
+    """
+    Yield the links whose content type hasn't been probed, a query per chunk.
+
+    The links are read by primary key from where the last chunk ended, instead of with an open
+    cursor, so they can be saved while they are read. ``chunk_size`` defaults to ``BULK_CHUNK_SIZE``.
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    last_pk = ""
+    while chunk := list(Link.objects.filter(content_type__isnull=True, pk__gt=last_pk).order_by("pk")[:chunk_size]):
+        yield from chunk
+        last_pk = chunk[-1].pk
@@ -1,14 +1,19 @@
 """Methods for archiving Links into the index."""
 
 import asyncio
-from typing import List, Optional
+import contextlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Union
 
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from django.db.models import QuerySet
 
 from archeion.archivers import get_archivers_map
+from archeion.archivers.webdriver import WebDriverArchiver, capture_artifacts
 from archeion.index.models import Artifact, ArtifactStatus, Link
 from archeion.logging import error, info
+from archeion.probe import get_mime_type
 
 
 def get_links_with_status(status: ArtifactStatus = ArtifactStatus.PENDING) -> QuerySet:  # type: ignore[assignment]
@@ -24,26 +29,110 @@ def archive_links(links: Optional[List[Link]] = None, overwrite: bool = False) -
     else:
         info(f"Archiving {len(links)} links...")
 
-    for link in links:
-        info(f"Archiving link {link.url}...", left_indent=2)
+    artifacts = Artifact.objects.filter(link__in=links, status=ArtifactStatus.PENDING).select_related("link")
+    archive_artifacts(list(artifacts), overwrite)
 
-        # Each archiver logs its own information
-        artifacts = list(link.artifacts.filter(status=ArtifactStatus.PENDING))
-        finished_artifacts = _run_archivers(artifacts, overwrite)
 
-        for artifact in finished_artifacts:
-            artifact.save()
+def archive_artifacts(artifacts: List[Artifact], overwrite: bool = False) -> List[Artifact]:
+    """
+    Archive a list of artifacts concurrently.
+
+    All the artifacts are scheduled at once. How many run at the same time is bounded by the
+    ``archive_concurrency`` setting, and by the ``concurrency`` setting of each archiver.
+    Each artifact is saved as soon as its archiver finishes.
+
+    With the ``browser_single_page_load`` setting, the browser-based artifacts of a link are
+    captured from one page load instead of each archiver loading the page itself. Browser-based
+    artifacts of links that aren't one of the ``browser_content_types`` are skipped.
+
+    Args:
+        artifacts: The artifacts to archive. Their ``link`` should already be loaded.
+        overwrite: Archive the artifacts even if they have already succeeded
+
+    Returns:
+        The finished artifacts.
+    """
+    if not artifacts:
+        return []
+    return _run_archivers(artifacts, overwrite)
+
+
+def get_plugin_concurrency(archiver: Any) -> int:
+    """Return the maximum number of concurrent runs allowed for an archiver."""
+    config = getattr(archiver, "config", None) or {}
+    return int(config.get("concurrency") or settings.ARCHIVE_CONCURRENCY)
+
+
+def is_browser_content(link: Link) -> bool:
+    """
+    Is the link worth loading in a browser?
+
+    Links whose content type is unknown are given the benefit of the doubt.
+    """
+    mime_type = get_mime_type(link.content_type)
+    return not mime_type or mime_type in settings.BROWSER_CONTENT_TYPES
 
 
 @async_to_sync
 async def _run_archivers(artifacts: List[Artifact], overwrite: bool = False) -> List[Artifact]:
     """Run archivers for a list of artifacts."""
     archivers = get_archivers_map()
-    tasks = [archivers[art.plugin_name](art, overwrite) for art in artifacts]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    global_limit = asyncio.Semaphore(settings.ARCHIVE_CONCURRENCY)
+    # Only look up the archivers that are needed, so unused plugins are never instantiated
+    plugin_limits: Dict[str, asyncio.Semaphore] = {
+        name: asyncio.Semaphore(get_plugin_concurrency(archivers.get(name)))
+        for name in {art.plugin_name for art in artifacts}
+    }
+
+    async def run_archiver(artifact: Artifact) -> Artifact:
+        archiver = archivers[artifact.plugin_name]
+        # Acquire the plugin slot first, so waiting on a busy plugin doesn't hold a global slot
+        async with plugin_limits[artifact.plugin_name], global_limit:
+            result = await archiver(artifact, overwrite)
+        if isinstance(result, Artifact):
+            await sync_to_async(result.save)()
+        return result
+
+    async def run_page_captures(page_artifacts: List[Artifact]) -> List[Artifact]:
+        async with contextlib.AsyncExitStack() as stack:
+            # Always acquire in the same order to avoid deadlocks between links
+            for plugin_name in sorted({art.plugin_name for art in page_artifacts}):
+                await stack.enter_async_context(plugin_limits[plugin_name])
+            await stack.enter_async_context(global_limit)
+            results = await capture_artifacts([(archivers[art.plugin_name], art) for art in page_artifacts], overwrite)
+        for result in results:
+            await sync_to_async(result.save)()
+        return results
+
+    tasks = []
+    skipped = []
+    pages: Dict[str, List[Artifact]] = defaultdict(list)
+    for art in artifacts:
+        is_browser_archiver = isinstance(archivers.get(art.plugin_name), WebDriverArchiver)
+        if is_browser_archiver and not is_browser_content(art.link):
+            art.status = ArtifactStatus.SKIPPED
+            skipped.append(art)
+        elif is_browser_archiver and settings.BROWSER_SINGLE_PAGE_LOAD:
+            pages[art.link_id].append(art)
+        else:
+            tasks.append(run_archiver(art))
+    tasks.extend(run_page_captures(page_artifacts) for page_artifacts in pages.values())
+
+    if skipped:
+        await sync_to_async(Artifact.objects.bulk_update)(skipped, ["status"])
+    results: List[Union[Artifact, List[Artifact], BaseException]] = await asyncio.gather(
+        *tasks, return_exceptions=True
+    )
+    return _collect_outputs(results) + skipped
+
+
+def _collect_outputs(results: List[Union[Artifact, List[Artifact], BaseException]]) -> List[Artifact]:
+    """Flatten the results of the archiving tasks into a list of artifacts, reporting any errors."""
     outputs = []
     for result in results:
-        if isinstance(result, BaseException):
+        if isinstance(result, list):
+            outputs.extend(result)
+        elif isinstance(result, BaseException):
             error([f"Archiver {result.__class__.__name__} raised an error:", str(result)])
         elif not isinstance(result, Artifact):
             error(f"Archiver {result.__class__.__name__} returned a non-Artifact: {result}")
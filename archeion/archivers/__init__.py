@@ -1,10 +1,12 @@
 """Plugins for archiving a link or extracting data from a link."""
 
 import logging
+import threading
 from copy import deepcopy
 from pathlib import Path
-from typing import List, Optional, Protocol
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Protocol
 
+from django.core.signals import setting_changed
 from django.utils.functional import cached_property
 
 from archeion.config import ArchiverSettings
@@ -49,45 +51,144 @@ class ArchivePlugin(Protocol):  # pragma: no cover
         ...
 
 
-def get_all_archivers() -> List[ArchiverSettings]:
-    """Return a list of available archivers."""
-    import importlib
+class RegisteredPlugin:
+    """
+    A configured plugin whose instance is only created when it is first used.
 
-    from django.conf import settings
+    The name and enabled status only require importing the plugin class. Constructing the plugin
+    (which may install drivers) and probing the tool (which may run subprocesses) are deferred
+    until something needs them, and then cached for the life of the process.
+    """
+
+    def __init__(self, plugin_settings: ArchiverSettings):
+        self.settings = deepcopy(plugin_settings)
+        self.plugin_class: Optional[type] = None
+        self.enabled = plugin_settings.enabled
+        self._instance: Any = None
+        self._lock = threading.Lock()
 
-    plugins = []
+        module, class_name = plugin_settings.class_path.rsplit(".", 1)
+        self.name = class_name
+        if not self.enabled:
+            return
 
-    for archiver in settings.ARCHIVERS:
-        plugin_info = deepcopy(archiver)
-        module, class_name = plugin_info.class_path.rsplit(".", 1)
         try:
-            if not archiver.enabled:
-                plugin_info = disable_plugin(plugin_info, class_name)
-            else:
-                plugin_class = getattr(importlib.import_module(module), class_name)
-                plugin_info.klass = plugin_class(config=archiver.dict())
-                plugin_info.name = plugin_class.plugin_name
+            import importlib
+
+            self.plugin_class = getattr(importlib.import_module(module), class_name)
+            self.name = self.plugin_class.plugin_name
         except (ImportError, AttributeError) as e:
             logger.error(f"Unable to load archiver plugin {class_name}: {e}")
-            plugin_info = disable_plugin(plugin_info, class_name)
-        plugins.append(plugin_info)
+            self.enabled = False
+            self.plugin_class = None
+
+    def __repr__(self) -> str:
+        return f"<RegisteredPlugin {self.name} enabled={self.enabled}>"
+
+    @property
+    def klass(self) -> Any:
+        """The plugin instance, created on first access. ``None`` if the plugin is disabled."""
+        if self.plugin_class is None:
+            return None
+
+        with self._lock:
+            if self._instance is None:
+                self._instance = self.plugin_class(config=self.settings.dict())
+        return self._instance
+
+    @property
+    def is_constructed(self) -> bool:
+        """Has the plugin instance been created yet?"""
+        return self._instance is not None
+
+    @cached_property
+    def is_valid(self) -> bool:
+        """Return True if the plugin is enabled and its tool is ready."""
+        return bool(self.enabled and self.klass.is_valid)
+
+    @cached_property
+    def tool_version(self) -> str:
+        """The version of the plugin's tool, probed once per process."""
+        return self.klass.tool_version if self.enabled else "n/a"
+
+    @cached_property
+    def tool_binary(self) -> Optional[Path]:
+        """The path to the plugin's tool, probed once per process."""
+        return self.klass.tool_binary if self.enabled else None
+
+
+class PluginRegistry(Mapping):
+    """
+    A read-only map of plugin name to plugin instance, built from the plugin settings.
 
-    return plugins
+    Plugin instances are created lazily, the first time they are looked up.
+    """
+
+    def __init__(self, plugin_settings: List[ArchiverSettings]):
+        self.plugins = [RegisteredPlugin(item) for item in plugin_settings]
+        self._by_name: Dict[str, RegisteredPlugin] = {plugin.name: plugin for plugin in self.plugins}
+
+    def __getitem__(self, name: str) -> Any:
+        return self._by_name[name].klass
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_name)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def get_plugin(self, name: str) -> RegisteredPlugin:
+        """Return the registration of a plugin, without constructing it."""
+        return self._by_name[name]
+
+    def enabled_plugins(self) -> List[RegisteredPlugin]:
+        """Return the registrations of the enabled plugins."""
+        return [plugin for plugin in self.plugins if plugin.enabled]
+
+
+_REGISTRY: Optional[PluginRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_archiver_registry() -> PluginRegistry:
+    """Return the process-wide archiver registry, creating it if necessary."""
+    global _REGISTRY  # noqa: PLW0603
+    from django.conf import settings
+
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = PluginRegistry(settings.ARCHIVERS)
+        return _REGISTRY
+
+
+def reset_archiver_registry(**kwargs) -> None:
+    """Forget the archiver registry, so it is rebuilt from the settings on next use."""
+    global _REGISTRY  # noqa: PLW0603
+
+    if kwargs.get("setting", "ARCHIVERS") != "ARCHIVERS":
+        return
+    with _REGISTRY_LOCK:
+        _REGISTRY = None
+
+
+setting_changed.connect(reset_archiver_registry)
+
+
+def get_all_archivers() -> List[RegisteredPlugin]:
+    """Return a list of available archivers."""
+    return get_archiver_registry().plugins
 
 
-def disable_plugin(plugin_info: ArchiverSettings, class_name: str) -> ArchiverSettings:
-    """Disable a plugin."""
-    plugin_info.enabled = False
-    plugin_info.name = class_name
-    plugin_info.klass = None
-    return plugin_info
+def get_archivers_map() -> Mapping[str, Any]:
+    """Return a map of available archivers. Archivers are only instantiated when looked up."""
+    return get_archiver_registry()
 
 
-def get_archivers_map() -> dict:
-    """Return a map of available archivers."""
-    return {plugin.name: plugin.klass for plugin in get_all_archivers()}
+def get_archiver_names(enabled_only: bool = True) -> List[str]:
+    """Return the names of the archivers, without instantiating them."""
+    return [plugin.name for plugin in get_all_archivers() if plugin.enabled or not enabled_only]
 
 
 def get_default_archivers() -> List[ArchivePlugin]:
     """Return just the default Archivers."""
-    return [info.klass for info in get_all_archivers() if info.enabled]
+    return [info.klass for info in get_archiver_registry().enabled_plugins()]
@@ -0,0 +1,142 @@
+"""A pool of warm headless browsers shared by the WebDriver archivers."""
+
+import atexit
+import contextlib
+import queue
+import threading
+from typing import Callable, Dict, Generator, Hashable, Optional
+
+from selenium.common import WebDriverException
+from selenium.webdriver import Remote
+
+from archeion.logging import error
+
+DEFAULT_POOL_SIZE = 2
+"""The number of browsers a pool keeps when the ``browser_pool_size`` setting is missing."""
+
+DEFAULT_MAX_USES = 50
+"""How many pages a browser loads before it is replaced, to keep memory leaks in check."""
+
+_POOLS: Dict[Hashable, "BrowserPool"] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class BrowserPool:
+    """
+    A thread-safe pool of browser sessions.
+
+    Browsers are started on demand, up to ``max_size`` at a time. A browser returned to the pool
+    stays running and is handed to the next caller, so only the first page load pays for the
+    browser startup. Returned browsers get their cookies cleared and their window size restored.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE, max_uses: int = DEFAULT_MAX_USES):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._uses: Dict[int, int] = {}
+        self._window_sizes: Dict[int, dict] = {}
+
+    @contextlib.contextmanager
+    def browser(self, factory: Callable[[], Remote]) -> Generator[Remote, None, None]:
+        """
+        Borrow a browser from the pool, starting a new one with ``factory`` if none are idle.
+
+        The browser goes back to the pool when the block exits normally. If the block raises, the
+        browser is assumed broken and is shut down.
+
+        Args:
+            factory: Starts a new browser session.
+
+        Yields:
+            A browser session
+        """
+        with self._slots:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = factory()
+                self._window_sizes[id(driver)] = driver.get_window_size()
+
+            try:
+                yield driver
+            except BaseException:
+                self._discard(driver)
+                raise
+            else:
+                self._release(driver)
+
+    def _release(self, driver: Remote) -> None:
+        """Put a browser back in the pool, or shut it down if it has been used enough."""
+        uses = self._uses.get(id(driver), 0) + 1
+        if uses >= self.max_uses:
+            self._discard(driver)
+            return
+
+        try:
+            driver.delete_all_cookies()
+            # Archivers like the screenshot resize the window, which would change the next page's layout
+            if id(driver) in self._window_sizes:
+                driver.set_window_size(**self._window_sizes[id(driver)])
+        except WebDriverException:
+            self._discard(driver)
+            return
+
+        self._uses[id(driver)] = uses
+        self._idle.put(driver)
+
+    def _discard(self, driver: Remote) -> None:
+        """Shut down a browser without returning it to the pool."""
+        self._uses.pop(id(driver), None)
+        self._window_sizes.pop(id(driver), None)
+        with contextlib.suppress(WebDriverException, OSError):
+            driver.quit()
+
+    def close(self) -> None:
+        """Shut down all the idle browsers."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(driver)
+
+
+def get_browser_pool(key: Hashable, max_size: Optional[int] = None) -> BrowserPool:
+    """
+    Return the browser pool for ``key``, creating it if necessary.
+
+    Browsers are only shared between archivers that would start identical browsers, so ``key`` should
+    capture everything that goes into starting one, such as the driver path and the browser arguments.
+
+    Args:
+        key: Identifies browsers that are interchangeable.
+        max_size: The maximum number of browsers. Defaults to the ``BROWSER_POOL_SIZE`` setting.
+
+    Returns:
+        The shared browser pool
+    """
+    from django.conf import settings
+
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            size = max_size or getattr(settings, "BROWSER_POOL_SIZE", DEFAULT_POOL_SIZE)
+            _POOLS[key] = BrowserPool(max_size=size)
+        return _POOLS[key]
+
+
+def close_browser_pools() -> None:
+    """Shut down the browsers in every pool."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+
+    for pool in pools:
+        try:
+            pool.close()
+        except Exception as e:  # noqa: BLE001
+            error(f"Failed to close the browser pool: {e}")
+
+
+atexit.register(close_browser_pools)
@@ -15,8 +15,9 @@ class DOMArchiver(WebDriverArchiver):
     """Download the DOM of the link."""
 
     plugin_name = "DOM"
+    capture_order = 20
 
-    async def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
+    def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
         """
         Save the artifact.
 
@@ -4,6 +4,7 @@ import urllib.parse
 from pathlib import Path
 from typing import Optional
 
+from asgiref.sync import sync_to_async
 from distlib.util import cached_property
 from django.conf import settings
 from django.utils import timezone
@@ -84,7 +85,7 @@ class GitArchiver:
         artifact.start_ts = timezone.now()
 
         try:
-            self.save_git(artifact.link.url, artifact.archive_output_path)
+            await sync_to_async(self.save_git, thread_sensitive=False)(artifact.link.url, artifact.archive_output_path)
             artifact.status = ArtifactStatus.SUCCEEDED
         except RuntimeError:
             artifact.status = ArtifactStatus.FAILED
@@ -17,8 +17,10 @@ class HeadersArchiver(WebDriverArchiver):
     """Save the headers from accessing the link."""
 
     plugin_name = "headers"
+    capture_order = 10
+    """Read the headers before anything else triggers new requests."""
 
-    async def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
+    def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
         """
         Save the artifact.
 
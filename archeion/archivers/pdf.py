@@ -20,8 +20,9 @@ class PDFArchiver(WebDriverArchiver):
     """Save a PDF of the link."""
 
     plugin_name = "PDF"
+    capture_order = 30
 
-    async def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
+    def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
         """
         Save the artifact.
 
@@ -27,8 +27,10 @@ class ScreenshotArchiver(WebDriverArchiver):
     """Save a screenshot of the link."""
 
     plugin_name = "screenshot"
+    capture_order = 90
+    """Resizing the window can re-layout the page, so this captures last."""
 
-    async def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
+    def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
         """
         Save the artifact.
 
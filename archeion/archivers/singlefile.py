@@ -1,13 +1,14 @@
 """Archive the link using the singlepage CLI utility."""
 
+import asyncio
 import json
 import os
 import shutil
-import subprocess  # nosec B404
 from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.exceptions import SuspiciousFileOperation
 from django.core.files.base import ContentFile
@@ -161,22 +162,25 @@ class SinglefileArchiver:
         artifact.output_path = artifact.output_path or "singlefile.html"
         cmd = [str(self.tool_binary), *self.args, artifact.link.url]
 
-        result = subprocess.run(cmd, check=False, capture_output=True, text=False)  # nosec B602
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )  # nosec B603
+        stdout, stderr = await process.communicate()
         artifact.end_ts = timezone.now()
-        if result.stderr:
-            error([f"{self.plugin_name} failed with stderr:", result.stderr.decode("utf-8")])
+        if stderr:
+            error([f"{self.plugin_name} failed with stderr:", stderr.decode("utf-8")])
             artifact.status = ArtifactStatus.FAILED
             return artifact
-        if result.returncode != 0:
+        if process.returncode != 0:
             artifact.status = ArtifactStatus.FAILED
-            error(result.stderr.decode("utf-8"))
+            error(stderr.decode("utf-8"))
             return artifact
 
         try:
             storage = get_artifact_storage()
             filepath = os.path.join(artifact.link.archive_path, artifact.output_path)
 
-            storage.save(filepath, ContentFile(result.stdout))
+            await sync_to_async(storage.save, thread_sensitive=False)(filepath, ContentFile(stdout))
             artifact.status = ArtifactStatus.SUCCEEDED
             success(f"Saved {self.plugin_name} to {filepath}", left_indent=4)
         except SuspiciousFileOperation as e:  # pragma: no coverage
@@ -1,9 +1,10 @@
 """Download a link using Selenium WebDriver."""
 
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 import selenium
+from asgiref.sync import sync_to_async
 from distlib.util import cached_property
 from django.utils import timezone
 from selenium.common import WebDriverException
@@ -12,9 +13,14 @@ from selenium.webdriver.chrome.service import Service
 from seleniumwire.webdriver import Chrome, ChromeOptions
 from webdriver_manager.chrome import ChromeDriverManager
 
+from archeion.archivers.browser_pool import BrowserPool, get_browser_pool
+from archeion.exceptions import ArchiverError
 from archeion.index.models import Artifact, ArtifactStatus
 from archeion.logging import error, info
 
+PageCapture = Tuple["WebDriverArchiver", Artifact]
+"""An archiver and the artifact it should save from a loaded page."""
+
 
 class WebDriverArchiver:
     """
@@ -22,6 +28,8 @@ class WebDriverArchiver:
     """
 
     plugin_name = "webdriver"
+    capture_order = 50
+    """When several archivers capture from the same page load, lower numbers capture first."""
 
     def __init__(self, config: dict):
         """Initialize the plugin."""
@@ -30,17 +38,23 @@ class WebDriverArchiver:
         self.options = ChromeOptions()
         for arg in self.args:
             self.options.add_argument(arg)
-        self.exec_path = ChromeDriverManager().install()
-        self.service = Service(executable_path=self.exec_path)
-
         self.config = config
 
+    @cached_property
+    def exec_path(self) -> str:
+        """Install the driver on first use, so constructing the archiver stays cheap."""
+        return ChromeDriverManager().install()
+
+    @cached_property
+    def service(self) -> Service:
+        """The service that runs the driver."""
+        return Service(executable_path=self.exec_path)
+
     @cached_property
     def is_valid(self) -> bool:
         """Make sure the requested WebDriver is installed and ready."""
         try:
-            # with self.driver(self.exec_path, options=self.options):
-            with self.driver(service=self.service, options=self.options):
+            with self.browser_pool.browser(self.new_driver):
                 return True
         except WebDriverException:
             return False
@@ -56,7 +70,7 @@ class WebDriverArchiver:
         if not self.is_valid:
             return f"{selenium.__version__} (Not installed)"
 
-        with self.driver(service=self.service, options=self.options) as driver:
+        with self.browser_pool.browser(self.new_driver) as driver:
             return f"{selenium.__version__} ({driver.caps['browserVersion']})"
 
     @cached_property
@@ -64,7 +78,21 @@ class WebDriverArchiver:
         """Return the path to the tool."""
         return Path(self.exec_path) if self.is_valid else None
 
-    async def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
+    @property
+    def browser_pool(self) -> BrowserPool:
+        """The pool of browsers shared with every archiver that starts the same kind of browser."""
+        return get_browser_pool((self.exec_path, tuple(self.args)))
+
+    def new_driver(self) -> Remote:
+        """Start a new browser session."""
+        # driver = self.driver(self.exec_path, chrome_options=self.options)
+        driver = self.driver(service=self.service, options=self.options)  # pragma: no-cover
+        driver.implicitly_wait(10)  # seconds
+        driver.set_page_load_timeout(10)  # seconds
+        driver.set_script_timeout(10)  # seconds
+        return driver
+
+    def save_artifact(self, driver: Remote, artifact: Artifact) -> Artifact:
         """
         Save the artifact.
 
@@ -95,28 +123,70 @@ class WebDriverArchiver:
         Returns:
             The modified Artifact record.
         """
+        artifacts = await capture_artifacts([(self, artifact)], overwrite)
+        return artifacts[0]
+
+
+async def capture_artifacts(captures: List[PageCapture], overwrite: bool = False) -> List[Artifact]:
+    """
+    Save several artifacts of the same link from a single page load.
+
+    Args:
+        captures: The archivers and the artifacts they save. All the artifacts must belong to the same link.
+        overwrite: Overwrite the artifacts if they already succeeded
+
+    Returns:
+        The modified Artifact records, in the same order as ``captures``.
+    """
+    pending = []
+    for archiver, artifact in captures:
         if artifact.status == ArtifactStatus.SUCCEEDED and not overwrite:
-            return artifact
+            continue
 
-        if not self.is_valid:
+        # Checking starts, or waits for, a pooled browser, which blocks
+        if not await sync_to_async(lambda archiver=archiver: archiver.is_valid, thread_sensitive=False)():
             artifact.status = ArtifactStatus.FAILED
-            error(f"{self.plugin_name} is not valid.")
-            return artifact
+            error(f"{archiver.plugin_name} is not valid.")
+            continue
 
         artifact.start_ts = timezone.now()
-        info(f"{self.plugin_name}: Downloading {artifact.link.url}...", left_indent=4)
-        try:
-            # with self.driver(self.exec_path, chrome_options=self.options) as driver:  # pragma: no-cover
-            with self.driver(service=self.service, options=self.options) as driver:  # pragma: no-cover
-                driver.implicitly_wait(10)  # seconds
-                driver.set_page_load_timeout(10)  # seconds
-                driver.set_script_timeout(10)  # seconds
-
-                driver.get(artifact.link.url)
-                artifact = await self.save_artifact(driver, artifact)
-        except selenium.common.TimeoutException as e:
-            artifact.status = ArtifactStatus.FAILED
-            error([f"{self.plugin_name} failed:", e])
+        pending.append((archiver, artifact))
+
+    if pending:
+        url = pending[0][1].link.url
+        plugin_names = ", ".join(archiver.plugin_name for archiver, _ in pending)
+        info(f"{plugin_names}: Downloading {url}...", left_indent=4)
+
+        # Selenium blocks, so the browser session runs in a worker thread to keep the event loop free
+        await sync_to_async(capture_page, thread_sensitive=False)(url, pending)
+
+        for _, artifact in pending:
+            artifact.end_ts = timezone.now()
 
-        artifact.end_ts = timezone.now()
-        return artifact
+    return [artifact for _, artifact in captures]
+
+
+def capture_page(url: str, captures: List[PageCapture]) -> None:
+    """
+    Load the URL once in a pooled browser, and let each archiver save its artifact from the page.
+
+    Args:
+        url: The URL to load
+        captures: The archivers and the artifacts they save
+    """
+    captures = sorted(captures, key=lambda capture: capture[0].capture_order)
+    lead_archiver = captures[0][0]
+    try:
+        with lead_archiver.browser_pool.browser(lead_archiver.new_driver) as driver:
+            del driver.requests  # Forget the requests of the previous page
+            driver.get(url)
+            for archiver, artifact in captures:
+                try:
+                    archiver.save_artifact(driver, artifact)
+                except (ArchiverError, WebDriverException) as e:
+                    artifact.status = ArtifactStatus.FAILED
+                    error([f"{archiver.plugin_name} failed:", e])
+    except selenium.common.TimeoutException as e:
+        for archiver, artifact in captures:
+            artifact.status = ArtifactStatus.FAILED
+            error([f"{archiver.plugin_name} failed:", e])
@@ -4,11 +4,13 @@ from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.utils import timezone
 
-from archeion.dependency import bin_path, run_shell
+from archeion.dependency import bin_path, run_shell, run_shell_async
 from archeion.index.models import Artifact, ArtifactStatus
+from archeion.index.storage import unshare_artifact_files
 from archeion.logging import error
 
 
@@ -106,7 +108,9 @@ class WgetArchiver:
 
         cmd = [self.tool_binary, *self.args, artifact.link.url]
 
-        result = run_shell(cmd, cwd=str(artifact.archive_output_path))
+        # wget rewrites the files of a previous run in place, so they must not share blobs with other links
+        await sync_to_async(unshare_artifact_files, thread_sensitive=False)(artifact.archive_output_path)
+        result = await run_shell_async(cmd, cwd=str(artifact.archive_output_path))
 
         # parse out number of files downloaded from last line of stderr:
         #  "Downloaded: 76 files, 4.0M in 1.6s (2.52 MB/s)"
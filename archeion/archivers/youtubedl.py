@@ -3,6 +3,7 @@
 from pathlib import Path
 from typing import Optional
 
+from asgiref.sync import sync_to_async
 from distlib.util import cached_property
 from django.conf import settings
 from django.utils import timezone
@@ -77,7 +78,9 @@ class YouTubeDLArchiver:
         artifact.start_ts = timezone.now()
 
         try:
-            self.save_media(artifact.link.url, artifact.archive_output_path)
+            await sync_to_async(self.save_media, thread_sensitive=False)(
+                artifact.link.url, artifact.archive_output_path
+            )
             artifact.status = ArtifactStatus.SUCCEEDED
         except RuntimeError:
             artifact.status = ArtifactStatus.FAILED
@@ -14,6 +14,7 @@ SETTINGS = None
 CONFIG_FILENAME = "config.yaml"
 ARTIFACTS_DIR_NAME = "artifacts"
 SOURCES_DIR_NAME = "sources"
+CACHE_DIR_NAME = "cache"
 ALLOWED_IN_OUTPUT_DIR = {
     ".gitignore",
     "lost+found",
@@ -24,6 +25,7 @@ ALLOWED_IN_OUTPUT_DIR = {
     ".virtualenv",
     "node_modules",
     ARTIFACTS_DIR_NAME,
+    CACHE_DIR_NAME,
     CONFIG_FILENAME,
     SOURCES_DIR_NAME,
     "*.sqlite3",
@@ -41,10 +43,24 @@ DEFAULT_SETTINGS: Dict[str, Any] = {
     },
     "timeout": 60,
     "media_timeout": 120,
+    "archive_concurrency": 4,
+    "browser_pool_size": 2,
+    "browser_single_page_load": True,
+    "browser_content_types": ["text/html", "application/xhtml+xml"],
+    "probe_concurrency": 20,
+    "probe_per_host_concurrency": 2,
+    "probe_timeout": 10,
+    "post_process_workers": 1,
+    "post_process_chunk_size": 20,
+    "jsonld_context_cache_dir": "",  # This needs to be fully-qualified, so it is set in ``get_default_settings``
+    "jsonld_context_ttl": 7 * 24 * 60 * 60,
+    "jsonld_offline": False,
+    "search_index_path": "",  # This needs to be fully-qualified, so it is set in ``get_default_settings``
     "url_blacklist": None,
     "url_whitelist": None,
     "check_ssl_validity": True,
     "cache_url": "locmem://",
+    "keyword_cache_url": "",  # This needs to be fully-qualified, so it is set in ``get_default_settings``
     "dandelion_token": None,
     "archivers": [
         {
@@ -152,6 +168,7 @@ class ArchiverSettings(BaseSettings):
     class_path: str
     klass: Optional[Any] = None
     name: Optional[str] = None
+    concurrency: Optional[int] = None
 
     class Config:
         """Archiver settings config."""
@@ -173,6 +190,7 @@ class ServerSettings(BaseSettings):
     custom_templates_dir: str = None
     time_zone: str = "UTC"
     preview_originals: bool = True
+    serve_archive_files: bool = False
 
     class Config:
         """Pydantic config."""
@@ -183,7 +201,21 @@ class ServerSettings(BaseSettings):
 class SearchSettings(BaseSettings):
     """Configurations for searching archives."""
 
-    backend: str = "archeion.search.backends.ripgrep"
+    backend: str = "archeion.search.backends.sqlite.SQLiteSearchBackend"
+    field_boosts: Dict[str, float] = Field(
+        default_factory=lambda: {"title": 10.0, "tags": 5.0, "url": 2.0, "metadata": 2.0, "content": 1.0}
+    )
+
+    class Config:
+        """Pydantic config."""
+
+        extra = "allow"
+
+
+class KeywordSettings(BaseSettings):
+    """Configurations for extracting keywords from archived pages."""
+
+    extractor: Optional[str] = "archeion.post_processors.keywords.RakeExtractor"
 
     class Config:
         """Pydantic config."""
@@ -196,11 +228,25 @@ class Settings(BaseSettings):
 
     server_config: ServerSettings = Field(default_factory=ServerSettings)  # type: ignore[arg-type]
     search_config: SearchSettings = Field(default_factory=SearchSettings)
+    keyword_config: KeywordSettings = Field(default_factory=KeywordSettings)
     archive_root: Path
     artifact_storage: str
     artifact_storage_options: Dict[str, Any]
     timeout: int = Field(default=60, ge=15)
     media_timeout: int = Field(default=120, ge=15)
+    archive_concurrency: int = Field(default=4, ge=1)
+    browser_pool_size: int = Field(default=2, ge=1)
+    browser_single_page_load: bool = True
+    browser_content_types: List[str] = Field(default_factory=lambda: ["text/html", "application/xhtml+xml"])
+    probe_concurrency: int = Field(default=20, ge=1)
+    probe_per_host_concurrency: int = Field(default=2, ge=1)
+    probe_timeout: int = Field(default=10, ge=1)
+    post_process_workers: int = Field(default=1, ge=1)
+    post_process_chunk_size: int = Field(default=20, ge=1)
+    jsonld_context_cache_dir: Path
+    jsonld_context_ttl: int = Field(default=7 * 24 * 60 * 60, ge=0)
+    jsonld_offline: bool = False
+    search_index_path: Path
     dandelion_token: Optional[str] = None
     url_blacklist: Optional[Pattern]
     url_whitelist: Optional[Pattern]
@@ -208,6 +254,7 @@ class Settings(BaseSettings):
     archivers: List[ArchiverSettings]
     post_processors: List[ArchiverSettings]
     cache_url: str
+    keyword_cache_url: str
     database_url: str
     config_filename: str = CONFIG_FILENAME
     artifacts_dir_name: str = ARTIFACTS_DIR_NAME
@@ -268,6 +315,9 @@ def get_default_settings(archive_root: Optional[Path] = None) -> Settings:
     defaults["archive_root"] = archive_root
     defaults["secret_key"] = get_random_secret_key()
     defaults["artifact_storage_options"]["location"] = archive_root / ARTIFACTS_DIR_NAME
+    defaults["jsonld_context_cache_dir"] = archive_root / CACHE_DIR_NAME / "jsonld"
+    defaults["search_index_path"] = archive_root / "search.sqlite3"
+    defaults["keyword_cache_url"] = f"file://{archive_root / CACHE_DIR_NAME / 'keywords'}"
     defaults["database_url"] = f"sqlite:///{archive_root}/index.sqlite3?timeout=60&check_same_thread=false"
 
     if not archive_root.exists():
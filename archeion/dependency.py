@@ -42,6 +42,15 @@ def run_shell(
     return subprocess.run(args=command, **keyword_args)  # type: ignore[call-overload]
 
 
+async def run_shell_async(
+    command: Union[str, Sequence[str]], cwd: Optional[Union[str, Path]] = None, **kwargs
+) -> subprocess.CompletedProcess:
+    """Run a command in the shell from a worker thread, so it doesn't block the event loop."""
+    from asgiref.sync import sync_to_async
+
+    return await sync_to_async(run_shell, thread_sensitive=False)(command, cwd=cwd, **kwargs)
+
+
 @dataclass
 class DependencyConfig:
     """The dependency configuration."""
@@ -56,27 +65,31 @@ def get_dependency_info() -> Dict[str, DependencyConfig]:
     """
     Get the dependency information based on the archiver configuration.
 
+    Each tool is only probed the first time this is called; the results are cached by the plugin registry.
+
     Returns:
         A dictionary with the name
     """
-    return {}
-    # archivers = get_all_archivers()
-    # return {
-    #     archiver["name"]: DependencyConfig(
-    #         path=archiver["class"].tool_binary,
-    #         version=archiver["class"].tool_version,
-    #         enabled=archiver["enabled"],
-    #         valid=archiver["class"].is_valid,
-    #     )
-    #     if archiver["enabled"]
-    #     else DependencyConfig(
-    #         path="n/a",
-    #         version="n/a",
-    #         enabled=archiver["enabled"],
-    #         valid=False,
-    #     )
-    #     for archiver in archivers
-    # }
+    from archeion.archivers import get_all_archivers
+
+    return {
+        plugin.name: (
+            DependencyConfig(
+                path=str(plugin.tool_binary or "n/a"),
+                version=plugin.tool_version,
+                enabled=plugin.enabled,
+                valid=plugin.is_valid,
+            )
+            if plugin.enabled
+            else DependencyConfig(
+                path="n/a",
+                version="n/a",
+                enabled=plugin.enabled,
+                valid=False,
+            )
+        )
+        for plugin in get_all_archivers()
+    }
 
 
 def get_python_info() -> DependencyConfig:
@@ -9,7 +9,7 @@ from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
 from ..logging import format_size_in_bytes
-from .models import Artifact, Link, Tag
+from .models import ArchiveJob, Artifact, Link, Tag
 
 
 class ArtifactInline(admin.TabularInline):
@@ -76,8 +76,9 @@ class LinkAdmin(admin.ModelAdmin):
     inlines = [ArtifactInline]
     list_per_page = settings.ITEMS_PER_PAGE
 
-    @admin.display(description=_("archive_size"))
-    def archive_size_display(self, obj):
+    @admin.display(description=_("archive size"), ordering="archive_size")
+    def archive_size_display(self, obj: Link) -> str:
+        """Return the archive size in human-readable units."""
         return format_size_in_bytes(obj.archive_size)
 
 
@@ -87,9 +88,9 @@ class ArtifactAdmin(admin.ModelAdmin):
     Admin View for Artifact.
     """
 
-    list_display = ("id", "plugin_name", "link", "status", "output_path_link")
-    sort_fields = ("start_ts", "plugin_name", "status")
-    readonly_fields = ("id", "link", "plugin_name", "output_path", "status", "start_ts", "end_ts")
+    list_display = ("id", "plugin_name", "link", "status", "output_path_link", "size_display")
+    sort_fields = ("start_ts", "plugin_name", "status", "size")
+    readonly_fields = ("id", "link", "plugin_name", "output_path", "status", "start_ts", "end_ts", "size")
     search_fields = (
         "id",
         "link__url",
@@ -116,3 +117,23 @@ class ArtifactAdmin(admin.ModelAdmin):
             )
         else:
             return "No output"
+
+    @admin.display(description=_("size"), ordering="size")
+    def size_display(self, obj: Artifact) -> str:
+        """Return the size in human-readable units."""
+        return format_size_in_bytes(obj.size)
+
+
+@admin.register(ArchiveJob)
+class ArchiveJobAdmin(admin.ModelAdmin):
+    """
+    Admin View for ArchiveJob.
+    """
+
+    list_display = ("artifact", "priority", "attempts", "max_attempts", "available_at", "leased_by", "leased_until")
+    list_filter = ("leased_by", "available_at")
+    list_select_related = ("artifact__link",)
+    readonly_fields = ("id", "artifact", "lease_token", "leased_by", "leased_until", "last_error", "created_at")
+    search_fields = ("artifact__link__url", "artifact__plugin_name")
+    ordering = ["-priority", "available_at"]
+    list_per_page = settings.ITEMS_PER_PAGE
@@ -2,9 +2,12 @@
 
 from django import forms
 
-from archeion.archivers import get_archivers_map
+from archeion.archivers import get_archiver_names
 
-ARCHIVER_CHOICES = [(item, item) for item in get_archivers_map().keys()]
+
+def get_archiver_choices() -> list:
+    """Return the enabled archivers as form choices."""
+    return [(name, name) for name in get_archiver_names()]
 
 
 class AddLinkForm(forms.Form):
@@ -14,8 +17,8 @@ class AddLinkForm(forms.Form):
     archive_methods = forms.MultipleChoiceField(
         label="Archive methods",
         required=False,
-        choices=ARCHIVER_CHOICES,
-        initial=get_archivers_map().keys(),
+        choices=get_archiver_choices,
+        initial=get_archiver_names,
     )
     # TODO: hook these up to the view and put them
     # in a collapsible UI section labeled "Advanced"
@@ -13,15 +13,29 @@ class Command(BaseCommand):
     def add_arguments(self, parser: ArgumentParser) -> None:
         """Add the command's arguments to the parser."""
         parser.add_argument("url_or_file", nargs="+")
+        parser.add_argument(
+            "--queue", action="store_true", help="Queue the links for the archive_worker instead of archiving now."
+        )
+        parser.add_argument("--priority", type=int, default=0, help="The priority of queued links.")
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Add the links in batches, for large imports. Run finish_links afterwards to fill in their details.",
+        )
 
     def handle(self, *args, **options) -> None:
         """Add and archive some URLs."""
         from archeion.add import add_links
         from archeion.archive import archive_links
+        from archeion.index.models import Artifact, ArtifactStatus
+        from archeion.job_queue import enqueue_artifacts
         from archeion.post_process import post_process_links
 
         for url_or_file in options["url_or_file"]:
-            links = add_links(url_or_file)
-            if links:
+            links = add_links(url_or_file, bulk=options["bulk"])
+            if links and options["queue"]:
+                artifacts = Artifact.objects.filter(link__in=links, status=ArtifactStatus.PENDING)
+                enqueue_artifacts(artifacts, priority=options["priority"])
+            elif links:
                 archive_links(links)
                 post_process_links(links)
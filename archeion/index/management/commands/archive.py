@@ -2,7 +2,6 @@
 
 from argparse import ArgumentParser
 
-from asgiref.sync import async_to_sync
 from django.core.management.base import BaseCommand
 from django.db.models import Q
 
@@ -14,18 +13,18 @@ class Command(BaseCommand):
 
     help = "Archives any pending or failed Artifacts."
 
-    def __init__(self, *args, **kwargs):
-        from archeion.archivers import get_archivers_map
-
-        super().__init__(*args, **kwargs)
-        self.archivers = get_archivers_map()
-
     def add_arguments(self, parser: ArgumentParser) -> None:
         """Add the command's arguments to the parser."""
         parser.add_argument("--no-failed", action="store_true", help="Do not attempt failed artifacts.")
+        parser.add_argument(
+            "--queue", action="store_true", help="Queue the artifacts for the archive_worker instead of archiving now."
+        )
+        parser.add_argument("--priority", type=int, default=0, help="The priority of queued artifacts.")
 
     def handle(self, *args, **options) -> None:
         """Archives any pending or failed Artifacts."""
+        from archeion.archive import archive_artifacts
+        from archeion.job_queue import enqueue_artifacts
         from archeion.logging import info
 
         if options["no_failed"]:
@@ -33,17 +32,12 @@ class Command(BaseCommand):
             filter_query = Q(status=ArtifactStatus.PENDING)
         else:
             filter_query = Q(status=ArtifactStatus.FAILED) | Q(status=ArtifactStatus.PENDING)
-        artifacts = Artifact.objects.filter(filter_query).select_related("link")
-
-        info(f"Archiving {len(artifacts)} non-successful artifacts...")
-        for art in artifacts:
-            finished_artifact = self.archive(art)
-            finished_artifact.save()
+        artifacts = list(Artifact.objects.filter(filter_query).select_related("link"))
 
-    @async_to_sync
-    async def archive(self, artifact: Artifact) -> Artifact:
-        """Archive a single artifact."""
-        from archeion.logging import info
+        if options["queue"]:
+            info(f"Queueing {len(artifacts)} non-successful artifacts...")
+            enqueue_artifacts(artifacts, priority=options["priority"])
+            return
 
-        info(f"Archiving {artifact.link.url} with {artifact.plugin_name}...", left_indent=2)
-        return await self.archivers[artifact.plugin_name](artifact, False)
+        info(f"Archiving {len(artifacts)} non-successful artifacts...")
+        archive_artifacts(artifacts)
@@ -0,0 +1,70 @@
+"""Archive queued artifacts until stopped."""
+
+import signal
+from argparse import ArgumentParser
+from typing import Any, List
+
+from django.core.management.base import BaseCommand
+
+from archeion.index.models import ArchiveJob, ArtifactStatus, Link
+
+
+class Command(BaseCommand):
+    """Archive queued artifacts until stopped."""
+
+    help = "Archive queued artifacts until stopped. Run several workers to archive in parallel."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """Add the command's arguments to the parser."""
+        from archeion.job_queue import DEFAULT_LEASE_SECONDS
+
+        parser.add_argument("--batch-size", type=int, default=10, help="How many jobs to lease at a time.")
+        parser.add_argument(
+            "--lease-seconds",
+            type=int,
+            default=DEFAULT_LEASE_SECONDS,
+            help="How long the worker has to finish a batch before other workers may take it.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=5.0, help="How many seconds to wait when the queue is empty."
+        )
+        parser.add_argument("--worker-id", help="Identifies this worker. Defaults to the host name and process ID.")
+        parser.add_argument("--burst", action="store_true", help="Stop when the queue is empty.")
+        parser.add_argument("--post-process", action="store_true", help="Post-process links after archiving them.")
+
+    def handle(self, *args, **options) -> None:
+        """Run the worker."""
+        from archeion.job_queue import run_worker
+        from archeion.logging import info
+
+        stopping = False
+
+        def stop(signum: int, frame: Any) -> None:
+            nonlocal stopping
+            info("Stopping after the current link...")
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        run_worker(
+            worker_id=options["worker_id"],
+            batch_size=options["batch_size"],
+            lease_seconds=options["lease_seconds"],
+            poll_interval=options["poll_interval"],
+            burst=options["burst"],
+            should_stop=lambda: stopping,
+            on_batch=post_process_jobs if options["post_process"] else None,
+        )
+
+
+def post_process_jobs(jobs: List[ArchiveJob]) -> None:
+    """Post-process the links whose DOM was archived in this batch."""
+    from archeion.post_process import post_process_links
+
+    link_ids = {job.artifact.link_id for job in jobs}
+    links = Link.objects.filter(
+        id__in=link_ids, artifacts__status=ArtifactStatus.SUCCEEDED, artifacts__plugin_name="DOM"
+    )
+    if links:
+        post_process_links(links)
@@ -0,0 +1,32 @@
+"""Deduplicate the artifact storage and remove unused blobs."""
+
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Deduplicate the artifact storage and remove unused blobs."""
+
+    help = "Deduplicate the files in a content-addressed artifact storage, and remove the blobs no file uses."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """Add the command's arguments to the parser."""
+        parser.add_argument("--gc-only", action="store_true", help="Only remove the unused blobs.")
+
+    def handle(self, *args, **options) -> None:
+        """Run the command."""
+        from archeion.index.storage import ContentAddressedStorage, get_artifact_storage
+        from archeion.logging import error, format_size_in_bytes, info, success
+
+        storage = get_artifact_storage()
+        if not isinstance(storage, ContentAddressedStorage):
+            error("The artifact storage is not a ContentAddressedStorage.")
+            return
+
+        if not options["gc_only"]:
+            info("Deduplicating artifacts...")
+            success(f"Freed {format_size_in_bytes(storage.deduplicate())} by deduplicating.", left_indent=2)
+
+        info("Removing unused blobs...")
+        success(f"Freed {format_size_in_bytes(storage.collect_garbage())} of unused blobs.", left_indent=2)
@@ -0,0 +1,23 @@
+"""Fill in the details of links that were added in bulk."""
+
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Fill in the details of links that were added in bulk."""
+
+    help = "Look up the content type and write the index file of links that were added in bulk."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """Add the command's arguments to the parser."""
+        pass
+
+    def handle(self, *args, **options) -> None:
+        """Run the command."""
+        from archeion.add import finish_links
+        from archeion.logging import success
+
+        count = finish_links()
+        success(f"Finished {count} links.")
@@ -1,11 +1,10 @@
 """Run post-processing methods on all DOM artifacts."""
 
-from typing import Any
+from argparse import ArgumentParser
 
 from django.core.management.base import BaseCommand
 
-from archeion.index.models import ArtifactStatus, Link
-from archeion.post_process import post_process_links
+from archeion.post_process import get_links_with_dom, post_process_links
 
 
 class Command(BaseCommand):
@@ -13,20 +12,29 @@ class Command(BaseCommand):
 
     help = "Post-process DOM artifacts."
 
-    def __init__(self, *args, **kwargs):
-        from archeion.archivers import get_archivers_map
-
-        super().__init__(*args, **kwargs)
-        self.archivers = get_archivers_map()
-
-    def add_arguments(self, parser: Any) -> None:
+    def add_arguments(self, parser: ArgumentParser) -> None:
         """Add the command's arguments to the parser."""
-        pass
+        parser.add_argument("--overwrite", action="store_true", help="Redo links that were already post-processed.")
+        parser.add_argument(
+            "--changed-only",
+            action="store_true",
+            help="Also redo links whose DOM or post-processor version changed since they were post-processed.",
+        )
+        parser.add_argument(
+            "--workers", type=int, help="How many processes to post-process in. Defaults to post_process_workers."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="How many links to send to a worker and save at a time. Defaults to post_process_chunk_size.",
+        )
 
     def handle(self, *args, **options) -> None:
         """Run the command."""
-        from archeion.logging import info
-
-        links = Link.objects.filter(artifacts__status=ArtifactStatus.SUCCEEDED, artifacts__plugin_name="DOM")
-        info(f"Post-processing {len(links)} links...")
-        post_process_links(links)
+        post_process_links(
+            get_links_with_dom(),
+            overwrite=options["overwrite"],
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            changed_only=options["changed_only"],
+        )
@@ -0,0 +1,29 @@
+"""Rebuild the search index from every link."""
+
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+from archeion.search import REINDEX_BATCH_SIZE, reindex_links
+
+
+class Command(BaseCommand):
+    """Rebuild the search index."""
+
+    help = "Rebuild the search index from every link."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """Add the command's arguments to the parser."""
+        parser.add_argument(
+            "--resume", action="store_true", help="Continue an interrupted rebuild instead of starting over."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REINDEX_BATCH_SIZE,
+            help=f"How many links to read and index at a time. Defaults to {REINDEX_BATCH_SIZE}.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run the command."""
+        reindex_links(resume=options["resume"], batch_size=options["batch_size"])
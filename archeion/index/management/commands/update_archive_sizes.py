@@ -0,0 +1,31 @@
+"""Measure the artifacts in the archive storage and total the archive size of each link."""
+
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Measure the artifacts in the archive storage and total the archive size of each link."""
+
+    help = (
+        "Measure every artifact in the archive storage and total the archive size of each link. "
+        "Sizes are recorded as artifacts are saved, so this is only needed for links archived before that."
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """Add the command's arguments to the parser."""
+        pass
+
+    def handle(self, *args, **options) -> None:
+        """Run the command."""
+        from django.db.models import Sum
+
+        from archeion.index.model_functions import update_archive_sizes
+        from archeion.index.models import Link
+        from archeion.logging import format_size_in_bytes, info, success
+
+        info("Measuring artifacts...")
+        count = update_archive_sizes()
+        total = Link.objects.aggregate(total=Sum("archive_size"))["total"] or 0
+        success(f"Updated {count} links, taking up {format_size_in_bytes(total)}.", left_indent=2)
@@ -0,0 +1,127 @@
+# Generated by Django 4.2.3 on 2026-10-17 19:17
+
+import django.db.models.deletion
+import django.utils.timezone
+import shortuuid.django_fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("index", "0002_artifact_extracted_from"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchiveJob",
+            fields=[
+                (
+                    "id",
+                    shortuuid.django_fields.ShortUUIDField(
+                        alphabet=None,
+                        editable=False,
+                        length=22,
+                        max_length=22,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="id",
+                    ),
+                ),
+                (
+                    "priority",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Jobs with higher priorities run first.",
+                        verbose_name="priority",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The number of failed attempts so far.",
+                        verbose_name="attempts",
+                    ),
+                ),
+                (
+                    "max_attempts",
+                    models.PositiveIntegerField(
+                        default=5,
+                        help_text="The number of attempts before the job is given up on.",
+                        verbose_name="max attempts",
+                    ),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="The job will not be leased before this time.",
+                        verbose_name="available at",
+                    ),
+                ),
+                (
+                    "lease_token",
+                    models.CharField(
+                        blank=True,
+                        help_text="Identifies the lease currently holding this job.",
+                        max_length=36,
+                        null=True,
+                        verbose_name="lease token",
+                    ),
+                ),
+                (
+                    "leased_by",
+                    models.CharField(
+                        blank=True,
+                        help_text="The worker holding the lease.",
+                        max_length=255,
+                        null=True,
+                        verbose_name="leased by",
+                    ),
+                ),
+                (
+                    "leased_until",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="The lease expires at this time.",
+                        null=True,
+                        verbose_name="leased until",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="The error from the last failed attempt.",
+                        verbose_name="last error",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="The date and time this job was queued.",
+                        verbose_name="created at",
+                    ),
+                ),
+                (
+                    "artifact",
+                    models.OneToOneField(
+                        help_text="The artifact to archive.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="job",
+                        to="index.artifact",
+                        verbose_name="artifact",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archive job",
+                "verbose_name_plural": "Archive jobs",
+                "ordering": ["-priority", "available_at"],
+                "indexes": [models.Index(fields=["-priority", "available_at"], name="archivejob_next_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.3 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("index", "0003_archivejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artifact",
+            name="processor_version",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The version of the post-processor that generated this artifact.",
+                max_length=32,
+                verbose_name="processor version",
+            ),
+        ),
+        migrations.AddField(
+            model_name="artifact",
+            name="source_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The SHA-256 hash of the artifact this artifact was generated from.",
+                max_length=64,
+                verbose_name="source hash",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.3 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("index", "0004_artifact_source_hash_processor_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artifact",
+            name="size",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                default=0,
+                editable=False,
+                help_text="The number of bytes the artifact's files take up in the archive storage.",
+                verbose_name="size",
+            ),
+        ),
+        migrations.AddField(
+            model_name="link",
+            name="archive_size",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                default=0,
+                editable=False,
+                help_text="The number of bytes the link's artifacts take up in the archive storage.",
+                verbose_name="archive size",
+            ),
+        ),
+    ]
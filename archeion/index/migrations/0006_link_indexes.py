@@ -0,0 +1,33 @@
+# Generated by Django 4.2.3 on 2026-10-17 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("index", "0005_archive_sizes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["title"], name="link_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["created_at", "id"], name="link_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["url", "id"], name="link_url_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["content_type", "created_at"], name="link_content_type_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["ld_type", "created_at"], name="link_ld_type_idx"),
+        ),
+    ]
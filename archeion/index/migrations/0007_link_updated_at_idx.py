@@ -0,0 +1,17 @@
+# Generated by Django 4.2.3 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("index", "0006_link_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["updated_at"], name="link_updated_at_idx"),
+        ),
+    ]
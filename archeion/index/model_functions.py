@@ -1,13 +1,60 @@
 """Functions that provide service to one or more models."""
 
-from archeion.index.models import ArtifactStatus, Link
+import atexit
+import contextlib
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from io import StringIO
+from typing import ContextManager, Dict, Generator, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.storage import Storage
+from django.db.models import Count, Max, QuerySet
+
+from archeion.index.models import Artifact, ArtifactStatus, Link, artifact_sizes_total
 from archeion.index.storage import get_artifact_storage
+from archeion.logging import error
 
+INDEXED_PLUGINS = ("DOM", "html_metadata", "markdown")
+"""The artifacts whose content is indexed for search."""
+
+MAX_INDEXED_BYTES = 10 * 1024 * 1024
+"""The most bytes of each artifact that are indexed for search."""
+
+LINK_DATA_FLUSH_INTERVAL = 30
+"""The longest time, in seconds, a deferred ``index.yaml`` write waits before it is flushed."""
+
+LINK_DATA_BATCH_SIZE = 200
+"""The number of deferred ``index.yaml`` writes that triggers a flush."""
+
+LINK_DATA_DIGEST_CACHE_SIZE = 10_000
+"""The number of recently written ``index.yaml`` files whose content is remembered, to skip unchanged writes."""
+
+ARCHIVE_SIZE_BATCH_SIZE = 500
+"""The number of artifact sizes updated per query by ``update_archive_sizes``."""
+
+LINK_CHOICE_FIELDS = ("content_type", "ld_type")
+"""The link fields whose distinct values are offered as filter choices."""
+
+LINK_CHOICES_TIMEOUT = 60 * 60
+"""The number of seconds the filter choices of a version of the links are cached."""
 
-def save_link_data(obj: Link) -> None:
-    """Serialize a link record into a YAML file."""
-    from io import StringIO
 
+def serialize_link_data(obj: Link) -> Tuple[str, str]:
+    """
+    Serialize a link record into YAML.
+
+    Args:
+        obj: The link to serialize
+
+    Returns:
+        The YAML, and a digest of everything in it except the ``updated_at`` timestamp, which
+        changes on every save.
+    """
     import yaml
     from django.core.serializers.python import Serializer
 
@@ -38,36 +85,318 @@ def save_link_data(obj: Link) -> None:
     data["id"] = obj.id
     data["parsed_url"] = tuple(obj.parsed_url)
     data["tags"] = [tag.name for tag in obj.tags.all()]
-    stream = StringIO()
-    yaml.dump(data, stream, Dumper=SafeDumper, allow_unicode=True)
-    storage = get_artifact_storage()
-    filename = f"{obj.archive_path}/index.yaml"
-    if storage.exists(filename):
-        storage.delete(filename)
-    storage.save(filename, stream)
+    content = yaml.dump(data, Dumper=SafeDumper, allow_unicode=True)
 
+    data.pop("updated_at", None)
+    digest = hashlib.sha1(yaml.dump(data, Dumper=SafeDumper).encode(), usedforsecurity=False).hexdigest()
+    return content, digest
 
-def index_link_data(link: Link) -> None:
-    """Index the link data."""
-    from io import StringIO
 
+class DeferredLinkData:
+    """The ``index.yaml`` writes a thread has deferred."""
+
+    def __init__(self):
+        self.depth = 0
+        self.pending: Dict[str, Link] = {}
+        self.timer: Optional[threading.Timer] = None
+
+
+def get_file_stamp(storage: Storage, filename: str) -> Optional[Tuple[datetime, int]]:
+    """Return the modification time and size of a stored file, or ``None`` if it doesn't exist."""
+    try:
+        return storage.get_modified_time(filename), storage.size(filename)
+    except (OSError, NotImplementedError):
+        return None
+
+
+class LinkDataWriter:
+    """
+    Writes the ``index.yaml`` files of links, skipping files whose content hasn't changed.
+
+    Inside ``deferred()``, writes are queued instead, so a link saved several times is only
+    written once. Each thread has its own queue, so deferring in one thread doesn't delay the
+    writes of the others. A queue is flushed when its thread's outermost ``deferred()`` block
+    exits, once it is big enough, by a timer once its oldest write has waited ``flush_interval``
+    seconds, or when the process exits.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = LINK_DATA_FLUSH_INTERVAL,
+        batch_size: int = LINK_DATA_BATCH_SIZE,
+        digest_cache_size: int = LINK_DATA_DIGEST_CACHE_SIZE,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.digest_cache_size = digest_cache_size
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._queues: "weakref.WeakSet[DeferredLinkData]" = weakref.WeakSet()
+        self._digests: OrderedDict = OrderedDict()
+
+    @property
+    def queue(self) -> DeferredLinkData:
+        """The deferred writes of the current thread."""
+        queue = getattr(self._local, "queue", None)
+        if queue is None:
+            queue = self._local.queue = DeferredLinkData()
+            with self._lock:
+                self._queues.add(queue)
+        return queue
+
+    def save(self, link: Link) -> None:
+        """Write the link's ``index.yaml`` now, or queue it when deferred."""
+        queue = self.queue
+        if not queue.depth:
+            self.write(link)
+            return
+
+        with self._lock:
+            queue.pending[link.archive_path] = link
+            is_full = len(queue.pending) >= self.batch_size
+            if not is_full and queue.timer is None:
+                queue.timer = threading.Timer(self.flush_interval, self._flush_on_timer, args=(queue,))
+                queue.timer.daemon = True
+                queue.timer.start()
+        if is_full:
+            self.flush_queue(queue)
+
+    def write(self, link: Link) -> bool:
+        """
+        Write the link's ``index.yaml``, unless the file already has the same content.
+
+        Args:
+            link: The link to write
+
+        Returns:
+            ``True`` if the file was written
+        """
+        content, digest = serialize_link_data(link)
+        storage = get_artifact_storage()
+        filename = f"{link.archive_path}/index.yaml"
+        with self._lock:
+            # Another process may have written the file since, so its digest only counts if it wasn't touched
+            stamp = get_file_stamp(storage, filename)
+            if stamp is not None and self._digests.get(filename) == (digest, stamp):
+                self._digests.move_to_end(filename)
+                return False
+            if stamp is not None:
+                storage.delete(filename)
+            storage.save(filename, StringIO(content))
+            self._digests[filename] = (digest, get_file_stamp(storage, filename))
+            self._digests.move_to_end(filename)
+            while len(self._digests) > self.digest_cache_size:
+                self._digests.popitem(last=False)
+        return True
+
+    def flush_queue(self, queue: DeferredLinkData) -> int:
+        """
+        Write the links queued by one thread.
+
+        Returns:
+            The number of files written
+        """
+        with self._lock:
+            pending = list(queue.pending.values())
+            queue.pending.clear()
+            if queue.timer is not None:
+                queue.timer.cancel()
+                queue.timer = None
+
+        written = 0
+        for link in pending:
+            try:
+                written += self.write(link)
+            except (SuspiciousOperation, ValueError) as e:
+                error(f"Failed to save link data. {e}")
+        return written
+
+    def flush(self) -> int:
+        """
+        Write the links queued by every thread.
+
+        Returns:
+            The number of files written
+        """
+        with self._lock:
+            queues = list(self._queues)
+        return sum(self.flush_queue(queue) for queue in queues)
+
+    def _flush_on_timer(self, queue: DeferredLinkData) -> None:
+        """Write a queue whose oldest write has waited long enough, from the timer's thread."""
+        from django.db import connections
+
+        try:
+            self.flush_queue(queue)
+        finally:
+            # Reading the links' tags opened a connection for this thread
+            connections.close_all()
+
+    def forget(self, link: Link) -> None:
+        """Drop any queued write and remembered content for a link, for example when it is deleted."""
+        with self._lock:
+            for queue in self._queues:
+                queue.pending.pop(link.archive_path, None)
+            self._digests.pop(f"{link.archive_path}/index.yaml", None)
+
+    @contextlib.contextmanager
+    def deferred(self) -> Generator[None, None, None]:
+        """Queue the writes the current thread makes inside the block, and flush them at the end."""
+        queue = self.queue
+        queue.depth += 1
+        try:
+            yield
+        finally:
+            queue.depth -= 1
+            if not queue.depth:
+                self.flush_queue(queue)
+
+
+link_data_writer = LinkDataWriter()
+atexit.register(link_data_writer.flush)
+
+
+def save_link_data(obj: Link) -> None:
+    """Serialize a link record into a YAML file, or queue it inside ``defer_link_data()``."""
+    link_data_writer.save(obj)
+
+
+def defer_link_data() -> ContextManager[None]:
+    """Coalesce the ``index.yaml`` writes made inside the block, and write them at the end of it."""
+    return link_data_writer.deferred()
+
+
+def index_link_data(link: Link) -> None:
+    """Index the link data, replacing what was indexed for the link before."""
     from archeion.search import index
 
-    artifacts = link.artifacts.filter(status=ArtifactStatus.SUCCEEDED).filter(
-        plugin_name__in=("DOM", "headers", "html_metadata", "markdown")
-    )
-    artifact_map = {artifact.plugin_name: artifact for artifact in artifacts}
-    content = StringIO()
-    content.write(f"{link.title or ''}\n")
-    tags = link.tags.values_list("name", flat=True)
-    if tags:
-        content.write(f"Tags: {', '.join(tags)}\n")
-    content.write(f"URL: {link.url}\n")
-    if "html_metadata" in artifact_map:
-        content.write(f"{artifact_map['html_metadata'].content}\n")
+    index(*get_link_search_document(link))
+
+
+def get_link_search_document(link: Link) -> Tuple[str, str, Dict[str, str]]:
+    """
+    Return what is indexed for a link.
+
+    The link's artifacts and tags are read with ``.all()``, so they can be prefetched.
+
+    Args:
+        link: The link to index
+
+    Returns:
+        The link's ID, content and other search fields
+    """
+    artifact_map = {
+        artifact.plugin_name: artifact
+        for artifact in link.artifacts.all()
+        if artifact.status == ArtifactStatus.SUCCEEDED and artifact.plugin_name in INDEXED_PLUGINS
+    }
+    fields = {
+        "title": link.title or "",
+        "tags": ", ".join(tag.name for tag in link.tags.all()),
+        "url": link.url,
+        "metadata": read_artifact_text(artifact_map["html_metadata"]) if "html_metadata" in artifact_map else "",
+    }
     if "markdown" in artifact_map:
-        content.write(f"{artifact_map['markdown'].content}\n")
+        content = read_artifact_text(artifact_map["markdown"])
     elif "DOM" in artifact_map:
-        content.write(f"{artifact_map['DOM'].content}\n")
+        content = read_artifact_text(artifact_map["DOM"])
+    else:
+        content = ""
+
+    return link.id, content, fields
+
+
+def read_artifact_text(artifact: Artifact, max_bytes: int = MAX_INDEXED_BYTES) -> str:
+    """
+    Return the start of the content of a text artifact.
+
+    Args:
+        artifact: The artifact to read
+        max_bytes: The most bytes to read, so large artifacts aren't read into memory whole
+
+    Returns:
+        The text, or an empty string if the artifact's file is missing
+    """
+    try:
+        with artifact.open("rb") as f:
+            content = f.read(max_bytes)
+    except FileNotFoundError:
+        return ""
+    return content.decode("utf8", errors="ignore")
+
+
+def update_archive_sizes(links: Optional[QuerySet] = None, batch_size: int = ARCHIVE_SIZE_BATCH_SIZE) -> int:
+    """
+    Measure the artifacts of links in the archive storage again, and total each link's archive size.
+
+    Sizes are recorded when artifacts are saved, so this is only needed for links archived before
+    that, or whose files were changed outside of Archeion.
+
+    Args:
+        links: The links to measure. Defaults to every link.
+        batch_size: The number of artifact sizes updated per query
+
+    Returns:
+        The number of links updated
+    """
+    links = Link.objects.all() if links is None else links
+    artifacts = Artifact.objects.filter(link__in=links).select_related("link").order_by()
+    changed = []
+    for artifact in artifacts.iterator(chunk_size=batch_size):
+        size = artifact.get_storage_size()
+        if size != artifact.size:
+            artifact.size = size
+            changed.append(artifact)
+        if len(changed) >= batch_size:
+            Artifact.objects.bulk_update(changed, ["size"])
+            changed = []
+    if changed:
+        Artifact.objects.bulk_update(changed, ["size"])
+    return links.update(archive_size=artifact_sizes_total())
+
+
+def get_link_field_choices(field_name: str, version: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Return the distinct values of a link field, as choices for filtering the links.
+
+    The choices are cached by the version of the links, so the whole table isn't scanned for every
+    page of links, and every process sees the new choices once a link is added, saved or deleted.
+
+    Args:
+        field_name: One of the ``LINK_CHOICE_FIELDS``
+        version: The version of the links, if it was already read from ``get_links_version``
+
+    Returns:
+        The values, sorted, as ``(value, label)`` pairs
+    """
+
+    def get_choices() -> List[Tuple[str, str]]:
+        values = (
+            Link.objects.exclude(**{f"{field_name}__isnull": True})
+            .exclude(**{field_name: ""})
+            .order_by(field_name)
+            .values_list(field_name, flat=True)
+            .distinct()
+        )
+        return [(value, value) for value in values]
+
+    version = version or get_links_version()
+    return cache.get_or_set(f"link-choices:{field_name}:{version}", get_choices, timeout=LINK_CHOICES_TIMEOUT)
+
+
+def get_links_version() -> str:
+    """Return a value that changes when links are added, saved or deleted, read from the indexes."""
+    version = Link.objects.aggregate(count=Count("pk"), updated_at=Max("updated_at"))
+    updated_at = version["updated_at"].timestamp() if version["updated_at"] else 0
+    return f"{version['count']}:{updated_at}"
+
+
+def clear_link_field_choices() -> None:
+    """
+    Forget the cached filter choices, so they are read again from the links.
 
-    index(link.id, content.getvalue())
+    Call this after changing links without saving them, such as with ``QuerySet.update``, which
+    doesn't change their version.
+    """
+    version = get_links_version()
+    cache.delete_many([f"link-choices:{field_name}:{version}" for field_name in LINK_CHOICE_FIELDS])
@@ -2,17 +2,17 @@
 
 import contextlib
 import os
-from typing import Any, Union
+from typing import Any, AsyncIterator, Iterator, Optional, Union
 from urllib.parse import urlparse
 
-import httpx
-from django.core.cache import cache
 from django.core.exceptions import SuspiciousOperation
+from django.core.files import File
 from django.db import models
-from django.db.models import F
-from django.db.models.signals import m2m_changed
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.urls import reverse
-from django.utils.functional import cached_property
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.fields import AutoSlugField
 from shortuuid.django_fields import ShortUUIDField
@@ -140,6 +140,14 @@ class Link(models.Model):
     metadata = models.JSONField(
         _("metadata"), encoder=IterableEncoder, null=False, blank=True, default=dict, help_text=_("Metadata ")
     )
+    archive_size = models.PositiveBigIntegerField(
+        _("archive size"),
+        null=False,
+        blank=True,
+        default=0,
+        editable=False,
+        help_text=_("The number of bytes the link's artifacts take up in the archive storage."),
+    )
     created_at = models.DateTimeField(
         _("created at"),
         null=False,
@@ -161,6 +169,14 @@ class Link(models.Model):
         verbose_name = _("Link")
         verbose_name_plural = _("Links")
         ordering = ["title"]
+        indexes = [
+            models.Index(fields=["title"], name="link_title_idx"),
+            models.Index(fields=["created_at", "id"], name="link_created_at_idx"),
+            models.Index(fields=["url", "id"], name="link_url_idx"),
+            models.Index(fields=["content_type", "created_at"], name="link_content_type_idx"),
+            models.Index(fields=["ld_type", "created_at"], name="link_ld_type_idx"),
+            models.Index(fields=["updated_at"], name="link_updated_at_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title or self.url
@@ -171,18 +187,33 @@ class Link(models.Model):
 
     def save(self, *args, **kwargs) -> None:
         """
-        Describe why you are overriding the save method here.
+        Fill in the derived fields, and write the link's ``index.yaml`` once the record is saved.
         """
         from archeion.index.model_functions import save_link_data
 
+        self.set_derived_fields()
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # The artifacts keep the archive size up to date, so a copy loaded earlier must not overwrite it
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "archive_size"
+            ]
+        super().save(*args, **kwargs)
+        try:
+            save_link_data(self)
+        except (SuspiciousOperation, ValueError) as e:
+            error(f"Failed to save link data. {e}")
+
+    def set_derived_fields(self) -> None:
+        """
+        Fill in the fields computed from the URL.
+
+        ``save`` does this, but links created with ``bulk_create`` must call it first.
+        """
         if not self.parsed_url:
             self.parsed_url = urlparse(self.url)
 
-        if self.content_type is None:
-            with contextlib.suppress(httpx.ConnectError, httpx.ConnectTimeout):
-                result = httpx.head(self.url, follow_redirects=True)
-                self.content_type = result.headers["Content-Type"] if result.status_code == 200 else None
-
         if not self.archive_path:
             self.archive_path = self.id
 
@@ -191,32 +222,25 @@ class Link(models.Model):
 
         if not self.favicon_url:
             self.favicon_url = f"https://www.google.com/s2/favicons?domain={self.parsed_url.netloc}"
-        try:
-            save_link_data(self)
-        except (SuspiciousOperation, ValueError) as e:
-            error(f"Failed to save link data. {e}")
-        super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs) -> None:
         """Delete the link and its artifacts."""
+        from archeion.index.model_functions import link_data_writer
+
+        link_data_writer.forget(self)
         storage = get_artifact_storage()
         for artifact in self.artifacts.all():
-            artifact.delete()
+            artifact.delete(update_search_index=False)
         if storage.exists(f"{self.archive_path}/index.yaml"):
             storage.delete(f"{self.archive_path}/index.yaml")
         if storage.exists(self.archive_path):
             storage.delete(self.archive_path)
         super().delete(*args, **kwargs)
 
-    @cached_property
-    def archive_size(self) -> int:
-        """Calculate the total amount of storage taken up by the archive."""
-        cache_key = f"{str(self.id)[:12]}-{(self.updated_at or self.created_at).timestamp()}-size"
-
-        def calc_dir_size() -> int:
-            return get_dir_size(storage=get_artifact_storage(), path=self.archive_path)
-
-        return cache.get_or_set(cache_key, calc_dir_size)
+    def update_archive_size(self) -> None:
+        """Total the sizes of the link's artifacts again."""
+        Link.objects.filter(pk=self.pk).update(archive_size=artifact_sizes_total())
+        self.archive_size = Link.objects.values_list("archive_size", flat=True).get(pk=self.pk)
 
     def update_metadata(self, new_metadata: dict) -> None:
         """Update the link's metadata."""
@@ -244,6 +268,10 @@ class ArtifactStatus(models.TextChoices):
     SKIPPED = "skipped", _("skipped")
 
 
+FINISHED_STATUSES = frozenset({ArtifactStatus.SUCCEEDED, ArtifactStatus.FAILED, ArtifactStatus.SKIPPED})
+"""The statuses of artifacts whose archive process is over, so their files may have changed."""
+
+
 class Artifact(models.Model):
     """
     An archived artifact.
@@ -305,6 +333,35 @@ class Artifact(models.Model):
     end_ts = models.DateTimeField(
         _("end timestamp"), null=True, blank=True, help_text=_("The end time of the archive process.")
     )
+    source_hash = models.CharField(
+        _("source hash"),
+        max_length=64,
+        null=False,
+        blank=True,
+        default="",
+        help_text=_("The SHA-256 hash of the artifact this artifact was generated from."),
+    )
+    processor_version = models.CharField(
+        _("processor version"),
+        max_length=32,
+        null=False,
+        blank=True,
+        default="",
+        help_text=_("The version of the post-processor that generated this artifact."),
+    )
+    size = models.PositiveBigIntegerField(
+        _("size"),
+        null=False,
+        blank=True,
+        default=0,
+        editable=False,
+        help_text=_("The number of bytes the artifact's files take up in the archive storage."),
+    )
+
+    _stored_size: Optional[int] = 0
+    """The size saved in the database, so the link's archive size can be changed by the difference."""
+    _stored_output_path: Optional[str] = None
+    """The output path saved in the database, to know if the artifact's files moved."""
 
     class Meta:
         verbose_name = _("Artifact")
@@ -316,11 +373,64 @@ class Artifact(models.Model):
     def __str__(self) -> str:
         return self.plugin_name
 
-    def delete(self, using: Any = None, keep_parents: bool = False) -> None:
-        """Clean up the files when deleting the artifact."""
+    @classmethod
+    def from_db(cls, db: str, field_names: list, values: list) -> "Artifact":
+        """Remember the size and output path that were loaded, to know what changed when the artifact is saved."""
+        instance = super().from_db(db, field_names, values)
+        instance._stored_size = instance.__dict__.get("size")
+        instance._stored_output_path = instance.__dict__.get("output_path")
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Measure the artifact's files, if they may have changed, and add the difference to the archive size of its link.
+
+        The files are measured when the archive process is over, or when the output path changed, so
+        saving a pending artifact doesn't touch the storage.
+        """
+        moved = self._stored_output_path is not None and self.output_path != self._stored_output_path
+        if self.status in FINISHED_STATUSES or moved:
+            self.size = self.get_storage_size()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "size"}
+        super().save(*args, **kwargs)
+        self._stored_output_path = self.output_path
+        self.update_link_archive_size(self.size)
+
+    def update_link_archive_size(self, size: int) -> None:
+        """Change the archive size of the link by the difference between ``size`` and the stored size."""
+        if self._stored_size is None:  # The size wasn't loaded, so the difference isn't known
+            self.link.update_archive_size()
+        elif size != self._stored_size:
+            Link.objects.filter(pk=self.link_id).update(archive_size=F("archive_size") + size - self._stored_size)
+        self._stored_size = size
+
+    def get_storage_size(self) -> int:
+        """Return the number of bytes the artifact's file, or directory, takes up in the archive storage."""
+        if not self.output_path:
+            return 0
+        storage = get_artifact_storage()
+        path = self.archive_output_path
+        if not storage.exists(path):
+            return 0
+        try:
+            return get_dir_size(storage=storage, path=path)
+        except (NotADirectoryError, FileNotFoundError):  # Compressed files only exist under another name
+            return storage.size(path)
+
+    def delete(self, using: Any = None, keep_parents: bool = False, update_search_index: bool = True) -> None:
+        """Clean up the files when deleting the artifact, and re-index its link if it was indexed."""
+        from archeion.index.model_functions import INDEXED_PLUGINS, index_link_data
+
         with contextlib.suppress(FileNotFoundError):
             get_artifact_storage().delete(self.archive_output_path)
         super().delete(using=using, keep_parents=keep_parents)
+        self.update_link_archive_size(0)
+
+        if update_search_index and self.plugin_name in INDEXED_PLUGINS:
+            # The search backend logs why it couldn't be loaded
+            with contextlib.suppress(ImportError):
+                index_link_data(self.link)
 
     def get_absolute_url(self) -> str:
         """Return the absolute URL of the artifact."""
@@ -333,16 +443,124 @@ class Artifact(models.Model):
 
     @property
     def content(self) -> Union[str, bytes]:
-        """Return the content of the artifact."""
+        """
+        Return the whole content of the artifact.
+
+        This reads the file into memory. Use ``open`` or ``chunks`` for artifacts that may be large.
+        """
         import mimetypes
 
         mtype = mimetypes.guess_type(self.archive_output_path)[0]
         is_text = mtype and mtype.startswith("text/")
         mode = "r" if is_text else "rb"
 
-        with get_artifact_storage().open(self.archive_output_path, mode) as f:
+        with self.open(mode) as f:
             return f.read()
 
+    def open(self, mode: str = "rb") -> File:
+        """Open the artifact's file from the artifact storage. Use it as a context manager to close it."""
+        return get_artifact_storage().open(self.archive_output_path, mode)
+
+    def chunks(self, chunk_size: int = File.DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Read the artifact's file a chunk at a time, closing it once it is read."""
+        with self.open() as f:
+            yield from f.chunks(chunk_size)
+
+    async def achunks(self, chunk_size: int = File.DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Read the artifact's file a chunk at a time without blocking the event loop, for ASGI responses."""
+        from asgiref.sync import sync_to_async
+
+        f = await sync_to_async(self.open)()
+        try:
+            while chunk := await sync_to_async(f.read, thread_sensitive=False)(chunk_size):
+                yield chunk
+        finally:
+            await sync_to_async(f.close, thread_sensitive=False)()
+
+
+class ArchiveJob(models.Model):
+    """
+    A queued request to archive an artifact.
+
+    Workers lease jobs for a limited time. A job whose lease runs out, because its worker
+    died, becomes available to other workers again.
+    """
+
+    id = ShortUUIDField(
+        _("id"),
+        null=False,
+        blank=False,
+        editable=False,
+        primary_key=True,
+    )
+    artifact = models.OneToOneField(
+        Artifact,
+        verbose_name=_("artifact"),
+        related_name="job",
+        on_delete=models.CASCADE,
+        null=False,
+        blank=False,
+        help_text=_("The artifact to archive."),
+    )
+    priority = models.IntegerField(
+        _("priority"), null=False, blank=False, default=0, help_text=_("Jobs with higher priorities run first.")
+    )
+    attempts = models.PositiveIntegerField(
+        _("attempts"), null=False, blank=False, default=0, help_text=_("The number of failed attempts so far.")
+    )
+    max_attempts = models.PositiveIntegerField(
+        _("max attempts"),
+        null=False,
+        blank=False,
+        default=5,
+        help_text=_("The number of attempts before the job is given up on."),
+    )
+    available_at = models.DateTimeField(
+        _("available at"),
+        null=False,
+        blank=False,
+        default=timezone.now,
+        help_text=_("The job will not be leased before this time."),
+    )
+    lease_token = models.CharField(
+        _("lease token"),
+        max_length=36,
+        null=True,
+        blank=True,
+        help_text=_("Identifies the lease currently holding this job."),
+    )
+    leased_by = models.CharField(
+        _("leased by"), max_length=255, null=True, blank=True, help_text=_("The worker holding the lease.")
+    )
+    leased_until = models.DateTimeField(
+        _("leased until"), null=True, blank=True, help_text=_("The lease expires at this time.")
+    )
+    last_error = models.TextField(
+        _("last error"), null=False, blank=True, default="", help_text=_("The error from the last failed attempt.")
+    )
+    created_at = models.DateTimeField(
+        _("created at"),
+        null=False,
+        blank=False,
+        auto_now_add=True,
+        editable=False,
+        help_text=_("The date and time this job was queued."),
+    )
+
+    class Meta:
+        verbose_name = _("Archive job")
+        verbose_name_plural = _("Archive jobs")
+        ordering = ["-priority", "available_at"]
+        indexes = [models.Index(fields=["-priority", "available_at"], name="archivejob_next_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.artifact_id} ({self.attempts}/{self.max_attempts})"
+
+    @property
+    def is_dead(self) -> bool:
+        """Has the job used up all its attempts?"""
+        return self.attempts >= self.max_attempts
+
 
 def m2m_save_listener(
     sender: models.Model, instance: Any, action: str, reverse: bool, model: Any, pk_set: set, using: str, **kwargs
@@ -359,3 +577,35 @@ def m2m_save_listener(
 
 
 m2m_changed.connect(m2m_save_listener, sender=Link.tags.through)
+
+
+def artifact_sizes_total() -> Coalesce:
+    """Return an expression totalling the sizes of the artifacts of the ``Link`` in the outer query."""
+    sizes = Artifact.objects.filter(link=OuterRef("pk")).order_by().values("link").annotate(total=Sum("size"))
+    return Coalesce(Subquery(sizes.values("total")), 0)
+
+
+def remove_link_from_search_index(sender: Any, instance: Link, **kwargs) -> None:
+    """Remove a deleted link from the search index, however it was deleted."""
+    from archeion.search import delete
+
+    # The search backend logs why it couldn't be loaded
+    with contextlib.suppress(ImportError):
+        delete(instance.id)
+
+
+post_delete.connect(remove_link_from_search_index, sender=Link)
+
+
+def update_link_search_files(sender: Any, instance: Artifact, **kwargs) -> None:
+    """Search the files of an artifact once it succeeded, whether or not its link is indexed again."""
+    if instance.status != ArtifactStatus.SUCCEEDED:
+        return
+    from archeion.search import update_link_files
+
+    # The search backend logs why it couldn't be loaded
+    with contextlib.suppress(ImportError):
+        update_link_files(instance.link_id)
+
+
+post_save.connect(update_link_search_files, sender=Artifact)
@@ -0,0 +1,123 @@
+"""Keyset pagination, which pages through large tables without counting or skipping rows."""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional, Sequence
+
+from django.db.models import Model, Q, QuerySet
+
+
+@dataclass
+class KeysetPage:
+    """A page of rows, with the cursors to the pages before and after it."""
+
+    object_list: List[Model] = field(default_factory=list)
+    previous_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_previous(self) -> bool:
+        """Is there a page before this one?"""
+        return self.previous_cursor is not None
+
+    @property
+    def has_next(self) -> bool:
+        """Is there a page after this one?"""
+        return self.next_cursor is not None
+
+    def __iter__(self) -> Iterator[Model]:
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str], per_page: int) -> KeysetPage:
+    """
+    Return the page of rows after, or before, the row a cursor points to.
+
+    The rows are found with a ``WHERE`` on the ordering fields instead of an ``OFFSET``, so with an
+    index on those fields, deep pages are as fast as the first one. The last ordering field must be
+    unique, such as ``pk``, and none of them can be null.
+
+    Args:
+        queryset: The rows to paginate
+        ordering: The fields the rows are ordered by, prefixed with ``-`` for descending order
+        cursor: The cursor from the previous page, or ``None`` for the first page
+        per_page: The number of rows per page
+
+    Returns:
+        The page, with the cursors to the pages around it
+    """
+    ordering = list(ordering)
+    position = decode_cursor(cursor, ordering)
+    backwards = position is not None and position["direction"] == "before"
+    order = [reverse_order(name) for name in ordering] if backwards else ordering
+
+    queryset = queryset.order_by(*order)
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(order, position["values"]))
+    rows = list(queryset[: per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage()
+
+    has_previous = has_more if backwards else position is not None
+    has_next = position is not None if backwards else has_more
+    return KeysetPage(
+        object_list=rows,
+        previous_cursor=encode_cursor("before", ordering, rows[0]) if has_previous else None,
+        next_cursor=encode_cursor("after", ordering, rows[-1]) if has_next else None,
+    )
+
+
+def reverse_order(name: str) -> str:
+    """Return the ordering field sorted the other way."""
+    return name[1:] if name.startswith("-") else f"-{name}"
+
+
+def keyset_filter(order: Sequence[str], values: Sequence[Any]) -> Q:
+    """Return the condition matching the rows that come after ``values`` in the order."""
+    condition = Q()
+    equal = {}
+    for name, value in zip(order, values):
+        field_name = name.lstrip("-")
+        lookup = "lt" if name.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{field_name}__{lookup}": value})
+        equal[field_name] = value
+    return condition
+
+
+def encode_cursor(direction: str, ordering: Sequence[str], row: Model) -> str:
+    """Return a cursor to the rows ``before`` or ``after`` the row."""
+    values = [getattr(row, name.lstrip("-")) for name in ordering]
+    data = {"direction": direction, "ordering": list(ordering), "values": values}
+    encoded = json.dumps(
+        data, default=lambda value: value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+    )
+    return base64.urlsafe_b64encode(encoded.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str], ordering: Sequence[str]) -> Optional[dict]:
+    """Return the position a cursor points to, or ``None`` if it is missing, invalid or for another ordering."""
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if (
+        not isinstance(data, dict)
+        or data.get("direction") not in ("before", "after")
+        or data.get("ordering") != list(ordering)
+        or not isinstance(data.get("values"), list)
+        or len(data["values"]) != len(ordering)
+    ):
+        return None
+    return data
@@ -1,10 +1,22 @@
 """Artifact storage functions."""
 
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime
 from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple
 
 from django.core.exceptions import SuspiciousFileOperation
-from django.core.files.base import ContentFile
-from django.core.files.storage import Storage, get_storage_class
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage, Storage, get_storage_class
 
 from archeion.logging import error, success
 
@@ -15,7 +27,7 @@ def get_artifact_storage() -> Storage:
 
     ArchiveStorageClass = get_storage_class(settings.ARCHIVE_STORAGE)  # noqa: N806
 
-    if settings.ARCHIVE_STORAGE == "django.core.files.storage.FileSystemStorage":
+    if issubclass(ArchiveStorageClass, FileSystemStorage):
         Path(settings.ARCHIVE_STORAGE_OPTIONS["location"]).mkdir(parents=True, exist_ok=True)
 
     return ArchiveStorageClass(**settings.ARCHIVE_STORAGE_OPTIONS)
@@ -33,3 +45,396 @@ def save_artifact_file(filepath: str, content: ContentFile, plugin_name: str) ->
     except SuspiciousFileOperation as e:  # pragma: no coverage
         error([f"{plugin_name} failed:", e])
         return False
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    A file system storage that keeps one copy of each distinct file.
+
+    Every file saved is stored once as a blob, named by the SHA-256 hash of its content, in the
+    ``.blobs`` directory. The file at the requested path is a hard link to that blob, so archives
+    look and serve exactly as they would with ``FileSystemStorage``, while identical files take up
+    space once. A blob's link count is its reference count: a blob whose last file is deleted is
+    removed with it.
+
+    Each top-level directory (the archive path of a link) has a ``.manifest.json`` mapping its
+    files to their hashes.
+
+    Files written straight to disk, such as by the ``wget`` or ``git`` archivers, are only
+    deduplicated by ``deduplicate``. Before a tool rewrites such files in place, ``unshare_tree``
+    must give them their own copies.
+    """
+
+    blobs_dir_name = ".blobs"
+    manifest_name = ".manifest.json"
+    _manifest_lock = threading.Lock()
+
+    def _save(self, name: str, content: File) -> str:
+        """Save the file, then replace it with a link to its blob."""
+        name = super()._save(name, content)
+        self.intern(name)
+        return name
+
+    def _open(self, name: str, mode: str = "rb") -> File:
+        """Open the file, giving it its own copy first if it is opened for writing."""
+        if any(flag in mode for flag in "wa+"):
+            self._unshare(name)
+        return super()._open(name, mode)
+
+    def delete(self, name: str) -> None:
+        """Delete the file, and its blob if nothing else uses it."""
+        if not name:
+            raise ValueError("The name must be given to delete().")
+
+        full_path = self.path(name)
+        if os.path.isdir(full_path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(full_path, self.manifest_name))
+            super().delete(name)
+            return
+
+        digest = self._update_manifest(name, None)
+        super().delete(name)
+        if digest:
+            self._release_blob(digest)
+
+    def listdir(self, path: str) -> Tuple[List[str], List[str]]:
+        """List the contents of a directory, hiding the blobs and manifests."""
+        directories, files = super().listdir(path)
+        return (
+            [directory for directory in directories if directory != self.blobs_dir_name],
+            [filename for filename in files if filename != self.manifest_name],
+        )
+
+    def blob_path(self, digest: str) -> str:
+        """Return the absolute path to the blob with the hash ``digest``."""
+        return os.path.join(self.location, self.blobs_dir_name, digest[:2], digest)
+
+    def intern(self, name: str) -> str:
+        """
+        Replace the file with a link to the blob of its content, creating the blob if it is new.
+
+        Args:
+            name: The name of the file
+
+        Returns:
+            The hash of the file's content
+        """
+        full_path = self.path(name)
+        digest = hash_file(full_path)
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+        if os.path.exists(blob_path):
+            if not os.path.samefile(full_path, blob_path):
+                self._link_to_blob(full_path, blob_path)
+        else:
+            try:
+                os.link(full_path, blob_path)
+            except FileExistsError:  # Another file with the same content was saved concurrently
+                self._link_to_blob(full_path, blob_path)
+
+        self._update_manifest(name, digest)
+        return digest
+
+    def _link_to_blob(self, full_path: str, blob_path: str) -> None:
+        """Atomically replace a file with a link to an existing blob."""
+        temp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(blob_path, temp_path)
+        except FileNotFoundError:  # The blob was collected in the meantime, so the file becomes the blob
+            with contextlib.suppress(FileExistsError):
+                os.link(full_path, blob_path)
+            return
+        os.replace(temp_path, full_path)
+
+    def _unshare(self, name: str) -> None:
+        """Give a file its own copy of its content, so writing to it doesn't change other files."""
+        full_path = self.path(name)
+        if not os.path.exists(full_path):
+            return
+        digest = self._update_manifest(name, None)
+        if os.stat(full_path).st_nlink > 1:
+            temp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+            shutil.copy2(full_path, temp_path)
+            os.replace(temp_path, full_path)
+        if digest:
+            self._release_blob(digest)
+
+    def _release_blob(self, digest: str) -> None:
+        """Remove a blob that no file links to anymore."""
+        blob_path = self.blob_path(digest)
+        with contextlib.suppress(FileNotFoundError):
+            if os.stat(blob_path).st_nlink <= 1:
+                os.remove(blob_path)
+
+    def _manifest_path(self, name: str) -> Tuple[Optional[str], str]:
+        """
+        Return the path to the manifest covering a file, and the file's path relative to it.
+
+        Files at the top level of the storage aren't part of a link, so they have no manifest.
+        """
+        top, _, relative_name = name.replace("\\", "/").partition("/")
+        if not relative_name:
+            return None, name
+        return self.path(os.path.join(top, self.manifest_name)), relative_name
+
+    def _update_manifest(self, name: str, digest: Optional[str]) -> Optional[str]:
+        """
+        Record the hash of a file in its manifest, or remove it if ``digest`` is ``None``.
+
+        Returns:
+            The hash previously recorded for the file
+        """
+        manifest_path, relative_name = self._manifest_path(name)
+        if manifest_path is None:
+            return None
+        with self._manifest_lock:
+            manifest = self.read_manifest(manifest_path)
+            previous = manifest.pop(relative_name, None)
+            if digest:
+                manifest[relative_name] = digest
+            if manifest == {} and not os.path.exists(manifest_path):
+                return previous
+
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            temp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(temp_path, manifest_path)
+        return previous
+
+    @staticmethod
+    def read_manifest(manifest_path: str) -> Dict[str, str]:
+        """Read a manifest file, returning an empty manifest if it is missing."""
+        try:
+            with open(manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def deduplicate(self, path: str = "") -> int:
+        """
+        Intern every file under ``path`` that isn't linked to a blob yet.
+
+        Args:
+            path: The directory to deduplicate. Defaults to the whole storage.
+
+        Returns:
+            The number of bytes freed
+        """
+        freed = 0
+        directories, files = self.listdir(path)
+        for filename in files:
+            name = os.path.join(path, filename)
+            full_path = self.path(name)
+            if filename.endswith(".tmp") or os.stat(full_path).st_nlink > 1:
+                continue
+            size = os.path.getsize(full_path)
+            self.intern(name)
+            if os.stat(full_path).st_nlink > 2:  # It now shares a blob with another file
+                freed += size
+        for directory in directories:
+            freed += self.deduplicate(os.path.join(path, directory))
+        return freed
+
+    def unshare_tree(self, path: str) -> None:
+        """
+        Give every file under ``path`` its own copy of its content, and take it out of the manifest.
+
+        Tools like ``wget --convert-links`` write to the files of a previous run in place, which
+        would change the blob, and every other file linked to it.
+
+        Args:
+            path: The directory a tool is about to write to
+        """
+        if not os.path.isdir(self.path(path)):
+            return
+        directories, files = self.listdir(path)
+        for filename in files:
+            if not filename.endswith(".tmp"):
+                self._unshare(os.path.join(path, filename))
+        for directory in directories:
+            self.unshare_tree(os.path.join(path, directory))
+
+    def collect_garbage(self) -> int:
+        """
+        Remove the blobs that no file links to.
+
+        Returns:
+            The number of bytes freed
+        """
+        freed = 0
+        blobs_root = os.path.join(self.location, self.blobs_dir_name)
+        for dirpath, _, filenames in os.walk(blobs_root):
+            for filename in filenames:
+                blob_path = os.path.join(dirpath, filename)
+                stat = os.stat(blob_path)
+                if stat.st_nlink <= 1:
+                    os.remove(blob_path)
+                    freed += stat.st_size
+        return freed
+
+
+def unshare_artifact_files(path: str) -> None:
+    """Give the files under an artifact path their own copies, so a tool can rewrite them in place."""
+    storage = get_artifact_storage()
+    if isinstance(storage, ContentAddressedStorage):
+        storage.unshare_tree(path)
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hash of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_artifact_file(name: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hash of an artifact file's content, as the artifact storage reads it."""
+    digest = hashlib.sha256()
+    with get_artifact_storage().open(name, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+"""The file extension of each supported compression, which is also its ``Content-Encoding``."""
+
+DEFAULT_COMPRESSIBLE_EXTENSIONS = (".html", ".htm", ".md", ".json", ".txt", ".xml", ".css", ".js", ".svg")
+"""Text artifacts worth compressing. Images, video and PDFs are already compressed."""
+
+
+def _import_zstandard() -> Any:
+    """Import the optional ``zstandard`` package."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstandard is not installed") from e
+    return zstandard
+
+
+def _compressor(compression: str, fileobj: IO[bytes]) -> IO[bytes]:
+    """Return a writable file that compresses into ``fileobj``."""
+    if compression == "zstd":
+        return _import_zstandard().ZstdCompressor().stream_writer(fileobj, closefd=False)
+    return gzip.GzipFile(fileobj=fileobj, mode="wb", mtime=0)
+
+
+def _decompressor(compression: str, fileobj: IO[bytes]) -> IO[bytes]:
+    """Return a readable file that decompresses ``fileobj`` as it is read."""
+    if compression == "zstd":
+        return _import_zstandard().ZstdDecompressor().stream_reader(fileobj)
+    stream = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    stream.myfileobj = fileobj  # Close the compressed file along with the stream
+    return stream
+
+
+class CompressedStorageMixin:
+    """
+    Compresses text files when they are saved, and decompresses them as they are read.
+
+    A compressed file is stored with the compression's extension added, such as ``dom.html.gz``,
+    but is still saved, opened, listed and deleted by its original name. ``get_compressed_name``
+    lets views send the compressed file as it is, with a ``Content-Encoding`` header.
+
+    Args:
+        compression: ``gzip``, or ``zstd`` if the ``zstandard`` package is installed
+        compressible_extensions: The extensions of the files to compress
+    """
+
+    def __init__(
+        self,
+        *args,
+        compression: str = "gzip",
+        compressible_extensions: Iterable[str] = DEFAULT_COMPRESSIBLE_EXTENSIONS,
+        **kwargs,
+    ):
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown compression {compression}. Use one of {', '.join(COMPRESSION_EXTENSIONS)}.")
+        self.compression = compression
+        self.compressed_extension = COMPRESSION_EXTENSIONS[compression]
+        self.compressible_extensions = tuple(compressible_extensions)
+        super().__init__(*args, **kwargs)
+
+    def is_compressible(self, name: str) -> bool:
+        """Should the file be compressed?"""
+        return name.lower().endswith(self.compressible_extensions)
+
+    def get_compressed_name(self, name: str) -> Optional[str]:
+        """Return the name of the compressed file for ``name``, if it was stored compressed."""
+        compressed_name = f"{name}{self.compressed_extension}"
+        if self.is_compressible(name) and super().exists(compressed_name):
+            return compressed_name
+        return None
+
+    def _save(self, name: str, content: File) -> str:
+        """Compress the file, if it is a text file, and save it."""
+        if not self.is_compressible(name):
+            return super()._save(name, content)
+
+        buffer = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+        with _compressor(self.compression, buffer) as compressor:
+            for chunk in content.chunks():
+                compressor.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        buffer.seek(0)
+
+        saved_name = super()._save(f"{name}{self.compressed_extension}", File(buffer))
+        return saved_name[: -len(self.compressed_extension)]
+
+    def _open(self, name: str, mode: str = "rb") -> File:
+        """Open the file, decompressing it as it is read."""
+        compressed_name = self.get_compressed_name(name)
+        if compressed_name is None:
+            return super()._open(name, mode)
+        if any(flag in mode for flag in "wa+"):
+            # Writing replaces the compressed file with a plain one
+            super().delete(compressed_name)
+            return super()._open(name, mode)
+
+        raw_file = super()._open(compressed_name, "rb")
+        stream: IO = _decompressor(self.compression, raw_file.file)
+        if "b" not in mode:
+            stream = io.TextIOWrapper(stream, encoding="utf-8")
+        return File(stream, name=name)
+
+    def exists(self, name: str) -> bool:
+        """Does the file exist, compressed or not?"""
+        return super().exists(name) or self.get_compressed_name(name) is not None
+
+    def delete(self, name: str) -> None:
+        """Delete the file, compressed or not."""
+        compressed_name = self.get_compressed_name(name) if name else None
+        super().delete(compressed_name or name)
+
+    def size(self, name: str) -> int:
+        """Return the size of the file on disk, which is the compressed size for compressed files."""
+        return super().size(self.get_compressed_name(name) or name)
+
+    def get_modified_time(self, name: str) -> datetime:
+        """Return the last modified time of the file, compressed or not."""
+        return super().get_modified_time(self.get_compressed_name(name) or name)
+
+    def listdir(self, path: str) -> Tuple[List[str], List[str]]:
+        """List the contents of a directory, with compressed files listed by their original names."""
+        directories, files = super().listdir(path)
+        extension = self.compressed_extension
+        return directories, [
+            (
+                filename[: -len(extension)]
+                if filename.endswith(extension) and self.is_compressible(filename[: -len(extension)])
+                else filename
+            )
+            for filename in files
+        ]
+
+
+class CompressedFileSystemStorage(CompressedStorageMixin, FileSystemStorage):
+    """A file system storage that compresses text artifacts."""
+
+
+class CompressedContentAddressedStorage(CompressedStorageMixin, ContentAddressedStorage):
+    """A content-addressed storage that compresses text artifacts."""
@@ -1,11 +1,14 @@
 """Tables for listing the models in HTML."""
 
+from functools import partial
 from typing import Any
 
 import django_filters
 import django_tables2 as tables
 from crispy_forms.helper import FormHelper
+from django.db.models import QuerySet
 
+from .model_functions import LINK_CHOICE_FIELDS, get_link_field_choices, get_links_version
 from .models import Link
 
 
@@ -20,23 +23,44 @@ class FilterFormHelper(FormHelper):
 class LinkFilter(django_filters.FilterSet):
     """Filters for the Link table."""
 
-    content_type = django_filters.AllValuesFilter(field_name="content_type")
-    ld_type = django_filters.AllValuesFilter(field_name="ld_type")
+    q = django_filters.CharFilter(label="Search", method="filter_search")
+    content_type = django_filters.ChoiceFilter(choices=partial(get_link_field_choices, "content_type"))
+    ld_type = django_filters.ChoiceFilter(choices=partial(get_link_field_choices, "ld_type"))
     created_at = django_filters.DateRangeFilter()
 
     class Meta:
         model = Link
-        fields = ["content_type", "ld_type", "created_at"]
+        fields = ["q", "content_type", "ld_type", "created_at"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Read the version of the links once for all the choice filters, not once per filter
+        version = get_links_version()
+        for field_name in LINK_CHOICE_FIELDS:
+            self.filters[field_name].extra["choices"] = partial(get_link_field_choices, field_name, version)
+
+    def filter_search(self, queryset: QuerySet, name: str, value: str) -> QuerySet:
+        """Filter the links to those matching the query, best match first."""
+        from archeion.search import get_search_backend, rank_links
+
+        try:
+            search_backend = get_search_backend()
+        except ImportError:
+            # The search backend logged why it couldn't be loaded
+            return queryset.none()
+        return rank_links(queryset, search_backend.search(value))
 
 
 class LinkTable(tables.Table):
     """Table definiton for the Link table."""
 
     url = tables.LinkColumn(empty_values=())
+    # Links are paged by the columns they are sorted on, which can't be null
+    ld_type = tables.Column(orderable=False)
 
     class Meta:
         model = Link
-        template_name = "django_tables2/bootstrap5.html"
+        template_name = "includes/_link_table.html"
         fields = ("url", "ld_type", "created_at")
         attrs = {
             "class": "table table-striped table-bordered",
@@ -4,7 +4,7 @@ import factory
 from factory import Faker
 from factory.django import DjangoModelFactory
 
-from archeion.archivers import get_archivers_map
+from archeion.archivers import get_archiver_names
 from archeion.index.models import Artifact, ArtifactStatus, Link, Tag
 
 
@@ -29,7 +29,7 @@ class LinkFactory(DjangoModelFactory):
 
 class ArtifactFactory(DjangoModelFactory):
     link = factory.SubFactory(LinkFactory)
-    plugin_name = Faker("word", ext_word_list=get_archivers_map().keys())
+    plugin_name = Faker("word", ext_word_list=get_archiver_names())
     output_path = Faker("file_path", absolute=False)
     status = Faker("enum", enum_cls=ArtifactStatus)
 
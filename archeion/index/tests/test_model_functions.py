@@ -0,0 +1,113 @@
+"""Test the functions that serve the index models."""
+
+import threading
+
+import pytest
+from django.core.files.base import ContentFile
+
+from archeion.index import model_functions
+from archeion.index.model_functions import LinkDataWriter
+from archeion.index.models import Link
+from archeion.index.storage import get_artifact_storage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def writer(mocker) -> LinkDataWriter:
+    """Replace the shared writer with a fresh one."""
+    writer = LinkDataWriter()
+    mocker.patch.object(model_functions, "link_data_writer", writer)
+    return writer
+
+
+def test_unchanged_link_data_is_not_rewritten(writer, mocker):
+    """Saving a link again without changes doesn't touch its index file."""
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    storage_save = mocker.spy(type(get_artifact_storage()), "save")
+
+    link.save()
+    assert storage_save.call_count == 0
+
+    link.title = "Example"
+    link.save()
+    assert storage_save.call_count == 1
+    assert "title: Example" in get_artifact_storage().open(f"{link.archive_path}/index.yaml").read().decode()
+
+
+def test_link_data_changed_by_another_process_is_rewritten(writer):
+    """A file written elsewhere since this process wrote it is written again, even with the same content."""
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    filename = f"{link.archive_path}/index.yaml"
+    storage = get_artifact_storage()
+    storage.delete(filename)
+    storage.save(filename, ContentFile(b"written by another process"))
+
+    assert writer.write(link)
+    assert "url: http://example.com/" in storage.open(filename).read().decode()
+    assert not writer.write(link)
+
+
+def test_deferred_link_data_is_coalesced(writer, mocker):
+    """Inside ``defer_link_data``, a link saved several times is written once, at the end."""
+    write = mocker.spy(writer, "write")
+
+    with model_functions.defer_link_data():
+        link = Link.objects.create(url="http://example.com/", content_type="text/html")
+        for title in ("One", "Two", "Three"):
+            link.title = title
+            link.save()
+        assert write.call_count == 0
+
+    assert write.call_count == 1
+    assert "title: Three" in get_artifact_storage().open(f"{link.archive_path}/index.yaml").read().decode()
+
+
+def test_deferred_link_data_flushes_in_batches(writer, mocker):
+    """Deferred writes are flushed once enough of them are queued."""
+    writer.batch_size = 2
+    write = mocker.spy(writer, "write")
+
+    with model_functions.defer_link_data():
+        Link.objects.create(url="http://example.com/1", content_type="text/html")
+        Link.objects.create(url="http://example.com/2", content_type="text/html")
+        assert write.call_count == 2
+        Link.objects.create(url="http://example.com/3", content_type="text/html")
+        assert write.call_count == 2
+
+    assert write.call_count == 3
+
+
+def test_deferring_in_one_thread_doesnt_defer_the_others(writer, mocker):
+    """Another thread's writes aren't queued while this thread defers its own."""
+    write = mocker.patch.object(writer, "write")
+    link = Link(url="http://example.com/", archive_path="link1")
+
+    with model_functions.defer_link_data():
+        thread = threading.Thread(target=writer.save, args=(link,))
+        thread.start()
+        thread.join()
+        assert write.call_count == 1
+        writer.save(link)
+        assert write.call_count == 1
+
+    assert write.call_count == 2
+
+
+def test_deferred_link_data_is_flushed_by_a_timer(writer, mocker):
+    """Deferred writes don't wait for the next save once the flush interval has passed."""
+    writer.flush_interval = 0.01
+    flushed = threading.Event()
+    mocker.patch.object(writer, "write", side_effect=lambda link: flushed.set())
+
+    with model_functions.defer_link_data():
+        writer.save(Link(url="http://example.com/", archive_path="link1"))
+        assert flushed.wait(timeout=5)
+
+
+def test_remembered_digests_are_bounded(writer):
+    """Only the most recently written files are remembered."""
+    writer.digest_cache_size = 2
+    links = [Link.objects.create(url=f"http://example.com/{i}", content_type="text/html") for i in range(3)]
+
+    assert list(writer._digests) == [f"{link.archive_path}/index.yaml" for link in links[1:]]
@@ -1,8 +1,13 @@
 """Test the Link model."""
 
 import pytest
+from django.core.files.base import ContentFile
+from django.db.models import Sum
+from django.utils import timezone
 
-from archeion.index.models import Link
+from archeion.index.model_functions import update_archive_sizes
+from archeion.index.models import Artifact, ArtifactStatus, Link
+from archeion.index.storage import save_artifact_file
 
 pytestmark = pytest.mark.django_db
 
@@ -14,7 +19,8 @@ def test_link_model(httpserver, fixture_dir):
     )
     link = Link.objects.create(url=httpserver.url)
     assert link.url == httpserver.url
-    assert link.content_type == "text/html; charset=utf-8"
+    assert link.content_type is None  # Saving doesn't block on a HEAD request
+    assert link.archive_path == link.id
     assert link.parsed_url[0] == "http"
     assert link.parsed_url[1].startswith("127.0.0.1")
     assert f"{link}" == httpserver.url
@@ -47,3 +53,63 @@ def test_update_metadata():
     assert link.title == "This is an example headline"
     assert link.tags.count() == 3
     assert link.ld_type == "http://schema.org/Article"
+
+
+def test_archive_size_follows_the_artifacts(settings, tmp_path):
+    """Saving and deleting artifacts changes the archive size of their link."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    stale_link = Link.objects.get(pk=link.pk)
+    dom = link.artifacts.create(plugin_name="DOM", output_path="dom.html")
+    screenshot = link.artifacts.create(plugin_name="screenshot", output_path="screenshot.png")
+    save_artifact_file(dom.archive_output_path, ContentFile(b"<html></html>"), "DOM")
+    save_artifact_file(screenshot.archive_output_path, ContentFile(b"\x89PNG"), "screenshot")
+    for artifact in (dom, screenshot):
+        artifact.status = ArtifactStatus.SUCCEEDED
+        artifact.save()
+
+    stale_link.save()
+    link.refresh_from_db()
+    assert (dom.size, screenshot.size) == (13, 4)
+    assert link.archive_size == 17
+    assert Link.objects.aggregate(total=Sum("archive_size"))["total"] == 17
+
+    Artifact.objects.get(pk=screenshot.pk).delete()
+    link.refresh_from_db()
+    assert link.archive_size == 13
+
+
+def test_artifacts_are_measured_when_finished_or_moved(settings, tmp_path, mocker):
+    """Saving a pending artifact doesn't measure its files, unless its output path changed."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    artifact = link.artifacts.create(plugin_name="DOM", output_path="dom.html")
+    get_storage_size = mocker.spy(Artifact, "get_storage_size")
+
+    artifact = Artifact.objects.get(pk=artifact.pk)
+    artifact.start_ts = timezone.now()
+    artifact.save()
+    assert get_storage_size.call_count == 0
+
+    artifact.output_path = "index.html"
+    artifact.save()
+    artifact.save()
+    assert get_storage_size.call_count == 1
+
+    artifact.status = ArtifactStatus.SUCCEEDED
+    artifact.save(update_fields=["status"])
+    assert get_storage_size.call_count == 2
+
+
+def test_update_archive_sizes_measures_the_storage(settings, tmp_path):
+    """Links archived before sizes were recorded are measured again."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    wget = link.artifacts.create(plugin_name="wget", output_path="wget")
+    (tmp_path / link.archive_path / "wget" / "example.com").mkdir(parents=True)
+    (tmp_path / link.archive_path / "wget" / "example.com" / "index.html").write_bytes(b"mirrored page")
+
+    assert update_archive_sizes() == 1
+    wget.refresh_from_db()
+    link.refresh_from_db()
+    assert wget.size == link.archive_size == len(b"mirrored page")
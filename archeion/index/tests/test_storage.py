@@ -0,0 +1,254 @@
+"""Test the artifact storage."""
+
+import gzip
+import os
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage, Storage
+
+from archeion.index.models import ArtifactStatus, Link
+from archeion.index.storage import (
+    CompressedFileSystemStorage,
+    ContentAddressedStorage,
+    get_artifact_storage,
+    hash_file,
+    save_artifact_file,
+)
+
+
+class ObjectStorage(Storage):
+    """A storage without local paths, like an object store, keeping its files in memory."""
+
+    def __init__(self):
+        self.files = InMemoryStorage()
+
+    def _open(self, name: str, mode: str = "rb"):
+        return self.files.open(name, mode)
+
+    def _save(self, name: str, content) -> str:
+        return self.files.save(name, content)
+
+    def exists(self, name: str) -> bool:
+        return self.files.exists(name)
+
+
+@pytest.fixture
+def storage(tmp_path) -> ContentAddressedStorage:
+    """A content-addressed storage in a temporary directory."""
+    return ContentAddressedStorage(location=str(tmp_path))
+
+
+def test_identical_files_share_a_blob(storage):
+    """Saving the same content twice stores it once."""
+    first = storage.save("link1/favicon.ico", ContentFile(b"icon"))
+    second = storage.save("link2/favicon.ico", ContentFile(b"icon"))
+    storage.save("link2/page.html", ContentFile(b"<html></html>"))
+
+    assert os.path.samefile(storage.path(first), storage.path(second))
+    assert os.stat(storage.path(first)).st_nlink == 3  # Two files and the blob
+    assert storage.open(second).read() == b"icon"
+    assert storage.listdir("") == (["link1", "link2"], [])
+    assert storage.listdir("link2") == ([], ["favicon.ico", "page.html"])
+    assert storage.read_manifest(storage.path("link2/.manifest.json")) == {
+        "favicon.ico": hash_file(storage.path(first)),
+        "page.html": hash_file(storage.path("link2/page.html")),
+    }
+
+
+def test_blobs_are_removed_with_their_last_file(storage):
+    """A blob is kept while any file uses it."""
+    storage.save("link1/favicon.ico", ContentFile(b"icon"))
+    storage.save("link2/favicon.ico", ContentFile(b"icon"))
+    blob_path = storage.blob_path(hash_file(storage.path("link1/favicon.ico")))
+
+    storage.delete("link1/favicon.ico")
+    assert os.path.exists(blob_path)
+
+    storage.delete("link2/favicon.ico")
+    storage.delete("link2")
+    assert not os.path.exists(blob_path)
+    assert not storage.exists("link2")
+
+
+def test_writing_to_a_shared_file_does_not_change_the_others(storage):
+    """Opening a file for writing gives it its own copy."""
+    storage.save("link1/page.html", ContentFile(b"same"))
+    storage.save("link2/page.html", ContentFile(b"same"))
+
+    with storage.open("link2/page.html", "wb") as f:
+        f.write(b"changed")
+
+    assert storage.open("link1/page.html").read() == b"same"
+    assert storage.open("link2/page.html").read() == b"changed"
+
+
+def test_deduplicate_and_collect_garbage(storage, tmp_path):
+    """Files written straight to disk are deduplicated, and unused blobs collected."""
+    for link in ("link1", "link2"):
+        (tmp_path / link / "wget").mkdir(parents=True)
+        (tmp_path / link / "wget" / "index.html").write_bytes(b"mirrored page")
+
+    assert storage.deduplicate() == len(b"mirrored page")
+    assert os.path.samefile(tmp_path / "link1/wget/index.html", tmp_path / "link2/wget/index.html")
+
+    for link in ("link1", "link2"):
+        os.remove(tmp_path / link / "wget" / "index.html")
+    assert storage.collect_garbage() == len(b"mirrored page")
+
+
+def test_unshared_files_can_be_rewritten_in_place(storage, tmp_path):
+    """Files a tool is about to rewrite get their own copies, so the other links keep theirs."""
+    for link in ("link1", "link2"):
+        (tmp_path / link / "wget" / "js").mkdir(parents=True)
+        (tmp_path / link / "wget" / "js" / "jquery.js").write_bytes(b"jquery")
+    storage.deduplicate()
+
+    storage.unshare_tree("link1/wget")
+    with open(tmp_path / "link1" / "wget" / "js" / "jquery.js", "r+b") as f:
+        f.write(b"JQUERY")
+
+    assert storage.open("link2/wget/js/jquery.js").read() == b"jquery"
+    assert storage.read_manifest(str(tmp_path / "link1" / ".manifest.json")) == {}
+    assert storage.read_manifest(str(tmp_path / "link2" / ".manifest.json")) == {
+        "wget/js/jquery.js": hash_file(str(tmp_path / "link2" / "wget" / "js" / "jquery.js"))
+    }
+
+
+@pytest.mark.django_db
+def test_links_work_with_content_addressed_storage(settings, tmp_path):
+    """Artifact content, archive sizes and deleting links work as with the file system storage."""
+    settings.ARCHIVE_STORAGE = "archeion.index.storage.ContentAddressedStorage"
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    artifact = link.artifacts.create(plugin_name="DOM", output_path="dom.html")
+    save_artifact_file(artifact.archive_output_path, ContentFile("<html></html>"), "DOM")
+    artifact.status = ArtifactStatus.SUCCEEDED
+    artifact.save()
+    link.refresh_from_db()
+
+    assert artifact.content == "<html></html>"
+    assert link.archive_size == len("<html></html>")
+
+    link.delete()
+    assert not (tmp_path / link.archive_path).exists()
+    assert not any(path.is_file() for path in (tmp_path / ".blobs").rglob("*"))
+
+
+@pytest.fixture
+def compressed_storage(tmp_path) -> CompressedFileSystemStorage:
+    """A compressing storage in a temporary directory."""
+    return CompressedFileSystemStorage(location=str(tmp_path))
+
+
+def test_text_artifacts_are_compressed(compressed_storage, tmp_path):
+    """Text files are stored compressed and read back decompressed, under their original names."""
+    html = "<html>" + "content " * 1000 + "</html>"
+    name = compressed_storage.save("link1/dom.html", ContentFile(html))
+    compressed_storage.save("link1/screenshot.png", ContentFile(b"\x89PNG"))
+
+    assert name == "link1/dom.html"
+    assert (tmp_path / "link1" / "dom.html.gz").exists()
+    assert not (tmp_path / "link1" / "dom.html").exists()
+    assert compressed_storage.exists("link1/dom.html")
+    assert compressed_storage.open("link1/dom.html", "r").read() == html
+    assert compressed_storage.size("link1/dom.html") < len(html)
+    assert compressed_storage.listdir("link1") == ([], ["dom.html", "screenshot.png"])
+    assert (tmp_path / "link1" / "screenshot.png").exists()
+
+    compressed_storage.delete("link1/dom.html")
+    assert not compressed_storage.exists("link1/dom.html")
+
+
+@pytest.mark.django_db
+def test_compressed_files_are_served_with_content_encoding(client, settings, tmp_path):
+    """Clients that accept the encoding get the compressed file as it is."""
+    settings.ARCHIVE_STORAGE = "archeion.index.storage.CompressedFileSystemStorage"
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    get_artifact_storage().save("link1/dom.html", ContentFile("<html></html>"))
+
+    compressed = client.get("/archives/link1/dom.html", HTTP_ACCEPT_ENCODING="gzip, deflate")
+    plain = client.get("/archives/link1/dom.html")
+
+    assert compressed["Content-Encoding"] == "gzip"
+    assert compressed["Content-Type"] == "text/html"
+    assert gzip.decompress(b"".join(compressed.streaming_content)) == b"<html></html>"
+    assert not plain.has_header("Content-Encoding")
+    assert b"".join(plain.streaming_content) == b"<html></html>"
+
+
+@pytest.mark.django_db
+def test_decompressed_files_are_closed_once_served(client, settings, tmp_path, mocker):
+    """The file decompressed on the fly is closed once the response has been read."""
+    settings.ARCHIVE_STORAGE = "archeion.index.storage.CompressedFileSystemStorage"
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    storage = get_artifact_storage()
+    storage.save("link1/dom.html", ContentFile("<html></html>"))
+    open_spy = mocker.spy(type(storage), "open")
+
+    response = client.get("/archives/link1/dom.html")
+
+    assert b"".join(response.streaming_content) == b"<html></html>"
+    assert open_spy.spy_return.closed
+
+
+@pytest.mark.django_db
+def test_files_are_served_by_range(client, settings, tmp_path):
+    """A byte range of a file is served with status 206, and a range outside it with status 416."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    get_artifact_storage().save("link1/media.mp4", ContentFile(b"0123456789"))
+
+    whole = client.get("/archives/link1/media.mp4")
+    middle = client.get("/archives/link1/media.mp4", HTTP_RANGE="bytes=2-5")
+    suffix = client.get("/archives/link1/media.mp4", HTTP_RANGE="bytes=-3")
+    outside = client.get("/archives/link1/media.mp4", HTTP_RANGE="bytes=20-")
+
+    assert whole.status_code == 200
+    assert whole["Accept-Ranges"] == "bytes"
+    assert b"".join(whole.streaming_content) == b"0123456789"
+    assert middle.status_code == 206
+    assert middle["Content-Range"] == "bytes 2-5/10"
+    assert b"".join(middle.streaming_content) == b"2345"
+    assert b"".join(suffix.streaming_content) == b"789"
+    assert outside.status_code == 416
+    assert outside["Content-Range"] == "bytes */10"
+
+
+@pytest.mark.django_db
+def test_hidden_files_and_directories_are_not_served(client, settings, tmp_path):
+    """Directories, and the blobs and manifest of a content-addressed storage, aren't served."""
+    settings.ARCHIVE_STORAGE = "archeion.index.storage.ContentAddressedStorage"
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    get_artifact_storage().save("link1/page.html", ContentFile(b"<html></html>"))
+    blob = next(name for name in os.listdir(tmp_path / ".blobs"))
+
+    assert client.get("/archives/link1/page.html").status_code == 200
+    assert client.get("/archives/link1/").status_code == 404
+    assert client.get("/archives/.manifest.json").status_code == 404
+    assert client.get(f"/archives/.blobs/{blob}").status_code == 404
+    assert client.get("/archives/../index.sqlite3").status_code == 404
+
+
+@pytest.mark.django_db
+def test_files_are_served_from_storages_without_local_paths(client, mocker):
+    """Storages like object stores, which have no local paths, are served through the storage."""
+    storage = ObjectStorage()
+    storage.save("link1/page.html", ContentFile(b"<html></html>"))
+    mocker.patch("archeion.index.views.get_artifact_storage", return_value=storage)
+
+    response = client.get("/archives/link1/page.html")
+    assert b"".join(response.streaming_content) == b"<html></html>"
+    assert client.get("/archives/link1/missing.html").status_code == 404
+
+
+@pytest.mark.django_db
+def test_artifact_content_is_read_in_chunks(settings, tmp_path):
+    """An artifact can be read a chunk at a time, without loading the whole file."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    link = Link.objects.create(url="http://example.com/", content_type="text/html")
+    artifact = link.artifacts.create(plugin_name="DOM", output_path="dom.html")
+    save_artifact_file(artifact.archive_output_path, ContentFile(b"x" * 10), "DOM")
+
+    assert list(artifact.chunks(chunk_size=4)) == [b"xxxx", b"xxxx", b"xx"]
+    with artifact.open() as f:
+        assert f.read(3) == b"xxx"
@@ -0,0 +1,103 @@
+"""Test the index views."""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from archeion.index.model_functions import clear_link_field_choices, get_link_field_choices
+from archeion.index.models import Link
+from archeion.index.views import HomepageView
+
+pytestmark = pytest.mark.django_db
+
+
+def count_queries(client, url: str) -> int:
+    """Return the number of queries made to render a page."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.parametrize("page", ["link", "artifact"])
+def test_detail_queries_dont_grow_with_the_artifacts(client, page):
+    """The link and artifact pages make the same number of queries however many artifacts the link has."""
+    link = Link.objects.create(url="http://example.com/", content_type="text/html", metadata={"name": "Example"})
+    link.tags.create(name="example")
+    dom = link.artifacts.create(plugin_name="DOM", output_path="dom.html")
+    url = link.get_absolute_url() if page == "link" else dom.get_absolute_url()
+
+    queries = count_queries(client, url)
+    for plugin_name in ("screenshot", "pdf", "headers", "wget", "singlefile"):
+        link.artifacts.create(plugin_name=plugin_name, output_path=f"{plugin_name}.out")
+
+    assert count_queries(client, url) == queries
+
+
+def test_metadata_is_rendered_once_until_the_link_changes(client, mocker):
+    """The metadata HTML is cached until the link is saved again."""
+    convert = mocker.patch("archeion.index.views.convert_json2html", return_value="<table></table>")
+    link = Link.objects.create(url="http://example.com/", content_type="text/html", metadata={"name": "Example"})
+
+    client.get(link.get_absolute_url())
+    client.get(link.get_absolute_url())
+    assert convert.call_count == 1
+
+    link.update_metadata({"name": "Another example"})
+    link.save()
+    client.get(link.get_absolute_url())
+    assert convert.call_count == 2
+
+
+def test_homepage_is_paged_with_a_cursor(client, monkeypatch):
+    """The pages of links follow each other, newest first, and are found without an offset."""
+    monkeypatch.setattr(HomepageView, "paginate_by", 2)
+    links = [Link.objects.create(url=f"http://example.com/{i}", content_type="text/html") for i in range(5)]
+    newest_first = [link.id for link in reversed(links)]
+
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        with CaptureQueriesContext(connection) as context:
+            response = client.get("/", {"cursor": cursor})
+        page = response.context["table"].keyset_page
+        pages.append([link.id for link in page])
+        cursor = page.next_cursor
+    assert pages == [newest_first[0:2], newest_first[2:4], newest_first[4:]]
+    assert not any("OFFSET" in query["sql"] for query in context.captured_queries)
+
+    response = client.get("/", {"cursor": page.previous_cursor})
+    assert [link.id for link in response.context["table"].keyset_page] == newest_first[2:4]
+
+
+def test_filter_choices_are_cached_until_links_change(django_assert_num_queries):
+    """The distinct values of a field are read once per version of the links."""
+    Link.objects.create(url="http://example.com/", content_type="text/html")
+    assert get_link_field_choices("content_type") == [("text/html", "text/html")]
+    with django_assert_num_queries(1):  # Only the version of the links
+        get_link_field_choices("content_type")
+
+    feed = Link.objects.create(url="http://example.com/feed", content_type="application/rss+xml")
+    assert get_link_field_choices("content_type") == [
+        ("application/rss+xml", "application/rss+xml"),
+        ("text/html", "text/html"),
+    ]
+
+    feed.delete()
+    assert get_link_field_choices("content_type") == [("text/html", "text/html")]
+
+    Link.objects.update(content_type="text/plain")
+    clear_link_field_choices()
+    assert get_link_field_choices("content_type") == [("text/plain", "text/plain")]
+
+
+def test_links_version_is_read_once_per_page(client):
+    """The filter choices of a page share one read of the version of the links."""
+    Link.objects.create(url="http://example.com/", content_type="text/html", ld_type="Article")
+    client.get("/")  # Fill the choices cache
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/")
+    assert response.status_code == 200
+    assert 'value="Article"' in response.content.decode()
+    assert sum('MAX("index_link"."updated_at")' in query["sql"] for query in context.captured_queries) == 1
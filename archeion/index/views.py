@@ -1,11 +1,18 @@
 """External views for the index app."""
 
-from typing import Any
+import mimetypes
+import os
+import re
+from typing import Any, Iterator, List, Optional, Tuple
 
 from django.conf import settings
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import Storage
 from django.db.models import QuerySet
-from django.shortcuts import get_object_or_404
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.utils.safestring import mark_safe
 from django.views.decorators.csrf import csrf_exempt
@@ -20,6 +27,8 @@ from archeion.json2html import convert_json2html
 from ..logging import info
 from .forms import AddLinkForm
 from .models import Artifact, Link
+from .pagination import paginate_keyset
+from .storage import CompressedStorageMixin, get_artifact_storage
 from .tables import FilterFormHelper, LinkFilter, LinkTable
 
 HIDDEN_PLUGINS = {
@@ -27,15 +36,52 @@ HIDDEN_PLUGINS = {
     "favicon",
 }
 
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+SORTABLE_FIELDS = ("created_at", "url")
+"""The fields the links on the homepage can be sorted by, which are indexed and never null."""
+
+METADATA_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+"""The number of seconds the rendered metadata of a link is cached."""
+
 
 class HomepageView(SingleTableMixin, FilterView):
-    """Homepage view."""
+    """
+    Homepage view.
+
+    The links are paged with a cursor instead of a page number, so deep pages don't skip over
+    every link before them.
+    """
 
     template_name = "index/links.html"
     model = Link
     table_class = LinkTable
     filterset_class = LinkFilter
     paginate_by = 20
+    table_pagination = False
+
+    def get_keyset_ordering(self, queryset: QuerySet) -> List[str]:
+        """Return the order of the links, ending with the primary key so every link has its own position."""
+        sort = self.request.GET.get("sort", "")
+        if sort.lstrip("-") in SORTABLE_FIELDS:
+            return [sort, "-pk" if sort.startswith("-") else "pk"]
+        if "search_score" in queryset.query.annotations:
+            return ["-search_score", "-created_at", "-pk"]
+        return ["-created_at", "-pk"]
+
+    def get_table_data(self) -> List[Link]:
+        """Return the page of links after, or before, the cursor."""
+        queryset = super().get_table_data()
+        self.page = paginate_keyset(
+            queryset, self.get_keyset_ordering(queryset), self.request.GET.get("cursor"), self.paginate_by
+        )
+        return self.page.object_list
+
+    def get_table(self, **kwargs) -> LinkTable:
+        """Return the table, with the page it shows for the pagination links."""
+        table = super().get_table(**kwargs)
+        table.keyset_page = self.page
+        return table
 
     def get_context_data(self, **kwargs) -> Any:
         """Add additional information to the context."""
@@ -48,25 +94,12 @@ class LinkDetailView(DetailView):
     """Link detail view."""
 
     template_name = "index/link_detail.html"
-    queryset = Link.objects.all().prefetch_related()
+    queryset = Link.objects.prefetch_related("artifacts", "tags")
 
     def get_context_data(self, **kwargs) -> dict:
         """Add additional information to the context."""
         context = super().get_context_data(**kwargs)
-        context["artifacts"] = {}
-        for artifact in self.object.artifacts.all():
-            context["artifacts"][artifact.plugin_name] = artifact
-        if self.object.metadata:
-            context["metadata"] = mark_safe(convert_json2html(self.object.metadata))  # nosec B308, B703
-        else:
-            context["metadata"] = None
-
-        context["tabs"] = [
-            {"title": artifact.plugin_name, "url": artifact.get_absolute_url()}
-            for artifact in self.object.artifacts.all()
-            if artifact.plugin_name not in HIDDEN_PLUGINS
-        ]
-
+        context.update(get_link_context(self.object))
         return context
 
 
@@ -78,27 +111,55 @@ class ArtifactDetailView(DetailView):
 
     def get_queryset(self) -> QuerySet:
         """Get the artifacts related to a link id."""
-        link = get_object_or_404(Link, pk=self.kwargs["link_id"])
-        return Artifact.objects.filter(link=link)
+        return (
+            Artifact.objects.filter(link_id=self.kwargs["link_id"])
+            .select_related("link")
+            .prefetch_related("link__artifacts", "link__tags")
+        )
 
     def get_context_data(self, **kwargs) -> dict:
         """Add additional context for the templates."""
         context = super().get_context_data(**kwargs)
-        context["artifacts"] = {}
-        for artifact in self.object.link.artifacts.all():
-            context["artifacts"][artifact.plugin_name] = artifact
-        if self.object.link.metadata:
-            context["metadata"] = mark_safe(convert_json2html(self.object.link.metadata))  # nosec B308, B703
-        else:
-            context["metadata"] = None
-
-        context["tabs"] = [
+        context.update(get_link_context(self.object.link))
+        return context
+
+
+def get_link_context(link: Link) -> dict:
+    """
+    Return the artifacts, metadata and tabs shown on the pages of a link.
+
+    The link's artifacts are read once, with ``.all()``, so they come from the prefetched set. The
+    prefetched artifacts share the link object, so their paths don't load it again.
+
+    Args:
+        link: The link, with its artifacts and tags prefetched
+
+    Returns:
+        The template context
+    """
+    artifacts = link.artifacts.all()
+    return {
+        "artifacts": {artifact.plugin_name: artifact for artifact in artifacts},
+        "metadata": render_metadata(link),
+        "tabs": [
             {"title": artifact.plugin_name, "url": artifact.get_absolute_url()}
-            for artifact in self.object.link.artifacts.all()
+            for artifact in artifacts
             if artifact.plugin_name not in HIDDEN_PLUGINS
-        ]
+        ],
+    }
 
-        return context
+
+def render_metadata(link: Link) -> Optional[str]:
+    """
+    Return the link's metadata rendered as HTML, or ``None`` if it has none.
+
+    The HTML is cached by the link's ID and update time, so it is rendered again once the link is saved.
+    """
+    if not link.metadata:
+        return None
+    cache_key = f"metadata-html:{link.id}:{link.updated_at.timestamp()}"
+    html = cache.get_or_set(cache_key, lambda: convert_json2html(link.metadata), timeout=METADATA_CACHE_TIMEOUT)
+    return mark_safe(html)  # nosec B308, B703
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -157,3 +218,128 @@ class AddView(UserPassesTestMixin, FormView):
         #
         # context.update({"stdout": ansi_to_html(add_stdout.getvalue().strip()), "form": AddLinkForm()})
         # return render(template_name=self.template_name, request=self.request, context=context)
+
+
+def serve_archive_file(request: HttpRequest, path: str) -> HttpResponse:
+    """
+    Serve a file from the artifact storage, streamed, or the byte range the client asks for.
+
+    Files stored compressed are sent as they are, with a ``Content-Encoding`` header, to clients
+    that accept the encoding, and decompressed on the fly for the others. Directories, and hidden
+    files like the blobs and manifest of a content-addressed storage, aren't served.
+    """
+    if any(part.startswith(".") for part in path.split("/")):
+        raise Http404("Hidden files are not served.")
+
+    storage = get_artifact_storage()
+    try:
+        compressed_name = storage.get_compressed_name(path) if isinstance(storage, CompressedStorageMixin) else None
+        if compressed_name is None and not is_stored_file(storage, path):
+            raise Http404(f"{path} is not an archived file.")
+    except SuspiciousFileOperation as e:
+        raise Http404(str(e)) from e
+    if compressed_name is None:
+        return stream_file(request, storage.open(path, "rb"), mimetypes.guess_type(path)[0])
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    accepted_encodings = {
+        encoding.split(";")[0].strip() for encoding in request.headers.get("Accept-Encoding", "").split(",")
+    }
+    if storage.compression in accepted_encodings:
+        response = stream_file(request, storage.open(compressed_name, "rb"), content_type)
+        response["Content-Encoding"] = storage.compression
+    else:
+        response = StreamingHttpResponse(read_chunks(storage.open(path, "rb")), content_type=content_type)
+        response["Accept-Ranges"] = "none"
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+def is_stored_file(storage: Storage, name: str) -> bool:
+    """Return ``True`` if a file, not a directory, is stored under the name."""
+    try:
+        return os.path.isfile(storage.path(name))
+    except NotImplementedError:
+        # Storages without local paths, like object stores, have no directories
+        return bool(name) and storage.exists(name)
+
+
+def stream_file(request: HttpRequest, f: File, content_type: Optional[str]) -> HttpResponse:
+    """
+    Stream an open file, or the byte range of it that the request asks for.
+
+    Args:
+        request: The request for the file
+        f: The open file, which the response closes
+        content_type: The content type of the file
+
+    Returns:
+        The whole file, the requested range with status 206, or status 416 if the range is outside the file
+    """
+    content_type = content_type or "application/octet-stream"
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    try:
+        byte_range = parse_range(request.headers.get("Range", ""), size)
+    except ValueError:
+        f.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None or "If-Range" in request.headers:
+        response: HttpResponse = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        f.seek(start)
+        response = StreamingHttpResponse(read_range(f, end - start + 1), status=206, content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a ``Range`` header with a single byte range.
+
+    Args:
+        header: The value of the header
+        size: The size of the file
+
+    Raises:
+        ValueError: If the range is outside the file
+
+    Returns:
+        The first and last byte of the range, or ``None`` for a header that is missing or unsupported
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if not first:  # The last ``last`` bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(f"Range {header} is outside the file.")
+    return start, end
+
+
+def read_chunks(f: File) -> Iterator[bytes]:
+    """Read a whole file, a chunk at a time, and close it."""
+    try:
+        yield from f.chunks()
+    finally:
+        f.close()
+
+
+def read_range(f: File, length: int, chunk_size: int = File.DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read ``length`` bytes of a file from its current position, a chunk at a time, and close it."""
+    try:
+        while length > 0 and (chunk := f.read(min(chunk_size, length))):
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,246 @@
+"""A database-backed queue of archiving jobs, drained by one or more workers."""
+
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from archeion.index.models import ArchiveJob, Artifact, ArtifactStatus
+from archeion.logging import info, success, warning
+from archeion.utils import chunked
+
+DEFAULT_LEASE_SECONDS = 600
+"""How long a worker holds a job before other workers may take it."""
+
+DEFAULT_MAX_ATTEMPTS = 5
+"""How many times a job is attempted before it is given up on."""
+
+BACKOFF_BASE_SECONDS = 30
+"""The delay before the first retry. It doubles with every failed attempt."""
+
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+"""The longest delay between retries."""
+
+
+def enqueue_artifacts(
+    artifacts: Iterable[Artifact], priority: int = 0, max_attempts: int = DEFAULT_MAX_ATTEMPTS
+) -> None:
+    """
+    Queue the artifacts for archiving.
+
+    Artifacts that are already queued keep their existing job. Jobs that ran out of attempts get
+    their attempts back and are tried again right away.
+
+    Args:
+        artifacts: The artifacts to archive
+        priority: Jobs with higher priorities run first
+        max_attempts: How many times to try before giving up
+    """
+    jobs = [ArchiveJob(artifact=artifact, priority=priority, max_attempts=max_attempts) for artifact in artifacts]
+    ArchiveJob.objects.bulk_create(jobs, batch_size=500, ignore_conflicts=True)
+    for batch in chunked([job.artifact_id for job in jobs], 500):
+        ArchiveJob.objects.filter(artifact_id__in=batch, attempts__gte=F("max_attempts")).update(
+            attempts=0,
+            max_attempts=max_attempts,
+            priority=priority,
+            available_at=timezone.now(),
+            last_error="",
+        )
+
+
+def _available_jobs_query() -> Q:
+    """Jobs that are due, not leased by a live worker and not out of attempts."""
+    now = timezone.now()
+    return (
+        Q(available_at__lte=now)
+        & (Q(leased_until__isnull=True) | Q(leased_until__lt=now))
+        & Q(attempts__lt=F("max_attempts"))
+    )
+
+
+def lease_jobs(worker_id: str, limit: int = 10, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[ArchiveJob]:
+    """
+    Lease the next available jobs for a worker.
+
+    The lease is taken with a single conditional ``UPDATE``, so several workers can lease from the
+    same database at once without taking the same job, on SQLite as well as PostgreSQL.
+
+    Args:
+        worker_id: Identifies the worker taking the lease
+        limit: The maximum number of jobs to lease
+        lease_seconds: How long the worker has to finish the jobs
+
+    Returns:
+        The leased jobs, with their artifacts and links loaded, highest priority first.
+    """
+    candidate_ids = list(
+        ArchiveJob.objects.filter(_available_jobs_query())
+        .order_by("-priority", "available_at")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not candidate_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    ArchiveJob.objects.filter(_available_jobs_query(), pk__in=candidate_ids).update(
+        lease_token=token,
+        leased_by=worker_id,
+        leased_until=timezone.now() + timedelta(seconds=lease_seconds),
+    )
+    return list(
+        ArchiveJob.objects.filter(lease_token=token)
+        .select_related("artifact__link")
+        .order_by("-priority", "available_at")
+    )
+
+
+def complete_job(job: ArchiveJob) -> None:
+    """Remove a finished job from the queue, as long as the worker still holds its lease."""
+    ArchiveJob.objects.filter(pk=job.pk, lease_token=job.lease_token).delete()
+
+
+def get_backoff(attempts: int) -> timedelta:
+    """
+    Return how long to wait before retrying a job that failed ``attempts`` times.
+
+    The delay doubles with each attempt, up to a maximum, with some jitter so that jobs that failed
+    together don't all retry together.
+
+    Args:
+        attempts: The number of failed attempts so far
+
+    Returns:
+        The delay before the next attempt
+    """
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return timedelta(seconds=delay * random.uniform(1.0, 1.25))  # noqa: S311
+
+
+def fail_job(job: ArchiveJob, error_message: str = "") -> None:
+    """
+    Record a failed attempt and schedule the job's retry.
+
+    Once the job runs out of attempts it stays in the queue, but is never leased again.
+
+    Args:
+        job: The job that failed
+        error_message: Why the attempt failed
+    """
+    attempts = job.attempts + 1
+    ArchiveJob.objects.filter(pk=job.pk, lease_token=job.lease_token).update(
+        attempts=attempts,
+        available_at=timezone.now() + get_backoff(attempts),
+        lease_token=None,
+        leased_by=None,
+        leased_until=None,
+        last_error=error_message,
+    )
+    if attempts >= job.max_attempts:
+        warning(f"Giving up on {job.artifact.plugin_name} for {job.artifact.link.url} after {attempts} attempts.")
+
+
+def release_jobs(jobs: Iterable[ArchiveJob]) -> None:
+    """Give up the leases on unprocessed jobs, without counting an attempt."""
+    for job in jobs:
+        ArchiveJob.objects.filter(pk=job.pk, lease_token=job.lease_token).update(
+            lease_token=None, leased_by=None, leased_until=None
+        )
+
+
+def process_jobs(jobs: List[ArchiveJob], should_stop: Callable[[], bool] = lambda: False) -> Tuple[int, int]:
+    """
+    Archive the artifacts of leased jobs, and complete or retry each job.
+
+    The artifacts of a link are archived together, so the browser archivers share a page load.
+    ``should_stop`` is checked before each link. Once it returns ``True``, the leases on the
+    remaining jobs are given up, so other workers can take them right away.
+
+    Args:
+        jobs: Leased jobs
+        should_stop: Checked before each link's jobs
+
+    Returns:
+        The number of jobs that succeeded and failed
+    """
+    from archeion.archive import archive_artifacts
+
+    jobs_by_link: Dict[str, List[ArchiveJob]] = {}
+    for job in jobs:
+        jobs_by_link.setdefault(job.artifact.link_id, []).append(job)
+
+    succeeded = failed = 0
+    link_jobs_list = list(jobs_by_link.values())
+    for index, link_jobs in enumerate(link_jobs_list):
+        if should_stop():
+            release_jobs(job for remaining in link_jobs_list[index:] for job in remaining)
+            break
+
+        finished = {artifact.id: artifact for artifact in archive_artifacts([job.artifact for job in link_jobs])}
+        for job in link_jobs:
+            artifact = finished.get(job.artifact_id)
+            if artifact is not None and artifact.status in (ArtifactStatus.SUCCEEDED, ArtifactStatus.SKIPPED):
+                complete_job(job)
+                succeeded += 1
+            else:
+                reason = "The archiver raised an error." if artifact is None else f"The artifact {artifact.status}."
+                fail_job(job, reason)
+                failed += 1
+    return succeeded, failed
+
+
+def get_worker_id() -> str:
+    """Return an ID for this worker process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(
+    worker_id: Optional[str] = None,
+    batch_size: int = 10,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = 5.0,
+    burst: bool = False,
+    should_stop: Callable[[], bool] = lambda: False,
+    on_batch: Optional[Callable[[List[ArchiveJob]], None]] = None,
+) -> int:
+    """
+    Lease and process jobs until told to stop.
+
+    Args:
+        worker_id: Identifies this worker. Defaults to the host name and process ID.
+        batch_size: How many jobs to lease at a time
+        lease_seconds: How long the worker has to finish a batch
+        poll_interval: How many seconds to wait when the queue is empty
+        burst: Stop when the queue is empty, instead of waiting for more jobs
+        should_stop: Checked before each link is archived. The worker stops when it returns ``True``.
+        on_batch: Called with each batch of jobs after they are processed
+
+    Returns:
+        The number of jobs processed
+    """
+    worker_id = worker_id or get_worker_id()
+    processed = 0
+    info(f"Worker {worker_id} is waiting for archive jobs...")
+    while not should_stop():
+        jobs = lease_jobs(worker_id, limit=batch_size, lease_seconds=lease_seconds)
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        succeeded, failed = process_jobs(jobs, should_stop)
+        processed += succeeded + failed
+        success(
+            f"Processed {succeeded + failed} jobs: {succeeded} succeeded, {failed} will be retried.", left_indent=2
+        )
+        if on_batch:
+            on_batch(jobs)
+
+    info(f"Worker {worker_id} stopped after {processed} jobs.")
+    return processed
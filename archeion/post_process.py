@@ -3,54 +3,301 @@
 # Metadata
 # convert to Markdown html2text https://github.com/Alir3z4/html2text/blob/master/docs/usage.md
 # Summary: https://platform.openai.com/playground/p/default-chat?model=text-davinci-003
-from typing import List, Optional
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
 
-from django.db.models import QuerySet
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import QuerySet, prefetch_related_objects
+from django.utils import timezone
 
+from archeion.index.model_functions import defer_link_data, index_link_data
 from archeion.index.models import Artifact, ArtifactStatus, Link
-from archeion.logging import info
+from archeion.logging import error, info
+from archeion.utils import chunked
+
+
+@dataclass
+class PostProcessTask:
+    """The work a post-processing worker does for one link. It holds no database objects."""
+
+    link_id: str
+    url: str
+    dom_path: str
+    metadata: bool
+    markdown: bool
+
+
+@dataclass
+class PostProcessResult:
+    """What a post-processing worker returns to be saved."""
+
+    link_id: str
+    source_hash: str = ""
+    metadata: Optional[dict] = None
+    markdown: Optional[str] = None
+    error: Optional[str] = None
 
 
 def get_links_with_dom() -> QuerySet:
     """Get all Links with pending status."""
     return (
-        Link.objects.filter(artifacts__status=ArtifactStatus.SUCCEEDED, artifacts__plugin_name="dom")
+        Link.objects.filter(artifacts__status=ArtifactStatus.SUCCEEDED, artifacts__plugin_name="DOM")
         .prefetch_related("artifacts")
         .order_by("-created_at")
     )
 
 
-def post_process_links(links: Optional[List[Link]] = None, overwrite: bool = False) -> None:
-    """Post-process archived links."""
-    if links is None:
-        links = get_links_with_dom()
-        info("Post-processing links with DOM artifacts...")
-    else:
-        info(f"Post-processing {len(links)} links...")
+def post_process_links(
+    links: Optional[Iterable[Link]] = None,
+    overwrite: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    changed_only: bool = False,
+) -> None:
+    """
+    Post-process archived links.
+
+    The DOM artifacts are parsed in ``workers`` processes, ``chunk_size`` links at a time. The workers
+    only read the DOM artifacts; their results are saved by this process, a chunk per transaction.
 
+    Args:
+        links: The links to post-process. Defaults to every link with a DOM artifact.
+        overwrite: Redo the post-processing of links that were already processed
+        workers: The number of processes to post-process in. Defaults to ``post_process_workers``.
+        chunk_size: The number of links sent to a worker and saved at a time. Defaults to
+            ``post_process_chunk_size``.
+        changed_only: Also redo the post-processing of links whose DOM or post-processor version
+            changed since they were processed
+    """
+    links = list(get_links_with_dom() if links is None else links)
+    info(f"Post-processing {len(links)} links...")
+    create_post_process_artifacts(links)
+
+    workers = workers or settings.POST_PROCESS_WORKERS
+    chunk_size = chunk_size or settings.POST_PROCESS_CHUNK_SIZE
+    links_by_id = {}
+    tasks = []
     for link in links:
-        info(f"Post-processing link {link.url}...")
+        task = get_post_process_task(link, overwrite, changed_only)
+        if task:
+            links_by_id[task.link_id] = link
+            tasks.append(task)
 
-        post_process(link, overwrite)
+    with defer_link_data():
+        for results in chunked(run_post_process_tasks(tasks, workers, chunk_size), chunk_size):
+            with transaction.atomic():
+                for result in results:
+                    save_post_process_result(result, links_by_id[result.link_id])
 
 
 def post_process(link: Link, overwrite: bool = False) -> None:
     """Given a link, generate post_processors from the DOM artifact."""
-    from archeion.index.storage import get_artifact_storage
-    from archeion.post_processors.html import save_html_metadata
-    from archeion.post_processors.markdown import convert_to_markdown
+    create_post_process_artifacts([link])
+    task = get_post_process_task(link, overwrite)
+    if task:
+        save_post_process_result(run_post_process_task(task), link)
+
+
+def get_link_artifacts(link: Link) -> Dict[str, Artifact]:
+    """Return the artifacts of a link by plugin name, from its prefetched artifacts if it has them."""
+    return {artifact.plugin_name: artifact for artifact in link.artifacts.all()}
+
+
+def create_post_process_artifacts(links: List[Link]) -> None:
+    """
+    Prefetch the artifacts of links, and create the post-processing artifacts the links with a DOM are missing.
+
+    This takes a few queries however many links there are, instead of a few per link.
+
+    Args:
+        links: The links to post-process
+    """
+    from archeion.post_processors import html, markdown
+
+    prefetch_related_objects(links, "artifacts")
+    now = timezone.now()
+    new_artifacts = []
+    changed_links = []
+    for link in links:
+        artifacts = get_link_artifacts(link)
+        if "DOM" not in artifacts:
+            continue
+        missing = [
+            Artifact(link=link, plugin_name=plugin_name, output_path=output_path, start_ts=now)
+            for plugin_name, output_path in (
+                (html.PLUGIN_NAME, html.OUTPUT_PATH),
+                (markdown.PLUGIN_NAME, markdown.OUTPUT_PATH),
+            )
+            if plugin_name not in artifacts
+        ]
+        # ``bulk_create`` doesn't number the artifacts of a link like ``save`` does
+        next_order = max((artifact._order for artifact in artifacts.values()), default=-1) + 1
+        for order, artifact in enumerate(missing, next_order):
+            artifact._order = order
+        if missing:
+            new_artifacts.extend(missing)
+            changed_links.append(link)
+
+    if not new_artifacts:
+        return
+    # Another process may have created some of them since they were prefetched
+    Artifact.objects.bulk_create(new_artifacts, ignore_conflicts=True)
+    for link in changed_links:
+        link._prefetched_objects_cache.pop("artifacts", None)
+    prefetch_related_objects(changed_links, "artifacts")
+
+
+def get_post_process_task(
+    link: Link, overwrite: bool = False, changed_only: bool = False
+) -> Optional[PostProcessTask]:
+    """
+    Return the post-processing a link needs.
+
+    The link's artifacts are read from its prefetched artifacts, see ``create_post_process_artifacts``.
+
+    Args:
+        link: The link to post-process
+        overwrite: Redo the post-processing even if it succeeded before
+        changed_only: Redo the post-processing that succeeded before, if its DOM or post-processor
+            version changed since
+
+    Returns:
+        The task, or ``None`` if the link has no DOM artifact or nothing to redo
+    """
+    from archeion.index.storage import hash_artifact_file
+    from archeion.post_processors import html, markdown
+
+    artifacts = get_link_artifacts(link)
+    if "DOM" not in artifacts:
+        return None
+
+    dom_path = str(artifacts["DOM"].archive_output_path)
+    metadata_artifact = artifacts.get(html.PLUGIN_NAME) or html.get_html_metadata_artifact(link)
+    markdown_artifact = artifacts.get(markdown.PLUGIN_NAME) or markdown.get_markdown_artifact(link)
+    needs_metadata = overwrite or metadata_artifact.status != ArtifactStatus.SUCCEEDED
+    needs_markdown = overwrite or markdown_artifact.status != ArtifactStatus.SUCCEEDED
 
-    storage = get_artifact_storage()
+    if changed_only and not (needs_metadata and needs_markdown):
+        dom_hash = hash_artifact_file(dom_path)
+        needs_metadata = needs_metadata or is_outdated(metadata_artifact, dom_hash, html.PROCESSOR_VERSION)
+        needs_markdown = needs_markdown or is_outdated(markdown_artifact, dom_hash, markdown.PROCESSOR_VERSION)
 
+    if not (needs_metadata or needs_markdown):
+        return None
+
+    return PostProcessTask(
+        link_id=link.id,
+        url=link.url,
+        dom_path=dom_path,
+        metadata=needs_metadata,
+        markdown=needs_markdown,
+    )
+
+
+def is_outdated(artifact: Artifact, source_hash: str, processor_version: str) -> bool:
+    """
+    Return ``True`` if an artifact was generated from another source, or by another post-processor version.
+
+    Args:
+        artifact: The post-processing artifact
+        source_hash: The hash of the source artifact's current content
+        processor_version: The current version of the artifact's post-processor
+    """
+    return artifact.source_hash != source_hash or artifact.processor_version != processor_version
+
+
+def run_post_process_tasks(tasks: List[PostProcessTask], workers: int, chunk_size: int) -> Iterator[PostProcessResult]:
+    """
+    Run post-processing tasks, in worker processes if there is more than one worker.
+
+    Args:
+        tasks: The tasks to run
+        workers: The number of processes to run the tasks in
+        chunk_size: The number of tasks sent to a worker at a time
+
+    Yields:
+        The results, in the order of the tasks
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(run_post_process_task, tasks)
+        return
+
+    # Forked workers must not share this process's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_post_process_worker) as executor:
+        yield from executor.map(run_post_process_task, tasks, chunksize=chunk_size)
+
+
+def init_post_process_worker() -> None:
+    """Set up Django in a post-processing worker, unless it was inherited from the parent process."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def run_post_process_task(task: PostProcessTask) -> PostProcessResult:
+    """
+    Parse a DOM artifact, and extract what the task asks for. This doesn't touch the database.
+
+    Args:
+        task: The task to run
+
+    Returns:
+        The extracted metadata and Markdown, or the error that stopped the extraction
+    """
+    from archeion.index.storage import get_artifact_storage
+    from archeion.post_processors.document import HTMLDocument
+    from archeion.post_processors.html import parse_html_metadata
+    from archeion.post_processors.markdown import render_markdown
+
+    result = PostProcessResult(link_id=task.link_id)
     try:
-        dom_artifact = link.artifacts.get(plugin_name="DOM")
-        dom_content = storage.open(dom_artifact.archive_output_path, "r").read()
+        with get_artifact_storage().open(task.dom_path, "rb") as f:
+            dom_content = f.read()
+        # Hash the DOM as read, so the artifacts record the exact content they came from
+        result.source_hash = hashlib.sha256(dom_content).hexdigest()
+
+        # Parse the DOM once, and share the parsed document with each post-processor
+        document = HTMLDocument(dom_content.decode("utf8", errors="replace"), task.url)
+        if task.metadata:
+            result.metadata = parse_html_metadata(document, task.url)
+        if task.markdown:
+            result.markdown = render_markdown(document, task.url)
+    except Exception as e:  # noqa: BLE001
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
 
-        save_html_metadata(dom_content, link, overwrite)
+def save_post_process_result(result: PostProcessResult, link: Link) -> None:
+    """
+    Save the results of post-processing a link to the link and its artifacts, and index the link.
 
-        # Convert to Markdown
-        convert_to_markdown(dom_content, link, overwrite)
+    Args:
+        result: The result of the link's task
+        link: The link that was post-processed
+    """
+    from archeion.post_processors import html, markdown
 
-        # Summarize
-    except Artifact.DoesNotExist:
+    if result.error:
+        error([f"Post-processing {link.url} failed:", result.error])
         return
+
+    info(f"Post-processed link {link.url}")
+    artifacts = get_link_artifacts(link)
+    if result.metadata is not None:
+        artifact = artifacts.get(html.PLUGIN_NAME) or html.get_html_metadata_artifact(link)
+        html.store_html_metadata(result.metadata, link, artifact, result.source_hash)
+    if result.markdown is not None:
+        artifact = artifacts.get(markdown.PLUGIN_NAME) or markdown.get_markdown_artifact(link)
+        markdown.store_markdown(result.markdown, link, artifact, result.source_hash)
+
+    try:
+        index_link_data(link)
+    except ImportError:
+        # The search backend logged why it couldn't be loaded
+        pass
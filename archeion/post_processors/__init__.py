@@ -1,12 +1,13 @@
 """Functions to transform HTML to other formats."""
 
-from copy import deepcopy
+import threading
 from functools import cached_property
 from pathlib import Path
-from typing import List, Optional, Protocol
+from typing import Any, List, Mapping, Optional, Protocol
 
-from archeion.archivers import logger
-from archeion.config import ArchiverSettings
+from django.core.signals import setting_changed
+
+from archeion.archivers import PluginRegistry, RegisteredPlugin
 from archeion.index.models import Artifact
 
 
@@ -47,45 +48,44 @@ class PostProcessorPlugin(Protocol):  # pragma: no cover
         ...
 
 
-def get_all_post_processors() -> List[ArchiverSettings]:
-    """Return a list of available post-processors."""
-    import importlib
+_REGISTRY: Optional[PluginRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
 
+
+def get_post_processor_registry() -> PluginRegistry:
+    """Return the process-wide post-processor registry, creating it if necessary."""
+    global _REGISTRY  # noqa: PLW0603
     from django.conf import settings
 
-    plugins = []
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = PluginRegistry(settings.POST_PROCESSORS)
+        return _REGISTRY
+
 
-    for archiver in settings.POST_PROCESSORS:
-        plugin_info = deepcopy(archiver)
-        module, class_name = plugin_info.class_path.rsplit(".", 1)
-        try:
-            if not archiver.enabled:
-                plugin_info = disable_plugin(plugin_info, class_name)
-            else:
-                plugin_class = getattr(importlib.import_module(module), class_name)
-                plugin_info.klass = plugin_class(config=archiver.dict())
-                plugin_info.name = plugin_class.plugin_name
-        except (ImportError, AttributeError) as e:
-            logger.error(f"Unable to load archiver plugin {class_name}: {e}")
-            plugin_info = disable_plugin(plugin_info, class_name)
-        plugins.append(plugin_info)
+def reset_post_processor_registry(**kwargs) -> None:
+    """Forget the post-processor registry, so it is rebuilt from the settings on next use."""
+    global _REGISTRY  # noqa: PLW0603
 
-    return plugins
+    if kwargs.get("setting", "POST_PROCESSORS") != "POST_PROCESSORS":
+        return
+    with _REGISTRY_LOCK:
+        _REGISTRY = None
 
 
-def disable_plugin(plugin_info: ArchiverSettings, class_name: str) -> ArchiverSettings:
-    """Disable a plugin."""
-    plugin_info.enabled = False
-    plugin_info.name = class_name
-    plugin_info.klass = None
-    return plugin_info
+setting_changed.connect(reset_post_processor_registry)
+
+
+def get_all_post_processors() -> List[RegisteredPlugin]:
+    """Return a list of available post-processors."""
+    return get_post_processor_registry().plugins
 
 
-def get_post_processors_map() -> dict:
-    """Return a map of available archivers."""
-    return {plugin.name: plugin.klass for plugin in get_all_post_processors()}
+def get_post_processors_map() -> Mapping[str, Any]:
+    """Return a map of available post-processors. They are only instantiated when looked up."""
+    return get_post_processor_registry()
 
 
 def get_default_archivers() -> List[PostProcessorPlugin]:
     """Return just the default Archivers."""
-    return [info.klass for info in get_all_post_processors() if info.enabled]
+    return [info.klass for info in get_post_processor_registry().enabled_plugins()]
@@ -0,0 +1,65 @@
+"""An HTML document parsed once and shared by the post-processors."""
+
+from functools import cached_property
+from typing import Optional, Union
+
+from extruct.xmldom import XmlDomHTMLParser
+from lxml import html
+from lxml.html import HtmlElement
+
+
+class HTMLDocument:
+    """
+    An HTML document, parsed into a single lxml tree.
+
+    Elements that carry no content, ``<style>`` elements and ``<script>`` elements that aren't
+    JSON-LD, are removed while parsing. The post-processors all read the same tree instead of each
+    parsing the raw HTML again.
+
+    Args:
+        source: The raw HTML
+        url: The URL the document was archived from
+    """
+
+    def __init__(self, source: str, url: Optional[str] = None):
+        self.source = source
+        self.url = url
+
+    @cached_property
+    def tree(self) -> HtmlElement:
+        """The parsed document, without the elements that carry no content."""
+        body = self.source.strip().replace("\x00", "").encode("utf8") or b"<html/>"
+        # extruct's parser builds a tree that its extractors can also query as a DOM
+        parser = XmlDomHTMLParser(recover=True, encoding="utf8")
+        tree = html.document_fromstring(body, parser=parser, base_url=self.url)
+        strip_excess_elements(tree)
+        return tree
+
+    @cached_property
+    def html(self) -> str:
+        """The HTML of the tree, for consumers that only accept a string."""
+        return html.tostring(self.tree, encoding="unicode")
+
+    @cached_property
+    def text(self) -> str:
+        """The text of the document's body, for keyword extraction and indexing."""
+        return " ".join(self.tree.xpath("//body//text()[not(ancestor::script)]"))
+
+
+def strip_excess_elements(tree: HtmlElement) -> None:
+    """
+    Remove the elements that do not provide any content, in place.
+
+    - style
+    - script that are not json-ld
+
+    Args:
+        tree: The parsed HTML
+    """
+    for element in tree.xpath("//style | //script[not(@type='application/ld+json')]"):
+        element.drop_tree()
+
+
+def as_document(content: Union[str, HTMLDocument], url: Optional[str] = None) -> HTMLDocument:
+    """Return ``content`` as a parsed document, parsing it if it is a string."""
+    return content if isinstance(content, HTMLDocument) else HTMLDocument(content, url)
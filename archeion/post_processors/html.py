@@ -2,37 +2,59 @@
 
 import json
 import os
+from typing import Union
 
 from django.core.exceptions import SuspiciousFileOperation
 from django.core.files.base import ContentFile
 from django.utils import timezone
 
-from archeion.index.models import ArtifactStatus, Link
+from archeion.index.models import Artifact, ArtifactStatus, Link
 from archeion.index.storage import get_artifact_storage
 from archeion.logging import error, success
-from archeion.post_processors.dandelion import get_dandelion_tags
+from archeion.post_processors.document import HTMLDocument, as_document
+from archeion.post_processors.keywords import extract_keywords
 from archeion.utils import IterableEncoder
 
 PLUGIN_NAME = "html_metadata"
+OUTPUT_PATH = "html_metadata.json"
+PROCESSOR_VERSION = "1"
+"""Bump when a change alters the extracted metadata, so ``post_process --changed-only`` redoes it."""
 
 
-def save_html_metadata(content: str, link: Link, overwrite: bool = True) -> None:
+def save_html_metadata(content: Union[str, HTMLDocument], link: Link, overwrite: bool = True) -> None:
     """
     Create an HTML metadata Artifact for a link.
 
     Args:
-        content: The raw HTML content
+        content: The raw HTML content, or the already parsed document
         link: The link to save the metadata for
         overwrite: Whether to overwrite an existing metadata artifact
     """
-    artifact, _ = link.artifacts.get_or_create(
-        plugin_name=PLUGIN_NAME, defaults={"output_path": "html_metadata.json", "start_ts": timezone.now()}
-    )
+    artifact = get_html_metadata_artifact(link)
     if artifact.status == ArtifactStatus.SUCCEEDED and not overwrite:
         return
 
-    # Create the metadata
-    metadata = parse_html_metadata(content, link.url)
+    store_html_metadata(parse_html_metadata(content, link.url), link, artifact)
+
+
+def get_html_metadata_artifact(link: Link) -> Artifact:
+    """Return the HTML metadata artifact of a link, creating it if necessary."""
+    artifact, _ = link.artifacts.get_or_create(
+        plugin_name=PLUGIN_NAME, defaults={"output_path": OUTPUT_PATH, "start_ts": timezone.now()}
+    )
+    return artifact
+
+
+def store_html_metadata(metadata: dict, link: Link, artifact: Artifact, source_hash: str = "") -> None:
+    """
+    Save extracted metadata to a link and to its HTML metadata artifact.
+
+    Args:
+        metadata: The metadata from ``parse_html_metadata``
+        link: The link the metadata was extracted for
+        artifact: The link's HTML metadata artifact
+        source_hash: The hash of the DOM the metadata was extracted from
+    """
     link.update_metadata(metadata)
     link.save()
 
@@ -42,6 +64,8 @@ def save_html_metadata(content: str, link: Link, overwrite: bool = True) -> None
         filepath = os.path.join(link.archive_path, artifact.output_path)
         storage.save(filepath, ContentFile(json.dumps(metadata, cls=IterableEncoder, indent=2)))
         artifact.status = ArtifactStatus.SUCCEEDED
+        artifact.source_hash = source_hash
+        artifact.processor_version = PROCESSOR_VERSION
         success(f"Saved {PLUGIN_NAME} to {filepath}")
     except SuspiciousFileOperation as e:  # pragma: no coverage
         artifact.status = ArtifactStatus.FAILED
@@ -51,12 +75,12 @@ def save_html_metadata(content: str, link: Link, overwrite: bool = True) -> None
     artifact.save()
 
 
-def parse_html_metadata(content: str, source: str) -> dict:
+def parse_html_metadata(content: Union[str, HTMLDocument], source: str) -> dict:
     """
     Extract post_processors from HTML content.
 
     Args:
-        content: The content to process
+        content: The content to process, raw or already parsed
         source: The URL source of the content
 
     Returns:
@@ -64,40 +88,8 @@ def parse_html_metadata(content: str, source: str) -> dict:
     """
     from archeion.post_processors.html_metadata import Normalizer, extract_metadata
 
-    page_source = strip_excess_elements(content)
-    raw_metadata = extract_metadata(page_source, source)
+    document = as_document(content, source)
+    raw_metadata = extract_metadata(document, source)
     metadata = Normalizer(raw_metadata, source).normalized_metadata()
-    metadata["keywords"] |= get_dandelion_tags(page_source, "text/html")
+    metadata["keywords"] |= extract_keywords([document.text])[0]
     return metadata
-
-
-def strip_excess_elements(page_source: str) -> str:
-    """
-    Get rid of elements that do not provide any content.
-
-    - style
-    - script that are not json-ld
-
-    Args:
-        page_source: Raw HTML
-
-    Returns:
-        The HTML without those tags
-    """
-    from bs4 import BeautifulSoup, Tag
-
-    def not_jsonld(element: Tag) -> bool:
-        if element.name != "script":
-            return False
-
-        return not (element.has_attr("type") and element["type"] == "application/ld+json")
-
-    soup = BeautifulSoup(page_source, "html.parser")
-
-    for tag in soup.find_all("style"):
-        tag.decompose()
-
-    for tag in soup.find_all(not_jsonld):
-        tag.decompose()
-
-    return soup.prettify()
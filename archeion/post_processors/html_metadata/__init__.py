@@ -3,8 +3,9 @@
 import logging
 from collections import ChainMap
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
+from archeion.post_processors.document import HTMLDocument, as_document
 from archeion.post_processors.html_metadata import custom_extract
 from archeion.post_processors.html_metadata.github import parse_gh_tags
 from archeion.post_processors.html_metadata.html import process_html_metadata
@@ -184,12 +185,12 @@ class Normalizer:
         return self.lookup.get("sourceEncodingFormat", "text/html")
 
 
-def extract_metadata(page_source: str, url: Optional[str] = None) -> dict:
+def extract_metadata(page_source: Union[str, HTMLDocument], url: Optional[str] = None) -> dict:
     """
     Aggregate all the test_metadata from a parsed HTML file.
 
     Args:
-        page_source: The raw HTML source for a web page
+        page_source: The raw HTML source for a web page, or the already parsed document
         url: The URL for the page
 
     Returns:
@@ -197,25 +198,24 @@ def extract_metadata(page_source: str, url: Optional[str] = None) -> dict:
     """
     from collections import defaultdict
 
-    from bs4 import BeautifulSoup
+    document = as_document(page_source, url)
+    tree = document.tree
+    data = custom_extract.extract_from_tree(tree, document.html, base_url=url)
 
-    data = custom_extract.extract(page_source, base_url=url)
-
-    soup = BeautifulSoup(page_source, "html.parser")
     meta_groups: Dict[str, Dict[str, Any]] = defaultdict(dict)
-    title = soup.title
-    meta_groups["html"]["title"] = title.text.strip() if title else None
+    title = tree.find(".//title")
+    meta_groups["html"]["title"] = title.text_content().strip() if title is not None else None
 
-    for tag in soup.find_all("meta"):
-        name = tag.attrs.get("property", tag.attrs.get("name"))
+    for tag in tree.iter("meta"):
+        name = tag.attrib.get("property", tag.attrib.get("name"))
         if name is None:
             continue
         group, tag_name = name.split(":", maxsplit=1) if ":" in name else ("html", name)
-        meta_groups[group][tag_name] = tag.attrs.get("content")
+        meta_groups[group][tag_name] = tag.attrib.get("content")
 
     if "html" in meta_groups:
         data["html"] = [meta_groups["html"]]
     if "twitter" in meta_groups:
         data["twitter"] = [meta_groups["twitter"]]
-    data["github"] = {"keywords": parse_gh_tags(soup) or []}
+    data["github"] = {"keywords": parse_gh_tags(tree) or []}
     return data
@@ -0,0 +1,199 @@
+"""An on-disk cache of remote JSON-LD documents, like contexts."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urljoin
+
+import httpx
+from django.conf import settings
+
+from archeion.logging import warning
+
+SNAPSHOT_DIR = Path(__file__).parent / "snapshots"
+
+BUNDLED_SNAPSHOTS = {
+    "https://schema.org/": ("https://schema.org/docs/jsonldcontext.jsonld", "schema.org.jsonld"),
+}
+"""The document URL and snapshot file of the contexts shipped with Archeion, by URL."""
+
+JSONLD_ACCEPT = "application/ld+json, application/json;q=0.9, text/html;q=0.5"
+
+
+class ContextUnavailableError(Exception):
+    """A remote JSON-LD document is neither cached nor retrievable."""
+
+    pass
+
+
+class ContextCache:
+    """
+    Remote JSON-LD documents, cached on disk.
+
+    A cached document is used as is until it is older than ``ttl``. After that, it is revalidated
+    with its ``ETag``, so an unchanged document isn't downloaded again. When the document can't be
+    retrieved, the stale copy is used. Documents without a cached copy are seeded from the bundled
+    snapshots. When ``offline`` is set, nothing is retrieved at all.
+
+    Each URL has its own lock, so a slow document only holds up the threads that need it.
+
+    Args:
+        cache_dir: The directory to store the documents in
+        ttl: The number of seconds a cached document is used without revalidating it
+        offline: Never retrieve documents over the network
+        timeout: The number of seconds to wait for a remote document
+        verify: Verify the SSL certificates of remote documents
+    """
+
+    def __init__(self, cache_dir: Path, ttl: int, offline: bool = False, timeout: int = 30, verify: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.offline = offline
+        self.timeout = timeout
+        self.verify = verify
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+
+    def entry_path(self, url: str) -> Path:
+        """Return the path to the cache file of a URL."""
+        return self.cache_dir / f"{hashlib.sha256(url.encode('utf8')).hexdigest()}.json"
+
+    def url_lock(self, url: str) -> threading.Lock:
+        """Return the lock of a URL, which is held while its entry is read, retrieved and written."""
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def read(self, url: str) -> Optional[dict]:
+        """Return the cached entry of a URL, if there is one."""
+        if url in self._entries:
+            return self._entries[url]
+        try:
+            entry = json.loads(self.entry_path(url).read_text())
+        except (OSError, ValueError):
+            return None
+        self._entries[url] = entry
+        return entry
+
+    def write(self, url: str, entry: dict) -> None:
+        """Cache the entry of a URL, in memory and on disk."""
+        self._entries[url] = entry
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so other processes never read a partial entry
+        with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+            json.dump(entry, f)
+        os.replace(f.name, self.entry_path(url))
+
+    def seed(self, url: str) -> Optional[dict]:
+        """
+        Cache the bundled snapshot of a URL, if there is one.
+
+        Args:
+            url: The URL of the document
+
+        Returns:
+            The new entry
+        """
+        if url not in BUNDLED_SNAPSHOTS:
+            return None
+        document_url, filename = BUNDLED_SNAPSHOTS[url]
+        entry = {
+            "url": url,
+            "document_url": document_url,
+            "etag": None,
+            "fetched_at": time.time(),
+            "document": json.loads((SNAPSHOT_DIR / filename).read_text()),
+        }
+        self.write(url, entry)
+        return entry
+
+    def fetch(self, url: str, entry: Optional[dict] = None) -> dict:
+        """
+        Retrieve a document, revalidating the cached entry if there is one.
+
+        Pages that aren't JSON, like the schema.org home page, are followed to the JSON-LD document
+        their ``Link`` header points to.
+
+        Args:
+            url: The URL of the document
+            entry: The cached entry of the URL
+
+        Raises:
+            HTTPError: If the document could not be retrieved
+            ValueError: If the document isn't JSON
+
+        Returns:
+            The new entry
+        """
+        headers = {"Accept": JSONLD_ACCEPT}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+
+        with httpx.Client(follow_redirects=True, timeout=self.timeout, verify=self.verify) as client:
+            response = client.get(entry["document_url"] if entry else url, headers=headers)
+            if response.status_code == 304 and entry:
+                return {**entry, "fetched_at": time.time()}
+            response.raise_for_status()
+
+            alternate = response.links.get("alternate", {})
+            if "json" not in response.headers.get("Content-Type", "") and "json" in alternate.get("type", ""):
+                response = client.get(urljoin(str(response.url), alternate["url"]), headers=headers)
+                if response.status_code == 304 and entry:
+                    return {**entry, "fetched_at": time.time()}
+                response.raise_for_status()
+
+        return {
+            "url": url,
+            "document_url": str(response.url),
+            "etag": response.headers.get("ETag"),
+            "fetched_at": time.time(),
+            "document": response.json(),
+        }
+
+    def get(self, url: str) -> dict:
+        """
+        Return the entry of a URL, from the cache if it is fresh.
+
+        Args:
+            url: The URL of the document
+
+        Raises:
+            ContextUnavailableError: If the document isn't cached and can't be retrieved
+
+        Returns:
+            The entry, with the document and the URL it came from
+        """
+        with self.url_lock(url):
+            entry = self.read(url) or self.seed(url)
+            if entry and (self.offline or time.time() - entry["fetched_at"] < self.ttl):
+                return entry
+            if self.offline:
+                raise ContextUnavailableError(f"{url} is not cached, and remote documents are disabled.")
+
+            try:
+                new_entry = self.fetch(url, entry)
+            except (httpx.HTTPError, ValueError) as e:
+                if entry is None:
+                    raise ContextUnavailableError(f"{url} could not be retrieved: {e}") from e
+                warning(f"Using the stale cached copy of {url}; it could not be revalidated: {e}")
+                return entry
+
+            self.write(url, new_entry)
+            return new_entry
+
+
+@lru_cache(maxsize=None)
+def get_context_cache() -> ContextCache:
+    """Return the context cache configured in the settings."""
+    return ContextCache(
+        settings.JSONLD_CONTEXT_CACHE_DIR,
+        ttl=settings.JSONLD_CONTEXT_TTL,
+        offline=settings.JSONLD_OFFLINE,
+        verify=settings.CHECK_SSL_VALIDITY,
+    )
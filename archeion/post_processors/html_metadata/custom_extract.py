@@ -43,14 +43,32 @@ def extract(html_str: str, base_url: Optional[str] = None, syntaxes: Iterable =
     Returns:
         A dictionary with extracted metadata.
     """
-    if any(v not in SYNTAXES for v in syntaxes):
-        raise ValueError(f"`syntaxes` must be a list with any or all (default) of these values: {SYNTAXES}")
-
     body = html_str.strip().replace("\x00", "").encode("utf8") or b"<html/>"
     parser = XmlDomHTMLParser(recover=True, encoding="utf8")
     tree = html.document_fromstring(body, parser=parser, base_url=base_url)
-    processors = get_processors(syntaxes, html_str, tree)
+    return extract_from_tree(tree, html_str, base_url, syntaxes)
+
+
+def extract_from_tree(tree: Any, html_str: str, base_url: Optional[str] = None, syntaxes: Iterable = SYNTAXES) -> dict:
+    """
+    Extracts metadata from an already parsed HTML document.
+
+    Args:
+        tree: The document, parsed with extruct's ``XmlDomHTMLParser``
+        html_str: The HTML of the document, for the extractors that can't use the tree
+        base_url: base url of the html document
+        syntaxes: list of syntaxes to extract
 
+    Raises:
+        ValueError: if syntaxes is not an iterable
+
+    Returns:
+        A dictionary with extracted metadata.
+    """
+    if any(v not in SYNTAXES for v in syntaxes):
+        raise ValueError(f"`syntaxes` must be a list with any or all (default) of these values: {SYNTAXES}")
+
+    processors = get_processors(syntaxes, html_str, tree)
     return {syntax: list(extractor(document, base_url=base_url)) for syntax, extractor, document in processors}
 
 
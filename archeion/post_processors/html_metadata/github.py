@@ -1,16 +1,17 @@
 """Pulling tags from github pages."""
 
-from bs4 import BeautifulSoup
+from lxml.html import HtmlElement
 
 
-def parse_gh_tags(soup: BeautifulSoup) -> set:
+def parse_gh_tags(tree: HtmlElement) -> set:
     """
     Parse tags from a GitHub repository page.
 
     Args:
-        soup: The Beautiful Soup-parsed object
+        tree: The lxml-parsed document
 
     Returns:
         A set of string tags. Might be an empty set if no tags exist.
     """
-    return {i.string.strip() for i in soup.find_all(attrs={"class": "topic-tag"})}
+    topic_tags = tree.xpath("//*[contains(concat(' ', normalize-space(@class), ' '), ' topic-tag ')]")
+    return {tag.text_content().strip() for tag in topic_tags}
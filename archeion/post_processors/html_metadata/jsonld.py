@@ -1,19 +1,20 @@
 """JSON-LD parsing."""
 
-import json
-from collections import ChainMap
-from typing import List, Optional
+import copy
+from typing import Any, List, Optional
 
 import dateutil.parser
 import networkx as nx
-from django.conf import settings
 
-from archeion.dependency import run_shell
 from archeion.logging import error
+from archeion.post_processors.html_metadata.context_cache import ContextUnavailableError, get_context_cache
 from archeion.utils import ensure_list
 
 jsonld_type_blacklist = ("ReadAction", "BreadcrumbList", "ListItem", "SearchAction")
 
+SCHEMA_ORG_CONTEXT_URL = "https://schema.org/"
+"""The context JSON-LD data is compacted against."""
+
 
 def contextify(context: str, value: str) -> str:
     """
@@ -60,8 +61,7 @@ def parse_jsonld_data(data: List[dict]) -> dict:  # noqa: C901
     # pick one of the elements that is likely the content
     # embed the objects for publisher and author(s)
 
-    indexes = [index_jsonld_obj(item) for item in data]
-    master_index = dict(ChainMap(*indexes))
+    master_index = index_jsonld_objects(data)
     edge = get_primary_node(master_index)
     items = [edge] if edge else list(master_index.values())
     retval = {}
@@ -151,36 +151,113 @@ def contextify_authors(authors: list, context_url: str, master_index: dict) -> l
     return output
 
 
-def index_jsonld_obj(data: dict) -> dict:
+def _import_jsonld() -> Any:
+    """Import the JSON-LD processor from ``pyld``."""
+    try:
+        from pyld import jsonld
+    except ImportError as e:  # pragma: no cover
+        raise RuntimeError("pyld is not installed") from e
+    return jsonld
+
+
+def load_jsonld_document(url: str, options: Optional[dict] = None) -> dict:
+    """
+    Load a remote JSON-LD document, like a context, for :mod:`pyld`, through the context cache.
+
+    Args:
+        url: The URL of the document
+        options: The options of the JSON-LD operation
+
+    Raises:
+        JsonLdError: If the document isn't cached and can't be retrieved
+
+    Returns:
+        The document, as :mod:`pyld` expects it
+    """
+    jsonld = _import_jsonld()
+    try:
+        entry = get_context_cache().get(url)
+    except ContextUnavailableError as e:
+        raise jsonld.JsonLdError(
+            str(e), "jsonld.LoadDocumentError", {"url": url}, code="loading document failed"
+        ) from e
+    return {"contextUrl": None, "documentUrl": entry["document_url"], "document": copy.deepcopy(entry["document"])}
+
+
+def compact_jsonld_objects(objects: List[dict]) -> List[dict]:
     """
-    Index a normal JSON-LD object.
+    Compact JSON-LD objects against the schema.org context.
+
+    All the objects are compacted in one operation. The schema.org context comes from the context
+    cache, and is only processed once per process.
 
     Args:
-        data: The JSON-LD object
+        objects: The JSON-LD objects, for example all the objects on a page
 
     Returns:
-        A map of object id to object
+        The compacted nodes of all the objects
     """
+    if not objects:
+        return []
+
+    jsonld = _import_jsonld()
+    objects = [normalize_schema_org_context(obj) for obj in objects]
+    options = {
+        "documentLoader": load_jsonld_document,
+        # Leave relative IRIs, like ``"url": "example.com"``, as they are written
+        "expandContext": {"@base": None},
+        "graph": True,
+    }
+    try:
+        compact_data = jsonld.compact(objects, SCHEMA_ORG_CONTEXT_URL, options)
+    except jsonld.JsonLdError as e:
+        error(["Failed to compact JSON-LD data:", str(e)])
+        return []
+
+    # Objects with their own ``@graph`` are compacted into graph objects; use their nodes instead
+    nodes: List[dict] = []
+    for node in compact_data.get("@graph", []):
+        nodes.extend(ensure_list(node["@graph"]) if "@graph" in node else [node])
+    return nodes
+
+
+def normalize_schema_org_context(data: dict) -> dict:
+    """
+    Return a copy of a JSON-LD object that refers to the schema.org context by one URL.
+
+    This way, the context is loaded only once, whichever way a page spells it.
+    """
+    data = data.copy()
     if "@context" in data and isinstance(data["@context"], str):
-        data["@context"] = data["@context"].replace("http://schema.org", "https://schema.org")
-
-    json_ld_data = json.dumps(data)
-
-    results = run_shell("./ld-cli compact --pretty https://schema.org/", cwd=settings.APPS_DIR, input=json_ld_data)
-    if results.returncode != 0:
-        error(["Failed to compact JSON-LD data:", results.stderr])
-    compact_data = json.loads(results.stdout)
-
-    if "@graph" in compact_data:
-        return {o["id"]: o for o in compact_data["@graph"]}
-    elif "id" in compact_data:
-        return {compact_data["id"]: compact_data}
-    elif "url" in compact_data:
-        return {compact_data["url"]: compact_data}
-    elif "type" in compact_data:
-        return {f"#{compact_data['type'].lower()}": compact_data}
-    else:
-        return {}
+        context = data["@context"].replace("http://schema.org", "https://schema.org")
+        data["@context"] = (
+            SCHEMA_ORG_CONTEXT_URL if context.rstrip("/") == SCHEMA_ORG_CONTEXT_URL.rstrip("/") else context
+        )
+    return data
+
+
+def index_jsonld_objects(objects: List[dict]) -> dict:
+    """
+    Index normal JSON-LD objects.
+
+    Args:
+        objects: The JSON-LD objects
+
+    Returns:
+        A map of object id to object. The first object with an id wins.
+    """
+    index: dict = {}
+    for node in compact_jsonld_objects(objects):
+        if "id" in node:
+            key = node["id"]
+        elif "url" in node:
+            key = node["url"]
+        elif "type" in node:
+            key = f"#{ensure_list(node['type'])[0].lower()}"
+        else:
+            continue
+        index.setdefault(key, node)
+    return index
 
 
 def get_primary_node(index: dict) -> Optional[dict]:
@@ -0,0 +1,225 @@
+"""Extract keywords from the text of documents."""
+
+import hashlib
+import re
+import threading
+from collections import Counter, defaultdict
+from importlib import import_module
+from typing import Dict, List, Optional, Protocol, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from archeion.logging import error
+from archeion.stopwords import STOPWORDS
+
+KEYWORD_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+"""The number of seconds the keywords of a remote extractor are cached."""
+
+KEYWORD_CACHE_ALIAS = "keywords"
+"""The cache the keywords of remote extractors are kept in, which is on disk by default so they outlive the process."""
+
+PHRASE_DELIMITERS = re.compile(r"[.!?,;:()\[\]{}<>\"\u201c\u201d|/\\\u2013\u2014\n\t]+")
+WORD_PATTERN = re.compile(r"[\w'\u2019-]+")
+WORD_TRIM = "'\u2019-"
+
+
+class KeywordExtractor(Protocol):  # pragma: no cover
+    """
+    The minimum expected interface for a keyword extractor.
+
+    Extractors that call an external service set ``remote``, and their results are cached.
+    """
+
+    name: str
+    remote: bool
+
+    def __init__(self, config: dict): ...
+
+    def extract(self, texts: Sequence[str]) -> List[Set[str]]:
+        """Return the keywords of each text."""
+        ...
+
+
+class RakeExtractor:
+    """
+    Extract keywords in process, with Rapid Automatic Keyword Extraction (RAKE).
+
+    The text is split into candidate phrases at stopwords, numbers and punctuation. Each word is
+    scored by how many words it appears with over how often it appears, and each phrase by the sum
+    of the scores of its words. The highest scoring phrases are the keywords.
+
+    Options:
+        max_keywords: The number of keywords to return per text. Defaults to 10.
+        max_words: The longest phrase, in words, that can be a keyword. Defaults to 2.
+        min_frequency: The number of times a phrase must appear to be a keyword. Defaults to 2.
+        min_word_length: Shorter words end a phrase, like stopwords. Defaults to 3.
+    """
+
+    name = "rake"
+    remote = False
+
+    def __init__(self, config: dict):
+        self.max_keywords = getattr(config, "max_keywords", 10)
+        self.max_words = getattr(config, "max_words", 2)
+        self.min_frequency = getattr(config, "min_frequency", 2)
+        self.min_word_length = getattr(config, "min_word_length", 3)
+        self.stopwords = frozenset(STOPWORDS)
+
+    def extract(self, texts: Sequence[str]) -> List[Set[str]]:
+        """Return the keywords of each text."""
+        return [self.extract_text(text) for text in texts]
+
+    def extract_text(self, text: str) -> Set[str]:
+        """Return the keywords of a text."""
+        phrases = self.candidate_phrases(text)
+        frequency: Dict[str, int] = Counter()
+        degree: Dict[str, int] = defaultdict(int)
+        for phrase in phrases:
+            for word in phrase:
+                frequency[word] += 1
+                degree[word] += len(phrase)
+
+        phrase_counts = Counter(phrases)
+        scores = {
+            phrase: sum(degree[word] / frequency[word] for word in phrase)
+            for phrase, count in phrase_counts.items()
+            if count >= self.min_frequency
+        }
+        ranked = sorted(scores, key=lambda phrase: (scores[phrase], phrase_counts[phrase]), reverse=True)
+        return {" ".join(phrase) for phrase in ranked[: self.max_keywords]}
+
+    def candidate_phrases(self, text: str) -> List[Tuple[str, ...]]:
+        """Split a text into the phrases between stopwords, numbers and punctuation."""
+        phrases = []
+        for fragment in PHRASE_DELIMITERS.split(text.lower()):
+            phrase: List[str] = []
+            for token in WORD_PATTERN.findall(fragment):
+                word = token.strip(WORD_TRIM)
+                if self.is_phrase_word(word):
+                    phrase.append(word)
+                    continue
+                if 0 < len(phrase) <= self.max_words:
+                    phrases.append(tuple(phrase))
+                phrase = []
+            if 0 < len(phrase) <= self.max_words:
+                phrases.append(tuple(phrase))
+        return phrases
+
+    def is_phrase_word(self, word: str) -> bool:
+        """Return ``True`` if the word can be part of a keyword."""
+        return len(word) >= self.min_word_length and word not in self.stopwords and not word[0].isdigit()
+
+
+class DandelionExtractor:
+    """
+    Extract entities with the Dandelion API.
+
+    Requires the ``dandelion_token`` setting.
+    """
+
+    name = "dandelion"
+    remote = True
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    def extract(self, texts: Sequence[str]) -> List[Set[str]]:
+        """Return the entities of each text, or an empty set for the texts the API failed on."""
+        from dandelion import DandelionException
+
+        from archeion.post_processors.dandelion import get_dandelion_tags
+
+        keywords = []
+        for text in texts:
+            try:
+                keywords.append(get_dandelion_tags(text, "text/plain"))
+            except DandelionException as e:
+                error(f"Unable to get keywords from Dandelion: {e}")
+                keywords.append(set())
+        return keywords
+
+
+class CachedExtractor:
+    """
+    Cache the keywords of another extractor, by the hash of the text.
+
+    Empty results aren't cached, so texts an extractor failed on are tried again.
+
+    Args:
+        extractor: The extractor to cache the results of
+        timeout: The number of seconds to keep the results
+    """
+
+    def __init__(self, extractor: KeywordExtractor, timeout: int = KEYWORD_CACHE_TIMEOUT):
+        self.extractor = extractor
+        self.name = extractor.name
+        self.remote = extractor.remote
+        self.timeout = timeout
+
+    def cache_key(self, text: str) -> str:
+        """Return the cache key of the keywords of a text."""
+        return f"keywords:{self.name}:{hashlib.sha256(text.encode('utf8')).hexdigest()}"
+
+    def extract(self, texts: Sequence[str]) -> List[Set[str]]:
+        """Return the keywords of each text, only extracting those that aren't cached."""
+        keys = [self.cache_key(text) for text in texts]
+        cache = caches[KEYWORD_CACHE_ALIAS]
+        cached = cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+
+        if missing:
+            extracted = dict(zip(missing, self.extractor.extract(list(missing.values()))))
+            cache.set_many({key: value for key, value in extracted.items() if value}, timeout=self.timeout)
+            cached.update(extracted)
+        return [set(cached[key]) for key in keys]
+
+
+_EXTRACTOR: Optional[KeywordExtractor] = None
+_EXTRACTOR_LOCK = threading.Lock()
+
+
+def get_keyword_extractor() -> Optional[KeywordExtractor]:
+    """Return the configured keyword extractor, or ``None`` if keyword extraction is disabled."""
+    global _EXTRACTOR  # noqa: PLW0603
+
+    config = settings.KEYWORD_CONFIG
+    if not config.extractor:
+        return None
+
+    with _EXTRACTOR_LOCK:
+        if _EXTRACTOR is None:
+            module, class_name = config.extractor.rsplit(".", 1)
+            extractor = getattr(import_module(module), class_name)(config)
+            _EXTRACTOR = CachedExtractor(extractor) if extractor.remote else extractor
+        return _EXTRACTOR
+
+
+def reset_keyword_extractor(**kwargs) -> None:
+    """Forget the keyword extractor, so it is rebuilt from the settings on next use."""
+    global _EXTRACTOR  # noqa: PLW0603
+
+    if kwargs.get("setting", "KEYWORD_CONFIG") != "KEYWORD_CONFIG":
+        return
+    with _EXTRACTOR_LOCK:
+        _EXTRACTOR = None
+
+
+setting_changed.connect(reset_keyword_extractor)
+
+
+def extract_keywords(texts: Sequence[str]) -> List[Set[str]]:
+    """
+    Extract the keywords of a batch of texts with the configured extractor.
+
+    Args:
+        texts: The texts to extract keywords from
+
+    Returns:
+        The keywords of each text
+    """
+    extractor = get_keyword_extractor()
+    if extractor is None or not texts:
+        return [set() for _ in texts]
+    return extractor.extract(texts)
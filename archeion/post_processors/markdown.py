@@ -1,46 +1,84 @@
 """Convert an HTML document to Markdown."""
 
 import os
+from typing import Optional, Union
 
 from django.core.exceptions import SuspiciousFileOperation
 from django.core.files.base import ContentFile
 from django.utils import timezone
 
-from archeion.index.models import ArtifactStatus, Link
+from archeion.index.models import Artifact, ArtifactStatus, Link
 from archeion.index.storage import get_artifact_storage
 from archeion.logging import error, success
+from archeion.post_processors.document import HTMLDocument, as_document
 
 PLUGIN_NAME = "markdown"
+OUTPUT_PATH = "markdown.md"
+PROCESSOR_VERSION = "1"
+"""Bump when a change alters the rendered Markdown, so ``post_process --changed-only`` redoes it."""
 
 
-def convert_to_markdown(content: str, link: Link, overwrite: bool = True) -> None:
+def convert_to_markdown(content: Union[str, HTMLDocument], link: Link, overwrite: bool = True) -> None:
     """
     Convert HTML to Markdown.
 
     Args:
-        content: HTML content
+        content: HTML content, raw or already parsed
         link: Source link
         overwrite: Whether to overwrite an existing metadata artifact
     """
-    import html2text
+    artifact = get_markdown_artifact(link)
+    if artifact.status == ArtifactStatus.SUCCEEDED and not overwrite:
+        return
+
+    store_markdown(render_markdown(content, link.url), link, artifact)
+
 
+def get_markdown_artifact(link: Link) -> Artifact:
+    """Return the Markdown artifact of a link, creating it if necessary."""
     artifact, _ = link.artifacts.get_or_create(
-        plugin_name=PLUGIN_NAME, defaults={"output_path": "markdown.md", "start_ts": timezone.now()}
+        plugin_name=PLUGIN_NAME, defaults={"output_path": OUTPUT_PATH, "start_ts": timezone.now()}
     )
-    if artifact.status == ArtifactStatus.SUCCEEDED and not overwrite:
-        return
+    return artifact
+
+
+def render_markdown(content: Union[str, HTMLDocument], url: Optional[str] = None) -> str:
+    """
+    Render HTML as Markdown.
+
+    Args:
+        content: HTML content, raw or already parsed
+        url: The URL the HTML was archived from
+
+    Returns:
+        The Markdown
+    """
+    import html2text
 
     text_maker = html2text.HTML2Text()
     text_maker.unicode_snob = True
     text_maker.protect_links = True
     text_maker.mark_code = True
-    output = text_maker.handle(content)
+    return text_maker.handle(as_document(content, url).html)
 
+
+def store_markdown(output: str, link: Link, artifact: Artifact, source_hash: str = "") -> None:
+    """
+    Save rendered Markdown to a link's Markdown artifact.
+
+    Args:
+        output: The Markdown from ``render_markdown``
+        link: The link the Markdown was rendered for
+        artifact: The link's Markdown artifact
+        source_hash: The hash of the DOM the Markdown was rendered from
+    """
     try:
         storage = get_artifact_storage()
         filepath = os.path.join(link.archive_path, artifact.output_path)
         storage.save(filepath, ContentFile(output))
         artifact.status = ArtifactStatus.SUCCEEDED
+        artifact.source_hash = source_hash
+        artifact.processor_version = PROCESSOR_VERSION
         success(f"Saved {PLUGIN_NAME} to {filepath}")
     except SuspiciousFileOperation as e:  # pragma: no coverage
         artifact.status = ArtifactStatus.FAILED
@@ -0,0 +1,102 @@
+"""Look up the content types of links over a shared pool of HTTP connections."""
+
+import asyncio
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from archeion.index.models import Link
+
+PROBE_ERRORS = (httpx.TransportError, httpx.InvalidURL, httpx.TooManyRedirects)
+"""Errors that leave a link's content type unknown, instead of stopping the probe."""
+
+UNKNOWN_CONTENT_TYPE = ""
+"""The content type of links that were probed without finding one, so they aren't probed again."""
+
+
+def get_mime_type(content_type: Optional[str]) -> str:
+    """Return the MIME type part of a ``Content-Type`` header, like ``text/html``."""
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+async def probe_content_type(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    """
+    Return the content type of a URL, using a ``HEAD`` request.
+
+    Args:
+        client: The client to send the request with
+        url: The URL to probe
+
+    Returns:
+        The ``Content-Type`` header, or ``None`` if the URL could not be reached
+    """
+    try:
+        response = await client.head(url)
+    except PROBE_ERRORS:
+        return None
+    return response.headers.get("Content-Type") if response.status_code == 200 else None
+
+
+async def probe_content_types(urls: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Probe the content types of many URLs at once.
+
+    The requests share one connection pool. At most ``probe_concurrency`` run at once, and at most
+    ``probe_per_host_concurrency`` to the same host, so large imports don't hammer a single site.
+
+    Args:
+        urls: The URLs to probe
+
+    Returns:
+        A mapping of each URL to its content type, or ``None`` if it could not be determined
+    """
+    urls = list(dict.fromkeys(urls))
+    global_limit = asyncio.Semaphore(settings.PROBE_CONCURRENCY)
+    host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(settings.PROBE_PER_HOST_CONCURRENCY)
+    )
+    limits = httpx.Limits(max_connections=settings.PROBE_CONCURRENCY)
+
+    async with httpx.AsyncClient(
+        follow_redirects=True,
+        limits=limits,
+        timeout=settings.PROBE_TIMEOUT,
+        verify=settings.CHECK_SSL_VALIDITY,
+    ) as client:
+
+        async def probe(url: str) -> Optional[str]:
+            try:
+                host = httpx.URL(url).host
+            except httpx.InvalidURL:
+                return None
+            # Acquire the host slot first, so waiting on a busy host doesn't hold a global slot
+            async with host_limits[host], global_limit:
+                return await probe_content_type(client, url)
+
+        content_types = await asyncio.gather(*(probe(url) for url in urls))
+    return dict(zip(urls, content_types))
+
+
+def probe_links(links: Iterable[Link]) -> List[Link]:
+    """
+    Fill in the content type of links that haven't been probed yet.
+
+    Links whose content type couldn't be found get ``UNKNOWN_CONTENT_TYPE``. The links are not saved.
+
+    Args:
+        links: The links to probe
+
+    Returns:
+        The links that were probed
+    """
+    unprobed = [link for link in links if link.content_type is None]
+    if not unprobed:
+        return []
+
+    content_types = async_to_sync(probe_content_types)(link.url for link in unprobed)
+    for link in unprobed:
+        link.content_type = content_types.get(link.url) or UNKNOWN_CONTENT_TYPE
+    return unprobed
@@ -1,15 +1,30 @@
 """Search interface for Archeion."""
 
+import json
+import threading
+import time
 from importlib import import_module
-from typing import List, Protocol, Tuple
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple
 
 from django.conf import settings
-from django.db.models import QuerySet
+from django.core.signals import setting_changed
+from django.db.models import Case, FloatField, QuerySet, Value, When
 
 from archeion.index.models import Link
-from archeion.logging import error
+from archeion.logging import error, info, success
 
 SearchResult = Tuple[str, float]
+"""A link ID, and how well the link matches the query. Higher is better."""
+
+SearchDocument = Tuple[str, str, Dict[str, str]]
+"""A link ID, the link's content and its other fields, as indexed."""
+
+REINDEX_BATCH_SIZE = 500
+"""The number of links read and indexed at a time when rebuilding the index."""
+
+SEARCH_FIELDS = ("title", "tags", "url", "metadata", "content")
+"""The fields of an indexed link. Backends that rank by field weigh each by its ``field_boosts`` entry."""
 
 
 class SearchBackend(Protocol):
@@ -17,51 +32,200 @@ class SearchBackend(Protocol):
 
     def __init__(self, config: dict): ...
 
-    def index(self, link_id: str, content: str) -> None:
-        """Index the content for a link."""
+    def index(self, link_id: str, content: str, fields: Optional[Dict[str, str]] = None) -> None:
+        """Index the content and other fields of a link, replacing what was indexed for it before."""
+        ...
+
+    def index_many(self, documents: Iterable[SearchDocument]) -> None:
+        """Index several links at once, replacing what was indexed for them before."""
+        ...
+
+    def delete(self, link_id: str) -> None:
+        """Remove a link from the index."""
+        ...
+
+    def clear(self) -> None:
+        """Remove every link from the index."""
         ...
 
     def search(self, query: str, limit: int = 1000) -> List[SearchResult]:
         """
-        Return a list of Link IDs of all the results for the given query.
+        Return the IDs and scores of the ``limit`` links that best match the query, best match first.
         """
         ...
 
 
+_BACKEND: Optional[SearchBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
 def get_search_backend() -> SearchBackend:
-    """Import and return the search backend class."""
-    module, class_name = settings.SEARCH_CONFIG.backend.rsplit(".", 1)
-    try:
-        klass = getattr(import_module(module), class_name)
-        return klass(settings.SEARCH_CONFIG)
-    except (ImportError, AttributeError) as e:
-        error(f"Unable to load search backend {class_name}: {e}")
-        raise ImportError(f"Unable to load search backend {class_name}: {e}") from e
+    """Import and return the search backend, creating it on first use."""
+    global _BACKEND  # noqa: PLW0603
+
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            module, class_name = settings.SEARCH_CONFIG.backend.rsplit(".", 1)
+            try:
+                klass = getattr(import_module(module), class_name)
+            except (ImportError, AttributeError) as e:
+                error(f"Unable to load search backend {class_name}: {e}")
+                raise ImportError(f"Unable to load search backend {class_name}: {e}") from e
+            _BACKEND = klass(settings.SEARCH_CONFIG)
+        return _BACKEND
+
+
+def reset_search_backend(**kwargs) -> None:
+    """Forget the search backend, so it is rebuilt from the settings on next use."""
+    global _BACKEND  # noqa: PLW0603
+
+    if kwargs.get("setting", "SEARCH_CONFIG") not in ("SEARCH_CONFIG", "SEARCH_INDEX_PATH"):
+        return
+    with _BACKEND_LOCK:
+        # Backends that keep connections open, like Sonic, close them
+        close = getattr(_BACKEND, "close", None)
+        if close is not None:
+            close()
+        _BACKEND = None
+
+
+setting_changed.connect(reset_search_backend)
+
+
+def index(link_id: str, content: str, fields: Optional[Dict[str, str]] = None) -> None:
+    """
+    Index a link, replacing what was indexed for it before.
+
+    Args:
+        link_id: The ID of the link
+        content: The text of the link's archived page
+        fields: The other ``SEARCH_FIELDS`` of the link, like its title and tags
+    """
+    search_backend = get_search_backend()
+    search_backend.index(link_id, content, fields)
 
 
-def index(link_id: str, content: str) -> None:
-    """Index the content of the given Artifact."""
-    # TODO: Allow updating the index
+def update_link_files(link_id: str) -> None:
+    """Update the files searched for a link, for the backends that search its artifact files."""
     search_backend = get_search_backend()
-    search_backend.index(link_id, content)
+    if hasattr(search_backend, "update_link_files"):
+        search_backend.update_link_files(link_id)
 
 
 def delete(link_id: str) -> None:
-    """Delete the content of the given Link."""
-    # TODO: implement the deleting process
-    pass
+    """Remove a link from the index."""
+    search_backend = get_search_backend()
+    search_backend.delete(link_id)
+
+
+def reindex_links(resume: bool = False, batch_size: int = REINDEX_BATCH_SIZE) -> int:
+    """
+    Rebuild the search index from every link, a batch at a time.
+
+    The ID of the last link of each batch is saved to a checkpoint, so an interrupted rebuild can be
+    resumed after it. A rebuild that isn't resumed clears the index first.
+
+    Args:
+        resume: Continue the interrupted rebuild, if there is one
+        batch_size: The number of links read and indexed at a time
 
+    Returns:
+        The number of links indexed
+    """
+    from archeion.index.model_functions import get_link_search_document
 
-def search(query: str) -> QuerySet:
-    """Search the index and return a QuerySet of Link IDs."""
     search_backend = get_search_backend()
-    search_results = search_backend.search(query)
-    if search_results:
-        # TODO: Actually sort by rank
-        link_ids = [link_id for link_id, _ in search_results]
-        return Link.objects.filter(pk__in=link_ids)
+    checkpoint_path = get_reindex_checkpoint_path()
+    last_link_id = read_reindex_checkpoint(checkpoint_path) if resume else None
+    links = Link.objects.order_by("pk").prefetch_related("artifacts", "tags")
+    if last_link_id is None:
+        search_backend.clear()
+        remaining = links
+    else:
+        info(f"Resuming the rebuild of the search index after link {last_link_id}")
+        remaining = links.filter(pk__gt=last_link_id)
+
+    total = remaining.count()
+    indexed = 0
+    start = time.monotonic()
+    while batch := list(remaining[:batch_size]):
+        search_backend.index_many(get_link_search_document(link) for link in batch)
+        last_link_id = batch[-1].pk
+        checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint_path.write_text(json.dumps({"last_link_id": last_link_id}))
+        indexed += len(batch)
+        info(f"Indexed {indexed}/{total} links, {indexed / (time.monotonic() - start):.1f} links/s", left_indent=2)
+        remaining = links.filter(pk__gt=last_link_id)
+
+    checkpoint_path.unlink(missing_ok=True)
+    success(f"Indexed {indexed} links in {time.monotonic() - start:.1f}s")
+    return indexed
+
+
+def get_reindex_checkpoint_path() -> Path:
+    """Return the path to the checkpoint of an interrupted rebuild of the search index."""
+    from archeion.config import CACHE_DIR_NAME
+
+    return Path(settings.ARCHIVE_ROOT) / CACHE_DIR_NAME / "reindex.json"
+
+
+def read_reindex_checkpoint(path: Path) -> Optional[str]:
+    """Return the ID of the last link indexed by an interrupted rebuild, if there was one."""
+    try:
+        return json.loads(path.read_text())["last_link_id"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def search(query: str, limit: int = 1000) -> QuerySet:
+    """
+    Search the index for links.
 
-    return Link.objects.none()
+    Args:
+        query: The query, as typed by the user
+        limit: The maximum number of links to return
+
+    Returns:
+        The matching links, best match first, annotated with their ``search_score``
+    """
+    search_backend = get_search_backend()
+    return rank_links(Link.objects.all(), search_backend.search(query, limit))
+
+
+def rank_links(queryset: QuerySet, results: List[SearchResult]) -> QuerySet:
+    """
+    Filter links to the search results, and order them by score.
+
+    The scores are sorted on by the database, so slicing the QuerySet, for example to paginate it,
+    only loads the links of that slice.
+
+    Args:
+        queryset: The links to filter
+        results: The results from a search backend
+
+    Returns:
+        The links in the results, annotated with their ``search_score``
+    """
+    if not results:
+        return queryset.none()
+
+    scores = dict(reversed(results))  # The first score of a link wins
+    return (
+        queryset.filter(pk__in=scores)
+        .annotate(
+            search_score=Case(
+                *[When(pk=link_id, then=Value(score)) for link_id, score in scores.items()],
+                output_field=FloatField(),
+            )
+        )
+        .order_by("-search_score", "-created_at")
+    )
+
+
+def flatten_fields(content: str, fields: Optional[Dict[str, str]] = None) -> str:
+    """Join a link's fields and content into one text, for backends that index a single text."""
+    texts = [value for name, value in (fields or {}).items() if name in SEARCH_FIELDS and value]
+    return "\n".join([*texts, content])
 
 
 # def index_links(
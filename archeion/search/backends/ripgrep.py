@@ -1,67 +1,262 @@
+import contextlib
+import fcntl
+import json
+import os
 import shutil
-from itertools import chain
+import subprocess
+import tempfile
+import threading
+from collections import Counter, OrderedDict
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
 
+from archeion.index.storage import COMPRESSION_EXTENSIONS, get_artifact_storage
 from archeion.logging import error
+from archeion.search import SearchDocument, SearchResult
+from archeion.utils import chunked
 
 DEFAULT_IGNORE_EXTENSIONS = ("css", "js", "orig", "svg")
 
 DEFAULT_ARGUMENTS = [
     "--ignore-case",
-    "--files-with-matches",
+    "--search-zip",
 ]
 
+FILES_PER_COMMAND = 1000
+"""The number of files passed to each rg command, to stay well under the argument length limit."""
+
+QUERY_CACHE_SIZE = 128
+
 
 class RipGrepBackend:
-    """A search engine backend that uses ripgrep (rg)."""
+    """
+    A search engine backend that uses ripgrep (rg).
+
+    Instead of walking the artifacts for every query, the backend keeps the list of files to search,
+    by link, and passes it to rg. A link's files are listed when it is indexed. The list is stored
+    on disk, so every process shares it, and a new list is a new index generation. Processes take
+    turns changing it, with a lock file next to it. Recent results are cached by query and generation.
+
+    Until the list is first written, for example by the ``reindex`` command, rg walks the artifacts.
+
+    Options:
+        ignore_extensions: The extensions of the files that are not searched
+        default_arguments: The arguments passed to rg
+        timeout: The number of seconds a query can take. Defaults to 90.
+        file_list_path: Where the list of files is kept. Defaults to ``cache/ripgrep-files.json``.
+        cache_size: The number of recent queries whose results are cached. Defaults to 128.
+    """
 
     def __init__(self, config: dict):
         if not self.is_valid():
             raise RuntimeError("ripgrep (rg) binary not found, install ripgrep to use this search backend.")
 
+        from archeion.config import CACHE_DIR_NAME
+
         self.config = config
-        ignore_extensions = config.get("ignore_extensions", DEFAULT_IGNORE_EXTENSIONS)
-        default_args = config.get("default_arguments", DEFAULT_ARGUMENTS)
-        ignore_args = list(
-            chain.from_iterable(
-                zip(["--iglob"] * len(ignore_extensions), [f"'!*.{ext}'" for ext in ignore_extensions])
-            )
+        self.ignore_extensions = set(getattr(config, "ignore_extensions", DEFAULT_IGNORE_EXTENSIONS))
+        default_args = getattr(config, "default_arguments", DEFAULT_ARGUMENTS)
+        # Each matching file is printed with its number of matches, which is its score
+        self.rg_command = ["rg", "--with-filename", "--count-matches", *default_args]
+        self.walk_args = [arg for ext in sorted(self.ignore_extensions) for arg in ("--iglob", f"!*.{ext}")]
+        self.timeout = int(getattr(config, "timeout", 90))
+        self.file_list_path = Path(
+            getattr(config, "file_list_path", None)
+            or Path(settings.ARCHIVE_ROOT) / CACHE_DIR_NAME / "ripgrep-files.json"
         )
-        self.rg_command = ["rg", *ignore_args, *default_args]
-        self.timeout = int(config.get("timeout", 90))
+        self.cache_size = int(getattr(config, "cache_size", QUERY_CACHE_SIZE))
+        self._files: Dict[str, List[str]] = {}
+        self._files_generation: Optional[Tuple[int, int]] = None
+        self._results: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
 
     @classmethod
     def is_valid(cls) -> bool:
         """Is the backend ready to go?"""
         return bool(shutil.which("rg"))
 
-    def index_link(self, link_id: str, tags: List[str]) -> None:
+    @property
+    def root(self) -> Path:
+        """The directory the artifacts are stored in."""
+        return Path(get_artifact_storage().location)
+
+    def get_generation(self) -> Optional[Tuple[int, int]]:
+        """Return the generation of the file list on disk, or ``None`` if there is no list yet."""
+        try:
+            stat = self.file_list_path.stat()
+        except FileNotFoundError:
+            return None
+        # The list is replaced by a new file each time, so its inode changes even if its mtime doesn't
+        return stat.st_mtime_ns, stat.st_ino
+
+    def load_files(self) -> Tuple[Optional[Dict[str, List[str]]], Optional[Tuple[int, int]]]:
+        """Return the files to search by link, and their generation, reading them again if they changed."""
+        generation = self.get_generation()
+        if generation is None:
+            return None, None
+        if generation != self._files_generation:
+            try:
+                self._files = json.loads(self.file_list_path.read_text())
+            except (OSError, ValueError):
+                self._files = {}
+            self._files_generation = generation
+        return self._files, generation
+
+    def save_files(self, files: Dict[str, List[str]]) -> None:
+        """Write the files to search by link, replacing the list in one step for other processes."""
+        self.file_list_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.file_list_path.parent, suffix=".tmp", delete=False) as f:
+            json.dump(files, f)
+        os.replace(f.name, self.file_list_path)
+        self._files = files
+        self._files_generation = self.get_generation()
+
+    @contextlib.contextmanager
+    def file_list_lock(self) -> Iterator[None]:
+        """Hold the lock on the file list, so changes made by other threads and processes aren't lost."""
+        self.file_list_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.file_list_path.with_name(f"{self.file_list_path.name}.lock")
+        with self._lock, open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def list_link_files(self, link_id: str) -> List[str]:
+        """Return the paths of a link's searchable files, relative to the artifacts directory."""
+        from archeion.index.models import Link
+
+        archive_path = Link.objects.filter(pk=link_id).values_list("archive_path", flat=True).first() or link_id
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(self.root / archive_path):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+            paths.extend(
+                os.path.relpath(os.path.join(dirpath, name), self.root)
+                for name in filenames
+                if not name.startswith(".") and self.is_searchable(name)
+            )
+        return sorted(paths)
+
+    def is_searchable(self, filename: str) -> bool:
+        """Return ``True`` unless the file, without its compression extension, has an ignored extension."""
+        for extension in COMPRESSION_EXTENSIONS.values():
+            filename = filename.removesuffix(extension)
+        return Path(filename).suffix.lstrip(".") not in self.ignore_extensions
+
+    def index(self, link_id: str, content: str, fields: Optional[Dict[str, str]] = None) -> None:
+        """List the link's files to search. ripgrep searches them directly, so the content isn't needed."""
+        self.index_many([(link_id, content, fields or {})])
+
+    def index_many(self, documents: Iterable[SearchDocument]) -> None:
+        """List the files to search of several links."""
+        with self.file_list_lock():
+            files, _ = self.load_files()
+            files = dict(files or {})
+            for link_id, *_ in documents:
+                files[link_id] = self.list_link_files(link_id)
+            self.save_files(files)
+
+    def update_link_files(self, link_id: str) -> None:
+        """List the link's files again after an artifact was saved, if there is a file list to update."""
+        with self.file_list_lock():
+            files, _ = self.load_files()
+            if files is None:
+                return
+            link_files = self.list_link_files(link_id)
+            if files.get(link_id) != link_files:
+                self.save_files({**files, link_id: link_files})
+
+    def delete(self, link_id: str) -> None:
+        """Stop searching the files of a link."""
+        with self.file_list_lock():
+            files, _ = self.load_files()
+            if files and link_id in files:
+                self.save_files({key: value for key, value in files.items() if key != link_id})
+
+    def clear(self) -> None:
+        """Stop searching the files of every link."""
+        with self.file_list_lock():
+            self.save_files({})
+
+    def search(self, query: str, limit: int = 1000) -> List[SearchResult]:
         """
-        Index the tags for the link_id.
+        Return the links whose artifacts match the query, scored by their number of matches.
+
+        rg stops once ``limit`` links have matched, so the scores only cover the files searched.
+
+        Args:
+            query: The regular expression to search for
+            limit: The maximum number of results
+
+        Returns:
+            The link IDs and their scores, best match first
         """
-        return
+        with self._lock:
+            files, generation = self.load_files()
+            # Without a file list, rg walks the archive, which can change without a new generation
+            key = None if generation is None else (generation, query, limit)
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
 
-    def index_artifact(self, artifact_id: str, link_id: str, content: str) -> None:
-        """Index the content for an artifact/link combination."""
-        return
+        match_counts: Counter = Counter()
+        if files is None:
+            match_counts = self.run_search(query, self.walk_args, match_counts, limit)
+        else:
+            paths = (path for link_files in files.values() for path in link_files)
+            for chunk in chunked(paths, FILES_PER_COMMAND):
+                match_counts = self.run_search(query, ["--", *chunk], match_counts, limit)
+                if len(match_counts) >= limit:
+                    break
+        results = [(link_id, float(count)) for link_id, count in match_counts.most_common(limit)]
 
-    def search(self, query: str) -> List[str]:
-        from archeion.dependency import run_shell
+        if key is None:
+            return results
+        with self._lock:
+            self._results[key] = results
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return results
 
-        rg_cmd = [*self.rg_command, "-e", query, str(settings.ARTIFACTS_DIR_NAME)]
+    def run_search(self, query: str, args: List[str], match_counts: Counter, limit: int) -> Counter:
+        """
+        Run rg, counting the matches by link as they are printed, until ``limit`` links have matched.
 
-        result = run_shell(rg_cmd, cwd=settings.ARTIFACTS_DIR_NAME)
-        if result.returncode != 0:
-            error([f"ripgrep returned non-zero exit code: {result.returncode}", result.stderr])
-            return []
+        Args:
+            query: The regular expression to search for
+            args: The paths to search, or the arguments to walk the artifacts with
+            match_counts: The number of matches of each link so far, which is updated
+            limit: The number of links after which rg is stopped
 
-        file_paths = result.stdout.splitlines()
-        link_ids = set()
-        for path in file_paths:
-            rel_path = Path(path).relative_to(settings.ARTIFACTS_DIR_NAME)
-            link_ids.add(rel_path.parents[-2].name)  # .parents[-1] is "."
+        Returns:
+            The updated number of matches of each link
+        """
+        command = [*self.rg_command, "-e", query, *args]
+        # stderr goes to a file, so rg can't block on a full stderr pipe while stdout is read
+        with tempfile.TemporaryFile("w+") as stderr_file, subprocess.Popen(  # noqa: S603
+            command, cwd=self.root, stdout=subprocess.PIPE, stderr=stderr_file, text=True
+        ) as process:
+            timer = threading.Timer(self.timeout, process.kill)
+            timer.start()
+            stopped_early = False
+            for line in process.stdout:
+                path, _, count = line.rstrip("\n").rpartition(":")
+                link_id = path.split(os.sep, 1)[0]
+                if link_id not in match_counts and len(match_counts) >= limit:
+                    stopped_early = True
+                    process.kill()
+                    break
+                match_counts[link_id] += int(count)
+            returncode = process.wait()
+            timer.cancel()
+            stderr_file.seek(0)
+            stderr = stderr_file.read()
 
-        return list(link_ids)
+        if returncode < 0 and not stopped_early:
+            error(f"ripgrep took longer than {self.timeout}s, and was stopped")
+        elif returncode > 1:  # 1 means nothing matched
+            error([f"ripgrep returned non-zero exit code: {returncode}", stderr])
+        return match_counts
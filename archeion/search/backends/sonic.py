@@ -1,53 +1,154 @@
-from typing import List
+import contextlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 try:
     from sonic import IngestClient, SearchClient
 except ImportError:
     raise RuntimeError("sonic-client is not installed")
 
+from archeion.logging import error
+from archeion.search import SearchDocument, SearchResult, flatten_fields
+
 MAX_SONIC_TEXT_TOTAL_LENGTH = 100_000_000  # don't index more than 100 million characters per text
 MAX_SONIC_TEXT_CHUNK_LENGTH = 2_000  # don't index more than 2000 characters per chunk
 MAX_SONIC_ERRORS_BEFORE_ABORT = 5
+SONIC_INGEST_CONNECTIONS = 4
 
 
 class SonicSearchBackend:
-    """Uses sonic as a search backend."""
+    """
+    Uses sonic as a search backend.
+
+    Ingest connections are kept open and reused, up to ``ingest_connections`` of them; extra ones are
+    closed when they are returned. ``index_many`` pushes several links at once, one per connection.
+    Indexing is aborted once more links than the error budget fail in a row.
+
+    Options:
+        host, port, password: Where the Sonic server is, and its password
+        bucket, collection: Where the links are indexed
+        ingest_connections: The number of links pushed at once. Defaults to 4.
+        max_errors: The number of links that can fail in a row before indexing is aborted. Defaults to 5.
+        chunk_length: The number of characters pushed per command. Defaults to 2,000.
+    """
 
     def __init__(self, config: dict):
         self.config = config
-        self.host = config["host"]
-        self.port = config["port"]
-        self.password = config["password"]
-        self.bucket = config["bucket"]
-        self.collection = config["collection"]
-
-    def index_link(self, link_id: str, tags: List[str]) -> None:
-        """Index a link."""
-        pass
-
-    def index_artifact(self, artifact_id: str, link_id: str, content: str) -> None:
-        error_count = 0
-        with IngestClient(self.host, self.port, self.password) as ingestcl:
-            chunks = (
-                content[i : i + MAX_SONIC_TEXT_CHUNK_LENGTH]
-                for i in range(
-                    0,
-                    min(len(content), MAX_SONIC_TEXT_TOTAL_LENGTH),
-                    MAX_SONIC_TEXT_CHUNK_LENGTH,
-                )
-            )
+        self.host = config.host
+        self.port = config.port
+        self.password = config.password
+        self.bucket = config.bucket
+        self.collection = config.collection
+        self.ingest_connections = int(getattr(config, "ingest_connections", SONIC_INGEST_CONNECTIONS))
+        self.max_errors = int(getattr(config, "max_errors", MAX_SONIC_ERRORS_BEFORE_ABORT))
+        self.chunk_length = int(getattr(config, "chunk_length", MAX_SONIC_TEXT_CHUNK_LENGTH))
+        self._idle_clients: queue.Queue = queue.Queue(maxsize=self.ingest_connections)
+        self._error_count = 0
+        self._error_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def ingest_client(self) -> Iterator[IngestClient]:
+        """Borrow an open ingest connection, opening one if they are all in use."""
+        try:
+            client = self._idle_clients.get_nowait()
+        except queue.Empty:
+            client = IngestClient(self.host, self.port, self.password)
+
+        try:
+            yield client
+        except Exception:
+            # The connection may be broken, so it isn't reused
+            self.close_client(client)
+            raise
+        try:
+            self._idle_clients.put_nowait(client)
+        except queue.Full:
+            self.close_client(client)
+
+    @staticmethod
+    def close_client(client: IngestClient) -> None:
+        """Close an ingest connection, ignoring the errors of a broken one."""
+        with contextlib.suppress(Exception):
+            client.close()
+
+    def close(self) -> None:
+        """Close the idle ingest connections."""
+        while True:
             try:
-                doc_id = f"{link_id}/{artifact_id}"
-                for chunk in chunks:
-                    ingestcl.push(self.collection, self.bucket, doc_id, str(chunk))
-                ingestcl.flush_object(self.collection, self.bucket, doc_id)
-            except Exception as err:
-                print(f"[!] Sonic search backend threw an error while indexing: {err.__class__.__name__} {err}")
-                error_count += 1
-                if error_count > MAX_SONIC_ERRORS_BEFORE_ABORT:
-                    raise
-
-    def search(self, query: str) -> List[str]:
+                client = self._idle_clients.get_nowait()
+            except queue.Empty:
+                return
+            self.close_client(client)
+
+    def index(self, link_id: str, content: str, fields: Optional[Dict[str, str]] = None) -> None:
+        """Index the content and other fields of a link, replacing what was indexed for it before."""
+        self.index_many([(link_id, content, fields or {})])
+
+    def index_many(self, documents: Iterable[SearchDocument]) -> None:
+        """
+        Index several links, pushing ``ingest_connections`` of them at once.
+
+        A link that fails is logged and skipped. Once more than ``max_errors`` links fail in a row, the
+        last error is raised.
+
+        Args:
+            documents: The links to index
+        """
+        with ThreadPoolExecutor(max_workers=self.ingest_connections) as executor:
+            for link_id, exception in executor.map(self.push_document, documents):
+                self.count_error(link_id, exception)
+
+    def push_document(self, document: SearchDocument) -> Tuple[str, Optional[Exception]]:
+        """Replace what is indexed for a link, and return the link ID with the exception it raised, if any."""
+        link_id, content, fields = document
+        text = flatten_fields(content, fields)[:MAX_SONIC_TEXT_TOTAL_LENGTH]
+        try:
+            with self.ingest_client() as client:
+                client.flush_object(self.collection, self.bucket, link_id)
+                for i in range(0, len(text), self.chunk_length):
+                    client.push(self.collection, self.bucket, link_id, text[i : i + self.chunk_length])
+        except Exception as e:  # noqa: BLE001
+            return link_id, e
+        return link_id, None
+
+    def count_error(self, link_id: str, exception: Optional[Exception]) -> None:
+        """Keep track of the links that failed in a row, and raise once there are too many."""
+        with self._error_lock:
+            if exception is None:
+                self._error_count = 0
+                return
+            self._error_count += 1
+            error_count = self._error_count
+
+        error(f"Sonic search backend failed to index {link_id}: {exception.__class__.__name__} {exception}")
+        if error_count > self.max_errors:
+            raise exception
+
+    def delete(self, link_id: str) -> None:
+        """Remove a link from the index."""
+        with self.ingest_client() as client:
+            client.flush_object(self.collection, self.bucket, link_id)
+
+    def clear(self) -> None:
+        """Remove every link from the index."""
+        with self.ingest_client() as client:
+            client.flush_bucket(self.collection, self.bucket)
+
+    def search(self, query: str, limit: int = 1000) -> List[SearchResult]:
+        """
+        Return the links that match the query, scored by their rank in Sonic's results.
+
+        Args:
+            query: The query, as typed by the user
+            limit: The maximum number of results
+
+        Returns:
+            The link IDs and their scores, best match first
+        """
         with SearchClient(self.host, self.port, self.password) as querycl:
-            doc_ids = querycl.query(self.collection, self.bucket, query)
-        return [doc_id.split("/")[0] for doc_id in doc_ids]
+            doc_ids = querycl.query(self.collection, self.bucket, query, limit=limit)
+        # Sonic returns its results best first, without their scores
+        link_ids = list(dict.fromkeys(doc_id.split("/")[0] for doc_id in doc_ids))
+        return [(link_id, 1 / rank) for rank, link_id in enumerate(link_ids, start=1)]
@@ -0,0 +1,176 @@
+"""A search backend with an inverted index in SQLite, using its FTS5 full-text search extension."""
+
+import contextlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from archeion.logging import warning
+from archeion.search import SEARCH_FIELDS, SearchDocument, SearchResult
+
+SCHEMA_VERSION = 2
+"""Bump when the schema changes. An index with another version is emptied and recreated."""
+
+SCHEMA = f"""
+DROP TABLE IF EXISTS documents_fts;
+DROP TABLE IF EXISTS documents;
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    link_id TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE documents_fts USING fts5(
+    {", ".join(SEARCH_FIELDS)},
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+"""The link IDs, and the FTS5 table of their fields, sharing a rowid."""
+
+QUERY_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def has_fts5() -> bool:
+    """Return ``True`` if Python's SQLite was built with the FTS5 extension."""
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE fts5_check USING fts5(content)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+    return True
+
+
+def build_match_query(query: str) -> str:
+    """
+    Convert a user's query into an FTS5 query matching the documents that contain every term.
+
+    Each term is quoted, so punctuation and FTS5 operators in the query are searched for as text.
+    A trailing ``*`` matches the term as a prefix.
+
+    Args:
+        query: The query, as typed by the user
+
+    Returns:
+        The FTS5 query, or an empty string if the query has no terms
+    """
+    return " ".join(f'"{term}"{prefix}' for term, prefix in QUERY_TERM.findall(query))
+
+
+class SQLiteSearchBackend:
+    """
+    Uses an SQLite FTS5 table as a search backend.
+
+    The index is kept in its own database file, so it works whichever database holds the links.
+    Indexing a link replaces what was indexed for it before. Results are ranked with BM25, with the
+    matches in each field weighted by its boost.
+
+    Options:
+        path: The path to the index database. Defaults to ``search_index_path``.
+        timeout: The number of seconds to wait for another process writing to the index. Defaults to 30.
+        field_boosts: The weight of each of the ``SEARCH_FIELDS``. Fields without a boost weigh 1.
+    """
+
+    def __init__(self, config: dict):
+        if not has_fts5():
+            raise RuntimeError("SQLite was built without FTS5, which the SQLite search backend requires.")
+
+        self.config = config
+        self.path = Path(getattr(config, "path", None) or settings.SEARCH_INDEX_PATH)
+        self.timeout = int(getattr(config, "timeout", 30))
+        field_boosts = getattr(config, "field_boosts", None) or {}
+        self.weights = [float(field_boosts.get(field, 1.0)) for field in SEARCH_FIELDS]
+        self._schema_created = False
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the index, creating it if necessary, in a transaction."""
+        with self._lock:
+            if not self._schema_created:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=self.timeout)
+                try:
+                    # Readers aren't blocked while a link is indexed
+                    connection.execute("PRAGMA journal_mode = WAL")
+                    self.create_schema(connection)
+                finally:
+                    connection.close()
+                self._schema_created = True
+
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def create_schema(self, connection: sqlite3.Connection) -> None:
+        """Create the index tables, unless they exist with the current schema."""
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            return
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents'").fetchone():
+            warning(f"The search index at {self.path} was made by an older version. Run reindex to rebuild it.")
+        connection.executescript(SCHEMA)
+
+    def index(self, link_id: str, content: str, fields: Optional[Dict[str, str]] = None) -> None:
+        """Index the content and other fields of a link, replacing what was indexed for it before."""
+        self.index_many([(link_id, content, fields or {})])
+
+    def index_many(self, documents: Iterable[SearchDocument]) -> None:
+        """Index several links in one transaction, replacing what was indexed for them before."""
+        insert = (
+            f"INSERT INTO documents_fts (rowid, {', '.join(SEARCH_FIELDS)}) "  # noqa: S608
+            f"VALUES (?, {', '.join('?' * len(SEARCH_FIELDS))})"
+        )
+        with self.connect() as connection:
+            for link_id, content, fields in documents:
+                values = {**fields, "content": content}
+                connection.execute("INSERT OR IGNORE INTO documents (link_id) VALUES (?)", (link_id,))
+                (rowid,) = connection.execute("SELECT id FROM documents WHERE link_id = ?", (link_id,)).fetchone()
+                connection.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+                connection.execute(insert, (rowid, *(values.get(field) or "" for field in SEARCH_FIELDS)))
+
+    def delete(self, link_id: str) -> None:
+        """Remove a link from the index."""
+        with self.connect() as connection:
+            row = connection.execute("SELECT id FROM documents WHERE link_id = ?", (link_id,)).fetchone()
+            if row:
+                connection.execute("DELETE FROM documents_fts WHERE rowid = ?", row)
+                connection.execute("DELETE FROM documents WHERE id = ?", row)
+
+    def clear(self) -> None:
+        """Remove every link from the index, and reclaim the space it took."""
+        with self.connect() as connection:
+            connection.executescript(f"{SCHEMA}VACUUM;")
+
+    def search(self, query: str, limit: int = 1000) -> List[SearchResult]:
+        """
+        Return the IDs of the links that contain every term of the query, best match first.
+
+        Args:
+            query: The query, as typed by the user
+            limit: The maximum number of results
+
+        Returns:
+            The link IDs and their weighted BM25 scores, where higher is better
+        """
+        match_query = build_match_query(query)
+        if not match_query:
+            return []
+
+        bm25 = f"bm25(documents_fts, {', '.join('?' * len(self.weights))})"
+        with self.connect() as connection:
+            rows = connection.execute(
+                f"SELECT documents.link_id, {bm25} AS score FROM documents_fts "  # noqa: S608
+                "JOIN documents ON documents.id = documents_fts.rowid "
+                "WHERE documents_fts MATCH ? ORDER BY score LIMIT ?",
+                (*self.weights, match_query, limit),
+            ).fetchall()
+        # FTS5's bm25() is negative, lower for better matches
+        return [(link_id, -score) for link_id, score in rows]
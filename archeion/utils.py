@@ -3,8 +3,9 @@
 import contextlib
 import os
 import re
+from itertools import islice
 from pathlib import Path
-from typing import Any, Generator, Optional, Union
+from typing import Any, Generator, Iterable, List, Optional, Union
 
 from django.conf import settings
 from django.core.files.storage import Storage
@@ -159,6 +160,13 @@ def ensure_list(item: Any) -> list:
     return list(item) if isinstance(item, (list, tuple)) else [item]
 
 
+def chunked(iterable: Iterable, size: int) -> Generator[List, None, None]:
+    """Split an iterable into lists of ``size`` items. The last list may be shorter."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
 def extract_webloc_url(filepath: Union[str, Path]) -> str:
     """
     Extract a URL from a ``.webloc`` file.
@@ -32,6 +32,7 @@ ALLOWED_HOSTS = config.server_config.allowed_hosts
 # ------------------------------------------------------------------------------
 CACHES = {
     "default": _dj_cache_url_parser(config.cache_url),
+    "keywords": _dj_cache_url_parser(config.keyword_cache_url),
 }
 
 # URLS
@@ -255,6 +256,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Archeion Stuff
 # ------------------------------------------------------------------------------
 
+ARCHIVE_ROOT = config.archive_root
 ARCHIVE_STORAGE = config.artifact_storage
 ARCHIVE_STORAGE_OPTIONS = config.artifact_storage_options
 
@@ -262,6 +264,18 @@ DANDELION_TOKEN = config.dandelion_token
 
 COMMAND_TIMEOUT = config.timeout
 MEDIA_TIMEOUT = config.media_timeout
+ARCHIVE_CONCURRENCY = config.archive_concurrency
+BROWSER_POOL_SIZE = config.browser_pool_size
+BROWSER_SINGLE_PAGE_LOAD = config.browser_single_page_load
+BROWSER_CONTENT_TYPES = config.browser_content_types
+PROBE_CONCURRENCY = config.probe_concurrency
+PROBE_PER_HOST_CONCURRENCY = config.probe_per_host_concurrency
+PROBE_TIMEOUT = config.probe_timeout
+POST_PROCESS_WORKERS = config.post_process_workers
+POST_PROCESS_CHUNK_SIZE = config.post_process_chunk_size
+JSONLD_CONTEXT_CACHE_DIR = config.jsonld_context_cache_dir
+JSONLD_CONTEXT_TTL = config.jsonld_context_ttl
+JSONLD_OFFLINE = config.jsonld_offline
 URL_BLACKLIST = config.url_blacklist
 URL_WHITELIST = config.url_whitelist
 CHECK_SSL_VALIDITY = config.check_ssl_validity
@@ -274,8 +288,11 @@ PUBLIC_SNAPSHOTS = config.server_config.public_snapshots
 PUBLIC_ADD_VIEW = config.server_config.public_add_view
 ITEMS_PER_PAGE = config.server_config.snapshots_per_page
 PREVIEW_ORIGINALS = config.server_config.preview_originals
+SERVE_ARCHIVE_FILES = config.server_config.serve_archive_files
 
 SEARCH_CONFIG = config.search_config
+SEARCH_INDEX_PATH = config.search_index_path
+KEYWORD_CONFIG = config.keyword_config
 
 
 LINK_PARSERS = [
@@ -8,6 +8,10 @@ from .base import *  # noqa: F403
 # ------------------------------------------------------------------------------
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
 
+# CACHES
+# ------------------------------------------------------------------------------
+CACHES["keywords"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "keywords"}  # noqa: F405
+
 # PASSWORDS
 # ------------------------------------------------------------------------------
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
@@ -20,5 +24,9 @@ EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 # ------------------------------------------------------------------------------
 TEMPLATES[0]["OPTIONS"]["debug"] = True  # noqa: F405
 
+# ARCHIVE FILES
+# ------------------------------------------------------------------------------
+SERVE_ARCHIVE_FILES = True
+
 # Your stuff...
 # ------------------------------------------------------------------------------
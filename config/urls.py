@@ -3,14 +3,13 @@
 import mimetypes
 
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.views import defaults as default_views
 from django.views.generic import RedirectView, TemplateView
 
-from archeion.index.views import ArtifactDetailView, HomepageView, LinkDetailView
+from archeion.index.views import ArtifactDetailView, HomepageView, LinkDetailView, serve_archive_file
 
 mimetypes.add_type("text/markdown", ".md")
 
@@ -30,9 +29,14 @@ urlpatterns = [
     path("archive/<str:link_id>/<str:slug>", ArtifactDetailView.as_view(), name="artifact-detail"),
     path("index.html", RedirectView.as_view(url="/")),
     path("", HomepageView.as_view(), name="Home"),
-    *static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT, show_indexes=True),
 ]
 
+if settings.DEBUG or settings.SERVE_ARCHIVE_FILES:
+    # In production, the web server in front of Django serves the archive files
+    urlpatterns += [
+        re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.*)$", serve_archive_file, name="archive-file"),
+    ]
+
 if settings.DEBUG:
     # Static file serving when using Gunicorn + Uvicorn for local web socket development
     urlpatterns += staticfiles_urlpatterns()
@@ -13,6 +13,11 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def search_index(settings, tmp_path):
+    settings.SEARCH_INDEX_PATH = tmp_path / "search.sqlite3"
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
@@ -1,9 +1,9 @@
 """Tests the adding of links to the archive."""
 
 import pytest
-from httpx import Response
 
-from archeion.add import add_links
+from archeion import add
+from archeion.add import add_links, finish_links, iter_unprobed_links
 from archeion.archivers import get_default_archivers
 from archeion.index.models import Artifact, Link
 
@@ -11,6 +11,20 @@ pytestmark = pytest.mark.django_db
 archiver_count = len(get_default_archivers())
 
 
+@pytest.fixture(autouse=True)
+def probed_urls(mocker) -> list:
+    """Record the probed URLs instead of sending HEAD requests."""
+    urls = []
+
+    async def probe_content_types(urls_to_probe) -> dict:
+        urls_to_probe = list(urls_to_probe)
+        urls.extend(urls_to_probe)
+        return {url: "text/html" for url in urls_to_probe}
+
+    mocker.patch("archeion.probe.probe_content_types", new=probe_content_types)
+    return urls
+
+
 def test_add_links_no_links(mocker, capsys):
     """Trying to add an empty string should result in no links added."""
     links = add_links("")
@@ -27,8 +41,6 @@ def test_add_links_no_links(mocker, capsys):
 
 def test_add_links_url(mocker, capsys):
     """Adding a URL should add a link to the archive."""
-    mock_httpx = mocker.patch("archeion.index.models.httpx")
-    mock_httpx.head.return_value = Response(status_code=200, headers={"content-type": "text/html"}, content="")
 
     links = add_links("https://example.com")
     captured = capsys.readouterr()
@@ -45,8 +57,6 @@ def test_add_links_url(mocker, capsys):
 
 def test_add_links_urllist(mocker, capsys, fixture_dir):
     """Adding a file of URLs should add a links to the archive."""
-    mock_httpx = mocker.patch("archeion.index.models.httpx")
-    mock_httpx.head.return_value = Response(status_code=200, headers={"content-type": "text/html"}, content="")
     links = add_links(str(fixture_dir / "url-list.txt"))
     captured = capsys.readouterr()
     output = [line.rstrip() for line in captured.out.splitlines()]
@@ -63,8 +73,6 @@ def test_add_links_urllist(mocker, capsys, fixture_dir):
 
 def test_add_links_url_already_in_archive(mocker, capsys):
     """Adding a URL that is already in the archive should not add it again."""
-    mock_httpx = mocker.patch("archeion.index.models.httpx")
-    mock_httpx.head.return_value = Response(status_code=200, headers={"content-type": "text/html"}, content="")
     links_1 = add_links("https://example.com")
     links_2 = add_links("https://example.com")
     captured = capsys.readouterr()
@@ -85,8 +93,6 @@ def test_add_links_url_already_in_archive(mocker, capsys):
 
 def test_add_links_index_only(mocker, capsys):
     """Adding index-only links do not create an Artifact."""
-    mock_httpx = mocker.patch("archeion.index.models.httpx")
-    mock_httpx.head.return_value = Response(status_code=200, headers={"content-type": "text/html"}, content="")
     links = add_links("https://example.com", index_only=True)
     captured = capsys.readouterr()
     output = [line.rstrip() for line in captured.out.splitlines()]
@@ -102,8 +108,6 @@ def test_add_links_index_only(mocker, capsys):
 
 def test_add_links_specific_archiver(mocker, capsys):
     """Adding index-only links do not create an Artifact."""
-    mock_httpx = mocker.patch("archeion.index.models.httpx")
-    mock_httpx.head.return_value = Response(status_code=200, headers={"content-type": "text/html"}, content="")
     links = add_links("https://example.com", archiver_names=["DOM"])
     captured = capsys.readouterr()
     output = [line.rstrip() for line in captured.out.splitlines()]
@@ -115,3 +119,47 @@ def test_add_links_specific_archiver(mocker, capsys):
     assert len(links) == 1
     assert Link.objects.count() == 1
     assert Artifact.objects.count() == 1
+
+
+def test_add_links_bulk(mocker, fixture_dir, probed_urls):
+    """Bulk adding skips the existing URLs and defers the content type probe."""
+    add_links("https://farrell-turner.info/")
+    probed_urls.clear()
+    mocker.patch("archeion.add.BULK_CHUNK_SIZE", 3)
+    bulk_add_chunk = mocker.spy(add, "_bulk_add_chunk")
+
+    links = add_links(str(fixture_dir / "url-list.txt"), bulk=True)
+
+    assert bulk_add_chunk.call_count == 3
+    assert len(links) == 7
+    assert Link.objects.count() == 8
+    assert Artifact.objects.count() == archiver_count * 8
+    assert probed_urls == []
+    assert all(link.archive_path == link.id and link.content_type is None for link in links)
+
+
+def test_finish_links(probed_urls):
+    """Finishing bulk-added links probes their content types."""
+    add_links("https://example.com", bulk=True)
+
+    assert finish_links() == 1
+    assert Link.objects.get().content_type == "text/html"
+    assert finish_links() == 0
+    assert probed_urls == ["https://example.com/"]
+
+
+def test_finish_links_records_failed_probes(probed_urls, mocker, django_assert_num_queries):
+    """Links whose content type can't be found aren't probed again."""
+    mocker.patch("archeion.add.BULK_CHUNK_SIZE", 1)
+    add_links("https://example.com", bulk=True)
+    add_links("https://example.org", bulk=True)
+
+    async def failed_probe(urls_to_probe) -> dict:
+        return {}
+
+    mocker.patch("archeion.probe.probe_content_types", new=failed_probe)
+    with django_assert_num_queries(3):  # A query per link, and one that finds no more
+        assert len(list(iter_unprobed_links())) == 2
+    assert finish_links() == 2
+    assert list(Link.objects.values_list("content_type", flat=True)) == ["", ""]
+    assert finish_links() == 0
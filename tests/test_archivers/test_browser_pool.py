@@ -0,0 +1,132 @@
+"""Tests for the shared browser pool and single page load captures."""
+
+import pytest
+
+from archeion.archivers.browser_pool import BrowserPool
+from archeion.archivers.webdriver import WebDriverArchiver, capture_page
+from archeion.index.models import Artifact, ArtifactStatus, Link
+
+
+class FakeDriver:
+    """Stands in for a Selenium WebDriver."""
+
+    def __init__(self):
+        self.requests = []
+        self.loaded_urls = []
+        self.quit_called = False
+        self.window_size = {"width": 800, "height": 600}
+
+    def get_window_size(self) -> dict:
+        return dict(self.window_size)
+
+    def set_window_size(self, width: int, height: int) -> None:
+        self.window_size = {"width": width, "height": height}
+
+    def get(self, url: str) -> None:
+        self.loaded_urls.append(url)
+
+    def delete_all_cookies(self) -> None:
+        pass
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+def test_pool_reuses_idle_browsers():
+    """A browser returned to the pool is handed to the next caller."""
+    pool = BrowserPool(max_size=1)
+    started = []
+
+    def factory() -> FakeDriver:
+        started.append(FakeDriver())
+        return started[-1]
+
+    with pool.browser(factory) as first:
+        pass
+    with pool.browser(factory) as second:
+        pass
+
+    assert first is second
+    assert len(started) == 1
+
+
+def test_pool_discards_browsers_that_raise():
+    """A browser that raised an error is shut down instead of being reused."""
+    pool = BrowserPool(max_size=1)
+
+    with pytest.raises(RuntimeError), pool.browser(FakeDriver) as driver:
+        raise RuntimeError("Boom")
+
+    assert driver.quit_called
+    with pool.browser(FakeDriver) as new_driver:
+        assert new_driver is not driver
+
+
+def test_pool_recycles_browsers_after_max_uses():
+    """Browsers are replaced after loading too many pages."""
+    pool = BrowserPool(max_size=1, max_uses=2)
+
+    with pool.browser(FakeDriver) as first:
+        pass
+    with pool.browser(FakeDriver) as second:
+        pass
+    with pool.browser(FakeDriver) as third:
+        pass
+
+    assert first is second
+    assert first.quit_called
+    assert third is not first
+
+
+def test_pool_restores_the_window_size():
+    """A browser resized by an archiver gets its original size back when it returns to the pool."""
+    pool = BrowserPool(max_size=1)
+
+    with pool.browser(FakeDriver) as driver:
+        driver.set_window_size(1440, 2156)
+    with pool.browser(FakeDriver) as same_driver:
+        assert same_driver.window_size == {"width": 800, "height": 600}
+
+
+class RecordingArchiver(WebDriverArchiver):
+    """An archiver that records the order it captured in, without starting a real browser."""
+
+    def __init__(self, plugin_name: str, capture_order: int, pool: BrowserPool, calls: list):
+        self.plugin_name = plugin_name
+        self.capture_order = capture_order
+        self.args = []
+        self.exec_path = ""
+        self.config = {}
+        self._pool = pool
+        self.calls = calls
+
+    @property
+    def browser_pool(self) -> BrowserPool:
+        return self._pool
+
+    def new_driver(self) -> FakeDriver:
+        return FakeDriver()
+
+    def save_artifact(self, driver: FakeDriver, artifact: Artifact) -> Artifact:
+        self.calls.append((self.plugin_name, list(driver.loaded_urls)))
+        artifact.status = ArtifactStatus.SUCCEEDED
+        return artifact
+
+
+@pytest.mark.django_db
+def test_capture_page_loads_the_page_once():
+    """All the archivers capture from one page load, in capture order."""
+    pool = BrowserPool(max_size=1)
+    calls = []
+    link = Link.objects.create(url="http://example.com", content_type="text/html")
+    screenshot = RecordingArchiver("screenshot", 90, pool, calls)
+    dom = RecordingArchiver("DOM", 20, pool, calls)
+    captures = [
+        (screenshot, link.artifacts.create(plugin_name="screenshot")),
+        (dom, link.artifacts.create(plugin_name="DOM")),
+    ]
+
+    capture_page(link.url, captures)
+
+    assert calls == [("DOM", ["http://example.com"]), ("screenshot", ["http://example.com"])]
+    assert all(artifact.status == ArtifactStatus.SUCCEEDED for _, artifact in captures)
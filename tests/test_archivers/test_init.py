@@ -0,0 +1,54 @@
+"""Tests for the archiver plugin registry."""
+
+import pytest
+
+from archeion.archivers import (
+    get_archiver_names,
+    get_archiver_registry,
+    get_archivers_map,
+    get_default_archivers,
+    reset_archiver_registry,
+)
+from archeion.config import ArchiverSettings
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    """Start each test with a registry that hasn't constructed anything."""
+    reset_archiver_registry()
+    yield
+    reset_archiver_registry()
+
+
+def test_names_do_not_construct_plugins():
+    """Listing the archivers only imports their classes."""
+    names = get_archiver_names()
+
+    assert "DOM" in names
+    assert "WgetArchiver" not in names
+    assert "WgetArchiver" in get_archiver_names(enabled_only=False)  # Disabled plugins are named by class
+    assert not any(plugin.is_constructed for plugin in get_archiver_registry().plugins)
+
+
+def test_plugins_are_constructed_once_on_first_lookup():
+    """Looking up an archiver creates it once, and reuses it afterwards."""
+    registry = get_archiver_registry()
+    dom = get_archivers_map()["DOM"]
+
+    assert registry.get_plugin("DOM").is_constructed
+    assert not registry.get_plugin("PDF").is_constructed
+    assert get_archivers_map()["DOM"] is dom
+    assert get_archiver_registry() is registry
+
+
+def test_registry_is_rebuilt_when_the_settings_change(settings):
+    """Overriding the archivers setting rebuilds the registry."""
+    initial_count = len(get_default_archivers())
+    settings.ARCHIVERS = [
+        ArchiverSettings(enabled=True, path="dom.html", class_path="archeion.archivers.dom.DOMArchiver"),
+        ArchiverSettings(enabled=True, path="missing", class_path="archeion.archivers.missing.MissingArchiver"),
+    ]
+
+    assert get_archiver_names() == ["DOM"]
+    assert get_archiver_names(enabled_only=False) == ["DOM", "MissingArchiver"]
+    assert initial_count > 1
@@ -60,3 +60,47 @@ def test_archive_links_with_link(mocker):
 
     assert Artifact.objects.filter(status=ArtifactStatus.PENDING).count() == 1
     assert Artifact.objects.filter(status=ArtifactStatus.SUCCEEDED).count() == 1
+
+
+def test_archive_artifacts_respects_concurrency_limits(mocker, settings):
+    """Archivers run concurrently, but never more at once than the plugin allows."""
+    import asyncio
+
+    settings.ARCHIVE_CONCURRENCY = 4
+    running = {"now": 0, "max": 0}
+
+    class SlowArchiver:
+        config = {"concurrency": 2}
+
+        async def __call__(self, artifact: Artifact, overwrite: bool = False) -> Artifact:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return await dummy_archiver(artifact, overwrite)
+
+    mocker.patch("archeion.archive.get_archivers_map", return_value={"slow": SlowArchiver()})
+    for i in range(6):
+        link = Link.objects.create(url=f"http://example{i}.com", content_type="text/html")
+        link.artifacts.create(plugin_name="slow")
+
+    archive.archive_links()
+
+    assert running["max"] == 2
+    assert Artifact.objects.filter(status=ArtifactStatus.SUCCEEDED).count() == 6
+
+
+def test_archive_artifacts_skips_browser_archivers_for_other_content(mocker):
+    """Browser archivers are skipped for links that aren't web pages."""
+    from archeion.archivers.webdriver import WebDriverArchiver
+
+    browser_archiver = mocker.MagicMock(spec=WebDriverArchiver)
+    mocker.patch("archeion.archive.get_archivers_map", return_value={"browser": browser_archiver})
+    pdf = Link.objects.create(url="http://example.com/paper.pdf", content_type="application/pdf")
+    artifact = pdf.artifacts.create(plugin_name="browser")
+
+    outputs = archive.archive_artifacts([artifact])
+
+    assert outputs == [artifact]
+    assert not browser_archiver.called
+    assert Artifact.objects.get(pk=artifact.pk).status == ArtifactStatus.SKIPPED
@@ -0,0 +1,138 @@
+"""Tests for the archive job queue."""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from archeion import job_queue
+from archeion.index.models import ArchiveJob, Artifact, ArtifactStatus, Link
+
+pytestmark = pytest.mark.django_db
+
+
+async def dummy_archiver(artifact: Artifact, overwrite: bool = False) -> Artifact:
+    """Dummy archiver."""
+    artifact.status = ArtifactStatus.SUCCEEDED
+    artifact.output_path = "dummy_output_path.txt"
+    return artifact
+
+
+async def failing_archiver(artifact: Artifact, overwrite: bool = False) -> Artifact:
+    """Dummy archiver that always fails."""
+    artifact.status = ArtifactStatus.FAILED
+    return artifact
+
+
+def make_artifacts(count: int, plugin_name: str = "dummy") -> list:
+    """Create a link with ``count`` artifacts."""
+    artifacts = []
+    for i in range(count):
+        link = Link.objects.create(url=f"http://example.com/{i}", content_type="text/html")
+        artifacts.append(link.artifacts.create(plugin_name=plugin_name))
+    return artifacts
+
+
+def test_enqueue_is_idempotent():
+    """Queueing an artifact twice keeps one job."""
+    artifacts = make_artifacts(2)
+
+    job_queue.enqueue_artifacts(artifacts)
+    job_queue.enqueue_artifacts(artifacts, priority=5)
+
+    assert ArchiveJob.objects.count() == 2
+    assert set(ArchiveJob.objects.values_list("priority", flat=True)) == {0}
+
+
+def test_leases_are_exclusive_and_by_priority():
+    """A leased job isn't handed to another worker, and higher priorities come first."""
+    low, high = make_artifacts(2)
+    job_queue.enqueue_artifacts([low])
+    job_queue.enqueue_artifacts([high], priority=10)
+
+    first = job_queue.lease_jobs("worker-1", limit=1)
+    second = job_queue.lease_jobs("worker-2", limit=5)
+    third = job_queue.lease_jobs("worker-3", limit=5)
+
+    assert [job.artifact_id for job in first] == [high.id]
+    assert [job.artifact_id for job in second] == [low.id]
+    assert third == []
+
+
+def test_expired_leases_can_be_taken_over():
+    """A job whose worker stopped responding is leased again after the lease runs out."""
+    job_queue.enqueue_artifacts(make_artifacts(1))
+    [job] = job_queue.lease_jobs("worker-1")
+    ArchiveJob.objects.filter(pk=job.pk).update(leased_until=timezone.now() - timedelta(seconds=1))
+
+    [retaken] = job_queue.lease_jobs("worker-2")
+    job_queue.complete_job(job)
+
+    assert retaken.pk == job.pk
+    assert ArchiveJob.objects.filter(pk=job.pk, leased_by="worker-2").exists()
+
+
+def test_failed_jobs_back_off_and_give_up(mocker):
+    """Failures are retried later, until the job runs out of attempts."""
+    mocker.patch("archeion.archive.get_archivers_map", return_value={"dummy": failing_archiver})
+    job_queue.enqueue_artifacts(make_artifacts(1), max_attempts=2)
+
+    for expected_attempts in (1, 2):
+        [job] = job_queue.lease_jobs("worker")
+        assert job_queue.process_jobs([job]) == (0, 1)
+        job.refresh_from_db()
+        assert job.attempts == expected_attempts
+        assert job.available_at > timezone.now()
+        assert job_queue.lease_jobs("worker") == []
+        ArchiveJob.objects.update(available_at=timezone.now())
+
+    job.refresh_from_db()
+    assert job.is_dead
+    assert job.last_error
+    assert job_queue.lease_jobs("worker") == []
+
+
+def test_backoff_grows_to_a_maximum():
+    """Each retry waits longer than the last, up to the maximum."""
+    first = job_queue.get_backoff(1)
+    tenth = job_queue.get_backoff(10)
+    hundredth = job_queue.get_backoff(100)
+
+    assert timedelta(seconds=job_queue.BACKOFF_BASE_SECONDS) <= first < tenth
+    assert hundredth <= timedelta(seconds=job_queue.BACKOFF_MAX_SECONDS * 1.25)
+
+
+def test_worker_drains_the_queue(mocker):
+    """A burst worker archives every queued artifact and removes the jobs."""
+    mocker.patch("archeion.archive.get_archivers_map", return_value={"dummy": dummy_archiver})
+    job_queue.enqueue_artifacts(make_artifacts(3))
+
+    processed = job_queue.run_worker("worker", batch_size=2, burst=True)
+
+    assert processed == 3
+    assert not ArchiveJob.objects.exists()
+    assert Artifact.objects.filter(status=ArtifactStatus.SUCCEEDED).count() == 3
+
+
+def test_dead_jobs_are_revived_when_queued_again():
+    """Queueing an artifact whose job ran out of attempts gives the job its attempts back."""
+    [artifact] = make_artifacts(1)
+    job_queue.enqueue_artifacts([artifact], max_attempts=1)
+    ArchiveJob.objects.update(attempts=1, last_error="The artifact failed.")
+
+    job_queue.enqueue_artifacts([artifact], max_attempts=3)
+
+    [job] = job_queue.lease_jobs("worker")
+    assert (job.attempts, job.max_attempts, job.last_error) == (0, 3, "")
+
+
+def test_worker_releases_the_rest_of_the_batch_when_stopped(mocker):
+    """A worker told to stop finishes the current link and gives up the leases on the others."""
+    mocker.patch("archeion.archive.get_archivers_map", return_value={"dummy": dummy_archiver})
+    job_queue.enqueue_artifacts(make_artifacts(3))
+    jobs = job_queue.lease_jobs("worker", limit=3)
+    checks = iter([False, True])
+
+    assert job_queue.process_jobs(jobs, should_stop=lambda: next(checks)) == (1, 0)
+    assert ArchiveJob.objects.count() == 2
+    assert not ArchiveJob.objects.filter(lease_token__isnull=False).exists()
@@ -0,0 +1,102 @@
+"""Tests for post-processing links."""
+
+from pathlib import Path
+
+import pytest
+from django.core.files.base import ContentFile
+
+from archeion import post_process
+from archeion.index.models import Artifact, ArtifactStatus, Link
+from archeion.index.storage import get_artifact_storage, hash_artifact_file, save_artifact_file
+
+pytestmark = pytest.mark.django_db
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "html-metadata"
+
+
+@pytest.fixture
+def links_with_dom(settings, tmp_path) -> list:
+    """Three links with archived DOMs, in a temporary storage."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    dom = (FIXTURE_DIR / "basic.html").read_text()
+    links = []
+    for i in range(3):
+        link = Link.objects.create(url=f"http://example.com/{i}", content_type="text/html")
+        artifact = link.artifacts.create(plugin_name="DOM", output_path="dom.html", status=ArtifactStatus.SUCCEEDED)
+        save_artifact_file(artifact.archive_output_path, ContentFile(dom), "DOM")
+        links.append(link)
+    return links
+
+
+def assert_post_processed(link: Link) -> None:
+    """The link has successful metadata and Markdown artifacts."""
+    for plugin_name in ("html_metadata", "markdown"):
+        artifact = link.artifacts.get(plugin_name=plugin_name)
+        assert artifact.status == ArtifactStatus.SUCCEEDED
+        assert get_artifact_storage().exists(str(artifact.archive_output_path))
+
+
+def test_post_processed_links_are_skipped(links_with_dom, mocker):
+    """Links are only post-processed again when overwriting."""
+    run_task = mocker.spy(post_process, "run_post_process_task")
+
+    post_process.post_process_links(links_with_dom)
+    post_process.post_process_links(links_with_dom)
+    assert run_task.call_count == 3
+
+    post_process.post_process_links(links_with_dom, overwrite=True)
+    assert run_task.call_count == 6
+    for link in links_with_dom:
+        assert_post_processed(link)
+
+
+def test_post_process_tasks_take_a_few_queries(links_with_dom, django_assert_max_num_queries):
+    """The artifacts of every link are prefetched, and the missing ones created together."""
+    links = list(Link.objects.filter(id__in=[link.id for link in links_with_dom]))
+
+    with django_assert_max_num_queries(4):
+        post_process.create_post_process_artifacts(links)
+        tasks = [post_process.get_post_process_task(link) for link in links]
+
+    assert all(task.metadata and task.markdown for task in tasks)
+    assert Artifact.objects.filter(plugin_name__in=["html_metadata", "markdown"]).count() == 6
+
+
+def test_links_are_post_processed_in_worker_processes(links_with_dom, mocker):
+    """Workers return their results to this process, which saves them."""
+    update_metadata = mocker.spy(post_process.Link, "update_metadata")
+
+    post_process.post_process_links(links_with_dom, workers=2, chunk_size=2)
+
+    assert update_metadata.call_count == 3
+    for link in links_with_dom:
+        assert_post_processed(link)
+
+
+def test_changed_only_redoes_links_whose_inputs_changed(links_with_dom, mocker):
+    """Only links with a new DOM or post-processor version are post-processed again."""
+    post_process.post_process_links(links_with_dom)
+    for link in links_with_dom:
+        dom_hash = hash_artifact_file(str(link.artifacts.get(plugin_name="DOM").archive_output_path))
+        for plugin_name in ("html_metadata", "markdown"):
+            artifact = link.artifacts.get(plugin_name=plugin_name)
+            assert artifact.source_hash == dom_hash
+            assert artifact.processor_version == "1"
+
+    run_task = mocker.spy(post_process, "run_post_process_task")
+    post_process.post_process_links(links_with_dom, changed_only=True)
+    assert run_task.call_count == 0
+
+    changed_dom = links_with_dom[0].artifacts.get(plugin_name="DOM")
+    get_artifact_storage().delete(str(changed_dom.archive_output_path))
+    save_artifact_file(changed_dom.archive_output_path, ContentFile("<html><p>Changed</p></html>"), "DOM")
+    mocker.patch("archeion.post_processors.markdown.PROCESSOR_VERSION", "2")
+    post_process.post_process_links(links_with_dom, changed_only=True)
+
+    tasks = [call.args[0] for call in run_task.call_args_list]
+    assert [(task.link_id, task.metadata, task.markdown) for task in tasks] == [
+        (links_with_dom[0].id, True, True),
+        (links_with_dom[1].id, False, True),
+        (links_with_dom[2].id, False, True),
+    ]
+    assert links_with_dom[1].artifacts.get(plugin_name="markdown").processor_version == "2"
@@ -0,0 +1,82 @@
+"""Tests for the JSON-LD context cache."""
+
+import datetime
+import json
+import threading
+from typing import Optional
+
+import pytest
+
+from archeion.post_processors.html_metadata.context_cache import ContextCache, ContextUnavailableError
+
+CONTEXT = {"@context": {"@vocab": "https://example.com/vocab#"}}
+
+
+def test_contexts_are_seeded_from_the_bundled_snapshots(tmp_path):
+    """The schema.org context is available offline, and cached on disk."""
+    cache = ContextCache(tmp_path, ttl=60, offline=True)
+
+    entry = cache.get("https://schema.org/")
+
+    assert entry["document_url"] == "https://schema.org/docs/jsonldcontext.jsonld"
+    assert entry["document"]["@context"]["@vocab"] == "http://schema.org/"
+    assert cache.entry_path("https://schema.org/").exists()
+
+
+def test_uncached_contexts_are_unavailable_offline(tmp_path):
+    """Offline, a context that isn't cached or bundled can't be loaded."""
+    with pytest.raises(ContextUnavailableError):
+        ContextCache(tmp_path, ttl=60, offline=True).get("https://example.com/context.jsonld")
+
+
+def test_fetched_contexts_are_cached_on_disk(httpserver, tmp_path):
+    """A fetched context is reused, even by another process, while it is fresh."""
+    httpserver.serve_content(json.dumps(CONTEXT), headers={"Content-Type": "application/ld+json"})
+    url = f"{httpserver.url}/context.jsonld"
+
+    assert ContextCache(tmp_path, ttl=60).get(url)["document"] == CONTEXT
+    assert ContextCache(tmp_path, ttl=60).get(url)["document"] == CONTEXT
+    assert len(httpserver.requests) == 1
+
+
+def test_stale_contexts_are_revalidated(httpserver, tmp_path, freezer):
+    """Once the TTL passes, the context is revalidated with its ETag, and kept if it can't be."""
+    httpserver.serve_content(json.dumps(CONTEXT), headers={"Content-Type": "application/ld+json", "ETag": '"v1"'})
+    url = f"{httpserver.url}/context.jsonld"
+    cache = ContextCache(tmp_path, ttl=60)
+    cache.get(url)
+
+    freezer.tick(datetime.timedelta(seconds=61))
+    httpserver.serve_content("", code=304)
+    entry = cache.get(url)
+
+    assert httpserver.requests[-1].headers["If-None-Match"] == '"v1"'
+    assert entry["document"] == CONTEXT
+    assert entry["fetched_at"] == datetime.datetime.now().timestamp()
+
+    freezer.tick(datetime.timedelta(seconds=61))
+    httpserver.serve_content("", code=500)
+    assert cache.get(url)["document"] == CONTEXT
+
+
+def test_a_slow_context_doesnt_hold_up_the_others(tmp_path, mocker):
+    """Cached contexts are returned while another context is being retrieved."""
+    cache = ContextCache(tmp_path, ttl=60)
+    cache.write("https://example.com/cached.jsonld", {"fetched_at": float("inf"), "document": CONTEXT})
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch(url: str, entry: Optional[dict] = None) -> dict:
+        fetching.set()
+        release.wait(5)
+        return {"fetched_at": 0, "document": CONTEXT}
+
+    mocker.patch.object(cache, "fetch", side_effect=slow_fetch)
+    thread = threading.Thread(target=cache.get, args=("https://example.com/slow.jsonld",))
+    thread.start()
+    fetching.wait(5)
+
+    assert cache.get("https://example.com/cached.jsonld")["document"] == CONTEXT
+    assert thread.is_alive()  # The slow context is still being retrieved
+    release.set()
+    thread.join()
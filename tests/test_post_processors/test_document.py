@@ -0,0 +1,35 @@
+"""Tests for the shared, parsed HTML document."""
+
+from pathlib import Path
+
+from archeion.post_processors import document as document_module
+from archeion.post_processors.document import HTMLDocument
+from archeion.post_processors.html import parse_html_metadata
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "html-metadata"
+
+
+def test_excess_elements_are_stripped():
+    """Styles and scripts are removed, but JSON-LD is kept."""
+    document = HTMLDocument(
+        "<html><head><style>p {}</style><script>alert(1)</script>"
+        '<script type="application/ld+json">{"@type": "Thing"}</script></head>'
+        "<body><p>Text</p>tail</body></html>"
+    )
+
+    assert "<style>" not in document.html
+    assert "alert" not in document.html
+    assert "application/ld+json" in document.html
+    assert "<p>Text</p>tail" in document.html
+
+
+def test_document_is_parsed_once(mocker):
+    """Extracting the metadata and serializing the document share one parse."""
+    parse = mocker.spy(document_module.html, "document_fromstring")
+    document = HTMLDocument((FIXTURE_DIR / "github.html").read_text(), "https://github.com/")
+
+    metadata = parse_html_metadata(document, document.url)
+    assert document.html
+
+    assert parse.call_count == 1
+    assert "python" in metadata["keywords"]
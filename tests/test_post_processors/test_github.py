@@ -9,11 +9,10 @@ FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "html-metadata"
 
 def test_parse_gh_tags():
     """Properly parses tags from a github page."""
-    from bs4 import BeautifulSoup
+    from archeion.post_processors.document import HTMLDocument
 
     filepath = FIXTURE_DIR / "github.html"
-    soup = BeautifulSoup(filepath.read_text(), features="lxml")
-    tags = github.parse_gh_tags(soup)
+    tags = github.parse_gh_tags(HTMLDocument(filepath.read_text()).tree)
     expected = {
         "cli",
         "digital-brain",
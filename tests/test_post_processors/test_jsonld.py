@@ -7,7 +7,8 @@ from pathlib import Path
 import dateutil.parser
 import pytest
 
-from archeion.post_processors.html_metadata import Normalizer
+from archeion.post_processors.html_metadata import Normalizer, jsonld
+from archeion.post_processors.html_metadata.context_cache import ContextCache
 
 from .normalized_data import github_jsonld, medium_jsonld, missing_data_jsonld, yoast2_jsonld, yoast_jsonld
 
@@ -106,3 +107,33 @@ def test_normalize_jsonld(freezer, src_file: Path, expected: dict):
     norm = Normalizer(data).normalized_metadata()
     norm["dateArchived"] = datetime.datetime.now()
     assert norm == expected
+
+
+def test_page_objects_are_compacted_together(mocker, tmp_path):
+    """All the JSON-LD objects on a page are compacted in one call, loading the context once."""
+    pyld_jsonld = jsonld._import_jsonld()
+    cache = ContextCache(tmp_path, ttl=60, offline=True)
+    mocker.patch.object(jsonld, "get_context_cache", return_value=cache)
+    mocker.patch.object(pyld_jsonld, "_resolved_context_cache", pyld_jsonld.LRUCache(maxsize=10))
+    get_context = mocker.spy(cache, "get")
+    compact = mocker.spy(pyld_jsonld, "compact")
+    objects = [
+        {"@context": "http://schema.org", "@type": "Organization", "@id": "https://example.com/#org", "name": "Ex"},
+        {
+            "@context": "https://schema.org/",
+            "@graph": [
+                {"@type": "WebPage", "@id": "https://example.com/", "name": "Home"},
+                {"@type": "Person", "name": "Someone", "url": "https://example.com/someone"},
+            ],
+        },
+    ]
+
+    index = jsonld.index_jsonld_objects(objects)
+
+    assert compact.call_count == 1
+    assert get_context.call_count == 1
+    assert index == {
+        "https://example.com/#org": {"id": "https://example.com/#org", "type": "Organization", "name": "Ex"},
+        "https://example.com/": {"id": "https://example.com/", "type": "WebPage", "name": "Home"},
+        "https://example.com/someone": {"type": "Person", "name": "Someone", "url": "https://example.com/someone"},
+    }
@@ -0,0 +1,42 @@
+"""Tests for keyword extraction."""
+
+from types import SimpleNamespace
+
+from django.core.cache import caches
+
+from archeion.config import KeywordSettings
+from archeion.post_processors import keywords
+from archeion.post_processors.keywords import KEYWORD_CACHE_ALIAS, CachedExtractor, RakeExtractor, extract_keywords
+
+TEXT = (
+    "Vector databases are popular. Teams use vector databases for retrieval, and context windows are growing. "
+    "With context windows this big, vector databases are used less."
+)
+
+
+def test_rake_extracts_repeated_phrases():
+    """Phrases between stopwords and punctuation are scored, and the best repeated ones kept."""
+    extractor = RakeExtractor(SimpleNamespace(max_keywords=2))
+
+    assert extractor.extract([TEXT, ""]) == [{"vector databases", "context windows"}, set()]
+
+
+def test_remote_extractors_are_cached_by_content(mocker):
+    """A remote extractor is only called for texts it hasn't seen."""
+    caches[KEYWORD_CACHE_ALIAS].clear()
+    remote = mocker.Mock(remote=True, extract=mocker.Mock(side_effect=lambda texts: [{text} for text in texts]))
+    remote.name = "remote"
+    extractor = CachedExtractor(remote)
+
+    assert extractor.extract(["one", "two"]) == [{"one"}, {"two"}]
+    assert extractor.extract(["two", "three"]) == [{"two"}, {"three"}]
+    assert remote.extract.call_args_list == [mocker.call(["one", "two"]), mocker.call(["three"])]
+
+
+def test_extractor_is_configurable(settings):
+    """The extractor comes from the settings, and can be disabled."""
+    settings.KEYWORD_CONFIG = KeywordSettings(extractor="archeion.post_processors.keywords.DandelionExtractor")
+    assert isinstance(keywords.get_keyword_extractor(), CachedExtractor)
+
+    settings.KEYWORD_CONFIG = KeywordSettings(extractor=None)
+    assert extract_keywords([TEXT]) == [set()]
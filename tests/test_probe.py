@@ -0,0 +1,27 @@
+"""Tests for probing the content types of links."""
+
+from archeion.index.models import Link
+from archeion.probe import get_mime_type, probe_links
+
+
+def test_probe_links(httpserver, fixture_dir):
+    """Probing fills in the content type of links that don't have one."""
+    httpserver.serve_content(
+        (fixture_dir / "example.com.html").read_text(), headers={"Content-Type": "text/html; charset=utf-8"}
+    )
+    unprobed = Link(url=httpserver.url)
+    unreachable = Link(url="http://127.0.0.1:1/")
+    already_known = Link(url=f"{httpserver.url}/feed", content_type="application/rss+xml")
+
+    probed = probe_links([unprobed, unreachable, already_known])
+
+    assert probed == [unprobed, unreachable]
+    assert unprobed.content_type == "text/html; charset=utf-8"
+    assert unreachable.content_type == ""  # Probed, so it is not probed again
+    assert already_known.content_type == "application/rss+xml"
+
+
+def test_get_mime_type():
+    """The MIME type is the content type without its parameters."""
+    assert get_mime_type("Text/HTML; charset=utf-8") == "text/html"
+    assert get_mime_type(None) == ""
@@ -0,0 +1,348 @@
+"""Tests for searching archived links."""
+
+import importlib
+import shutil
+import sys
+import threading
+import types
+from types import SimpleNamespace
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from archeion import search
+from archeion.index.model_functions import index_link_data
+from archeion.index.models import ArtifactStatus, Link
+from archeion.index.storage import save_artifact_file
+from archeion.search.backends.sqlite import SQLiteSearchBackend, build_match_query
+
+
+@pytest.fixture
+def backend(settings) -> SQLiteSearchBackend:
+    """An SQLite search backend with an empty index."""
+    return SQLiteSearchBackend(settings.SEARCH_CONFIG)
+
+
+@pytest.mark.parametrize(
+    ["query", "expected"],
+    [
+        ("python tutorial", '"python" "tutorial"'),
+        ("c++ AND (rust", '"c" "AND" "rust"'),
+        ("archiv*", '"archiv"*'),
+        ('"" -', ""),
+    ],
+)
+def test_build_match_query(query: str, expected: str):
+    """Queries are reduced to quoted terms, so FTS5 syntax in them is searched as text."""
+    assert build_match_query(query) == expected
+
+
+def test_links_are_found_by_every_term(backend):
+    """Only links containing all the terms match, the best match first."""
+    backend.index("link1", "Archiving the web with Python")
+    backend.index("link2", "Python, Python everywhere: a Python tutorial")
+    backend.index("link3", "A tutorial about knitting")
+
+    results = backend.search("python")
+    assert [link_id for link_id, _ in results] == ["link2", "link1"]
+    assert results[0][1] > results[1][1]
+    assert [link_id for link_id, _ in backend.search("python tutorial")] == ["link2"]
+    assert [link_id for link_id, _ in backend.search("archives")] == ["link1"]  # Stemmed
+    assert backend.search("") == []
+
+
+def test_links_are_reindexed_and_deleted(backend):
+    """Indexing a link again replaces its content, and deleting it removes it."""
+    backend.index("link1", "An old title")
+    backend.index("link1", "A new title")
+
+    assert backend.search("old") == []
+    assert [link_id for link_id, _ in backend.search("new")] == ["link1"]
+
+    backend.delete("link1")
+    backend.delete("link1")
+    assert backend.search("title") == []
+
+
+def test_field_boosts_rank_matches(backend):
+    """A match in a boosted field outranks more matches in the content."""
+    backend.index("link1", "Archiving, archiving and more archiving.", {"title": "Notes"})
+    backend.index("link2", "Some notes.", {"title": "Archiving"})
+    backend.index("link3", "Nothing to see here.", {"title": "Unrelated"})
+
+    assert [link_id for link_id, _ in backend.search("archiving")] == ["link2", "link1"]
+
+    backend.weights = [1.0] * len(backend.weights)
+    assert [link_id for link_id, _ in backend.search("archiving")] == ["link1", "link2"]
+
+
+@pytest.mark.django_db
+def test_search_returns_links_by_score():
+    """The search interface returns the matching links as a QuerySet, best match first."""
+    best = Link.objects.create(url="http://example.com/best", title="A")
+    good = Link.objects.create(url="http://example.com/good", title="B")
+    Link.objects.create(url="http://example.com/other", title="C")
+    search.index(good.id, "A page about archiving")
+    search.index(best.id, "A page about archiving", {"title": "Archiving"})
+
+    results = search.search("archiving")
+    assert list(results) == [best, good]
+    assert results[0].search_score > results[1].search_score
+    assert list(results[1:2]) == [good]
+
+    search.delete(best.id)
+    assert list(search.search("archiving")) == [good]
+
+
+@pytest.mark.django_db
+def test_links_can_be_searched_from_the_homepage(client):
+    """The search filter lists the matching links, best match first."""
+    link = Link.objects.create(url="http://example.com/", title="Example")
+    Link.objects.create(url="http://example.com/other", title="Other")
+    search.index(link.id, "A page about archiving")
+
+    response = client.get("/", {"q": "archiving"})
+
+    assert response.status_code == 200
+    assert list(response.context["table"].data) == [link]
+
+
+@pytest.mark.django_db
+def test_deleted_links_are_removed_from_the_index(settings, tmp_path):
+    """Deleting a link removes it, and deleting an indexed artifact re-indexes its link."""
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path)}
+    link = Link.objects.create(url="http://example.com/", title="Example")
+    artifact = link.artifacts.create(
+        plugin_name="markdown", output_path="markdown.md", status=ArtifactStatus.SUCCEEDED
+    )
+    save_artifact_file(artifact.archive_output_path, ContentFile("A page about archiving"), "markdown")
+    index_link_data(link)
+    assert list(search.search("archiving")) == [link]
+
+    artifact.delete()
+    assert not search.search("archiving").exists()
+    assert list(search.search("example")) == [link]
+
+    Link.objects.filter(pk=link.pk).delete()
+    assert search.get_search_backend().search("example") == []
+
+
+@pytest.mark.django_db
+def test_reindex_resumes_after_the_last_batch(settings, tmp_path, mocker):
+    """An interrupted rebuild continues after the last batch it indexed."""
+    settings.ARCHIVE_ROOT = tmp_path
+    links = [Link.objects.create(url=f"http://example.com/{i}", title=f"Page {i}") for i in range(3)]
+    link_ids = sorted(link.pk for link in links)
+    search.index("stale", "A link that no longer exists", {"title": "Page"})
+    backend = search.get_search_backend()
+    index_many = backend.index_many
+    batches = []
+
+    def interrupt_second_batch(documents):
+        documents = list(documents)
+        if len(batches) == 1 and not backend.interrupted:
+            backend.interrupted = True
+            raise RuntimeError("Interrupted")
+        batches.append([link_id for link_id, *_ in documents])
+        index_many(documents)
+
+    backend.interrupted = False
+    mocker.patch.object(backend, "index_many", side_effect=interrupt_second_batch)
+
+    with pytest.raises(RuntimeError):
+        call_command("reindex", batch_size=2)
+    assert search.get_reindex_checkpoint_path().exists()
+
+    call_command("reindex", "--resume", batch_size=2)
+
+    assert batches == [link_ids[:2], link_ids[2:]]
+    assert sorted(link_id for link_id, _ in backend.search("page")) == link_ids
+    assert not search.get_reindex_checkpoint_path().exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(not shutil.which("rg"), reason="ripgrep is not installed")
+def test_ripgrep_searches_the_listed_files(settings, tmp_path):
+    """Only the files of indexed links are searched, and results are cached until the list changes."""
+    from archeion.search.backends.ripgrep import RipGrepBackend
+
+    settings.ARCHIVE_ROOT = tmp_path
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path / "artifacts")}
+    links = [Link.objects.create(url=f"http://example.com/{i}", title=f"Page {i}") for i in range(3)]
+    for link, text in zip(links, ["archiving archiving", "archiving", "archiving"]):
+        save_artifact_file(f"{link.archive_path}/markdown.md", ContentFile(text), "markdown")
+        save_artifact_file(f"{link.archive_path}/style.css", ContentFile("archiving " * 10), "css")
+    backend = RipGrepBackend(settings.SEARCH_CONFIG)
+    assert len(backend.search("archiving")) == 3  # Walks the artifacts
+
+    backend.index_many((link.id, "", {}) for link in links[:2])
+    assert backend.list_link_files(links[0].id) == [f"{links[0].archive_path}/markdown.md"]
+    assert backend.search("archiving") == [(links[0].id, 2.0), (links[1].id, 1.0)]
+    assert len(backend.search("archiving", limit=1)) == 1
+
+    backend.delete(links[0].id)
+    assert backend.search("archiving") == [(links[1].id, 1.0)]
+
+
+def test_ripgrep_file_list_changes_are_not_lost(settings, tmp_path, mocker):
+    """Backends in several threads, or processes, take turns changing the file list."""
+    from archeion.search.backends.ripgrep import RipGrepBackend
+
+    mocker.patch.object(RipGrepBackend, "is_valid", return_value=True)
+    mocker.patch.object(RipGrepBackend, "list_link_files", side_effect=lambda link_id: [f"{link_id}/markdown.md"])
+    settings.ARCHIVE_ROOT = tmp_path
+    backends = [RipGrepBackend(settings.SEARCH_CONFIG) for _ in range(2)]
+
+    def index_links(backend: RipGrepBackend, prefix: str) -> None:
+        for i in range(20):
+            backend.index(f"{prefix}{i}", "")
+
+    threads = [threading.Thread(target=index_links, args=(backend, prefix)) for backend, prefix in zip(backends, "ab")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    files, _ = backends[0].load_files()
+    assert sorted(files) == sorted(f"{prefix}{i}" for prefix in "ab" for i in range(20))
+
+
+@pytest.mark.django_db
+def test_ripgrep_lists_the_files_of_succeeded_artifacts(settings, tmp_path, mocker):
+    """A link's files are listed again when an artifact succeeds, even if nothing indexes the link."""
+    from archeion.search.backends.ripgrep import RipGrepBackend
+
+    mocker.patch.object(RipGrepBackend, "is_valid", return_value=True)
+    settings.ARCHIVE_ROOT = tmp_path
+    settings.ARCHIVE_STORAGE_OPTIONS = {"location": str(tmp_path / "artifacts")}
+    backend = RipGrepBackend(settings.SEARCH_CONFIG)
+    mocker.patch.object(search, "get_search_backend", return_value=backend)
+    link = Link.objects.create(url="http://example.com/", title="Example")
+    backend.index(link.id, "")
+    output_path = f"{link.archive_path}/wget/index.html"
+
+    save_artifact_file(output_path, ContentFile("<p>Example</p>"), "wget")
+    artifact = link.artifacts.create(plugin_name="wget", output_path=output_path)
+    assert output_path not in backend.load_files()[0][link.id]
+
+    artifact.status = ArtifactStatus.SUCCEEDED
+    artifact.save()
+    assert output_path in backend.load_files()[0][link.id]
+
+
+def test_ripgrep_doesnt_cache_archive_walks(settings, tmp_path, mocker):
+    """Without a file list, the archive can change at any time, so every search walks it again."""
+    from archeion.search.backends.ripgrep import RipGrepBackend
+
+    mocker.patch.object(RipGrepBackend, "is_valid", return_value=True)
+    run_search = mocker.patch.object(RipGrepBackend, "run_search", side_effect=lambda *args: args[2])
+    settings.ARCHIVE_ROOT = tmp_path
+    backend = RipGrepBackend(settings.SEARCH_CONFIG)
+
+    backend.search("archiving")
+    backend.search("archiving")
+    assert run_search.call_count == 2
+
+    backend.clear()
+    backend.search("archiving")
+    backend.search("archiving")
+    assert run_search.call_count == 2
+
+
+class FakeIngestClient:
+    """Records the commands a Sonic ingest connection is sent, failing to push the links in ``failing``."""
+
+    instances: list = []
+    failing: set = set()
+
+    def __init__(self, host: str, port: int, password: str):
+        self.commands = []
+        self.closed = False
+        self.instances.append(self)
+
+    def flush_object(self, collection: str, bucket: str, obj: str) -> None:
+        self.commands.append(("flush_object", obj))
+
+    def push(self, collection: str, bucket: str, obj: str, text: str) -> None:
+        if obj in self.failing:
+            raise ConnectionError(f"Unable to push {obj}")
+        self.commands.append(("push", obj, text))
+
+    def flush_bucket(self, collection: str, bucket: str) -> None:
+        self.commands.append(("flush_bucket", bucket))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def sonic_module(monkeypatch):
+    """The Sonic backend module, imported with a fake ``sonic`` client library."""
+    fake_sonic = types.ModuleType("sonic")
+    fake_sonic.IngestClient = FakeIngestClient
+    fake_sonic.SearchClient = None
+    monkeypatch.setitem(sys.modules, "sonic", fake_sonic)
+    monkeypatch.setattr(FakeIngestClient, "instances", [])
+    monkeypatch.setattr(FakeIngestClient, "failing", set())
+    sys.modules.pop("archeion.search.backends.sonic", None)
+    yield importlib.import_module("archeion.search.backends.sonic")
+    sys.modules.pop("archeion.search.backends.sonic", None)
+
+
+def sonic_config(**options) -> SimpleNamespace:
+    """A Sonic backend configuration."""
+    return SimpleNamespace(
+        host="localhost", port=1491, password="secret", bucket="links", collection="archeion", **options
+    )
+
+
+def test_sonic_pushes_links_in_chunks(sonic_module):
+    """Each link is flushed, then pushed in chunks, over a bounded pool of reused connections."""
+    backend = sonic_module.SonicSearchBackend(sonic_config(ingest_connections=2, chunk_length=4))
+
+    backend.index_many([(f"link{i}", "some content", {"title": "Title"}) for i in range(5)])
+    backend.index_many([("link5", "more", {})])
+
+    commands = [command for client in FakeIngestClient.instances for command in client.commands]
+    for i in range(5):
+        link_commands = [command for command in commands if command[1] == f"link{i}"]
+        assert link_commands == [
+            ("flush_object", f"link{i}"),
+            ("push", f"link{i}", "Titl"),
+            ("push", f"link{i}", "e\nso"),
+            ("push", f"link{i}", "me c"),
+            ("push", f"link{i}", "onte"),
+            ("push", f"link{i}", "nt"),
+        ]
+    assert 1 <= len(FakeIngestClient.instances) <= 2
+    assert not any(client.closed for client in FakeIngestClient.instances)
+
+    backend.close()
+    assert all(client.closed for client in FakeIngestClient.instances)
+
+
+def test_sonic_closes_connections_beyond_the_pool_size(sonic_module):
+    """Connections opened while the pool was empty are closed if it is full when they are returned."""
+    backend = sonic_module.SonicSearchBackend(sonic_config(ingest_connections=1))
+
+    with backend.ingest_client() as first, backend.ingest_client() as second:
+        assert first is not second
+    assert [first.closed, second.closed] == [True, False]
+
+    with backend.ingest_client() as client:
+        assert client is second
+
+
+def test_sonic_aborts_after_too_many_errors_in_a_row(sonic_module):
+    """Failed links are skipped until more than ``max_errors`` fail in a row, and their connections closed."""
+    backend = sonic_module.SonicSearchBackend(sonic_config(ingest_connections=1, max_errors=1))
+    FakeIngestClient.failing = {"bad1", "bad2", "bad3"}
+
+    backend.index_many([("bad1", "text", {}), ("good", "text", {}), ("bad2", "text", {})])
+    with pytest.raises(ConnectionError):
+        backend.index_many([("bad3", "text", {}), ("good", "text", {})])
+
+    # The connection of each failed link was closed, and the others kept
+    for client in FakeIngestClient.instances:
+        assert client.closed == (client.commands[-1][1] in FakeIngestClient.failing)